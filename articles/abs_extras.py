@@ -0,0 +1,250 @@
+"""Cached extras scraped from the arXiv abs pages.
+
+The abs page shows a few things that are not in the arXiv API: submitter,
+submission history, license, DOI box, formats, browse context and the meta
+tags. They are parsed from ``https://arxiv.org/abs/<arxiv_idv>`` and cached
+per version in two parts:
+
+* immutable fields, fixed once a version is announced, cached without expiry;
+* volatile fields (new versions in the history, journal ref and DOI added
+  later, HTML format, DataCite DOI registration, trackbacks, prev/next),
+  served fresh for ``CENXIV_ABS_EXTRAS_TTL`` seconds and then served stale
+  for up to ``CENXIV_ABS_EXTRAS_MAX_STALE`` seconds while a Celery task
+  refreshes them.
+
+Only a cold cache makes the abs page wait for arXiv. While the circuit of
+arxiv.org is open (see ``upstream``) stale fields are served as they are with
+their age as ``stale_since``, and a refresh that fails keeps them for another
+``CENXIV_ABS_EXTRAS_MAX_STALE`` seconds.
+
+The formats offered for a version (``https://arxiv.org/format/<arxiv_idv>``)
+are cached the same way, for ``CENXIV_ABS_EXTRAS_MAX_STALE`` seconds.
+"""
+import time
+import logging
+from datetime import datetime, timezone
+
+import requests
+from bs4 import BeautifulSoup
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import singleflight, upstream
+from .upstream import UpstreamError
+
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_FIELDS = [
+    'author_list', 'msc_class', 'acm_class', 'report_number',
+    'submitter_name', 'show_email_link',
+    'license_effective_uri', 'license_icon_uri_path',
+    'ancillary_files', 'yyyymm',
+]
+
+VOLATILE_FIELDS = [
+    'doi_link', 'datacite_doi', 'journal_ref', 'doi',
+    'submission_history_entries', 'trackback_ping_count', 'format_list',
+    'browse_context', 'browse_context_previous_url', 'browse_context_next_url',
+    'meta_tags',
+]
+
+REFRESH_LOCK_TIMEOUT = 60 # seconds
+
+UPSTREAM_HOST = 'arxiv.org'
+
+
+def _immutable_key(arxiv_idv):
+    return f'cenxiv:abs_extras:immutable:{arxiv_idv}'
+
+
+def _volatile_key(arxiv_idv, context):
+    # prev/next and the browse context depend on the ?context= of the request
+    return f'cenxiv:abs_extras:volatile:{arxiv_idv}:{context}'
+
+
+def _upstream_url(arxiv_idv, context):
+    url = f'https://arxiv.org/abs/{arxiv_idv}'
+    return f'{url}?context={context}' if context else url
+
+
+def parse_abs_html(content):
+    """Parse the extras out of an arXiv abs page."""
+    extras = dict.fromkeys(IMMUTABLE_FIELDS + VOLATILE_FIELDS)
+    soup = BeautifulSoup(content, 'lxml')
+
+    extras['meta_tags'] = [ str(mt) for mt in soup.find_all('meta') ]
+
+    div_content_inner = soup.find('div', {'id': 'content-inner'})
+    extras['author_list'] = str(div_content_inner.find('div', {'class': 'authors'}))
+    # metadata related
+    msc_class_td = div_content_inner.find('td', {'class': "tablecell msc-classes"})
+    if msc_class_td:
+        extras['msc_class'] = msc_class_td.string
+    acm_class_td = div_content_inner.find('td', {'class': "tablecell acm-classes"})
+    if acm_class_td:
+        extras['acm_class'] = acm_class_td.string
+    report_number_td = div_content_inner.find('td', {'class': "tablecell jref"}) # jref may be wrong
+    if report_number_td:
+        extras['report_number'] = report_number_td.string
+    # datacite doi related
+    datacite_doi_td = div_content_inner.find('td', {'class': "tablecell arxivdoi"})
+    extras['doi_link'] = datacite_doi_td.find('a', {'id': "arxiv-doi-link"})['href']
+    extras['datacite_doi'] = not 'pending' in datacite_doi_td.find('div', {'id': "more-info-desc-1"}).text
+    # journal ref
+    journal_ref_td = div_content_inner.find('td', {'class': "tablecell jref"})
+    if journal_ref_td:
+        extras['journal_ref'] = journal_ref_td.string
+    # doi
+    doi_td = div_content_inner.find('td', {'class': "tablecell doi"})
+    if doi_td:
+        extras['doi'] = str(doi_td.contents[0])
+
+    div_submission_history = soup.find('div', {'class': 'submission-history'})
+    submitter_name = ''
+    show_email_link = ''
+    br_idx = 0
+    for i, ct in enumerate(div_submission_history.contents):
+        if ct.string and 'From: ' in ct.string.strip():
+            submitter_name = ct.string.strip().replace('From: ', '').replace(' [', '')
+        if ct.string and ct.string == 'view email' and ct.get('href', ''):
+            show_email_link = ct['href']
+        if ct.name == 'br':
+            br_idx = i
+            break
+    extras['submitter_name'] = submitter_name
+    extras['show_email_link'] = show_email_link
+    extras['submission_history_entries'] = [ str(ct) for ct in div_submission_history.contents[br_idx:] ]
+
+    div_extra_services = soup.find('div', {'class': 'extra-services'})
+    # ancillary_files related
+    extras['ancillary_files'] = bool(div_extra_services.find('div', {'class': "ancillary"}))
+    # trackback_ping_count
+    trackback_ping_count_div = div_extra_services.find('div', {'class': "extra-general"})
+    if trackback_ping_count_div:
+        extras['trackback_ping_count'] = int(trackback_ping_count_div.find('h3').text.strip().split(' ')[0])
+
+    format_list = ['cn-pdf']
+    for li in div_extra_services.find('ul').find_all('li'):
+        if 'PDF' in li.text:
+            format_list.append('pdf')
+        if 'HTML' in li.text and 'experimental' in li.text:
+            format_list.append('latexml')
+        if 'Source' in li.text:
+            format_list.append('src')
+        if 'HTML' in li.text and (not 'experimental' in li.text):
+            format_list.append('html')
+        if 'Other' in li.text:
+            format_list.append('other')
+    extras['format_list'] = format_list
+
+    # for license
+    license_effective_uri = ''
+    license_icon_uri_path = ''
+    license_a = div_extra_services.find('div', {'class': "abs-license"}).find('a')
+    if license_a:
+        license_effective_uri = license_a['href']
+        if 'has_license' in license_a.get('class', []): # return a list
+            license_icon_uri_path = license_a.find('img')['src']
+    extras['license_effective_uri'] = license_effective_uri
+    extras['license_icon_uri_path'] = license_icon_uri_path
+
+    # for browse
+    extras['browse_context'] = div_extra_services.find('div', {'class': 'browse'}).find('div', {'class': 'current'}).string
+    prevnext_div = div_extra_services.find('div', {'class': 'prevnext'})
+    prev_a = prevnext_div.find('a', {'class': "abs-button prev-url"})
+    if prev_a:
+        extras['browse_context_previous_url'] = prev_a['href']
+    next_a = prevnext_div.find('a', {'class': "abs-button next-url"})
+    if next_a:
+        extras['browse_context_next_url'] = next_a['href']
+    extras['yyyymm'] = div_extra_services.find('div', {'class': 'list'}).find('a', {'class': "abs-button abs-button-grey abs-button-small context-id"}).string
+
+    return extras
+
+
+def fetch_abs_extras(arxiv_idv, context=''):
+    """Fetch and parse the abs page of ``arxiv_idv`` and cache both parts, returns the extras."""
+    extras = singleflight.fetch(_upstream_url(arxiv_idv, context), parse_abs_html)
+
+    cache.set(_immutable_key(arxiv_idv), {name: extras[name] for name in IMMUTABLE_FIELDS}, timeout=None)
+    cache.set(
+        _volatile_key(arxiv_idv, context),
+        {'fetched_at': time.time(), 'data': {name: extras[name] for name in VOLATILE_FIELDS}},
+        timeout=settings.CENXIV_ABS_EXTRAS_TTL + settings.CENXIV_ABS_EXTRAS_MAX_STALE,
+    )
+    return extras
+
+
+def _refresh_lock_key(arxiv_idv, context):
+    return f'cenxiv:abs_extras:refresh_lock:{arxiv_idv}:{context}'
+
+
+def refresh_abs_extras(arxiv_idv, context=''):
+    """Refetch the extras and release the refresh lock taken by :func:`get_abs_extras`."""
+    try:
+        fetch_abs_extras(arxiv_idv, context)
+    except (UpstreamError, requests.RequestException):
+        # keep serving what we have while arXiv is down
+        cache.touch(_volatile_key(arxiv_idv, context), timeout=settings.CENXIV_ABS_EXTRAS_MAX_STALE)
+        raise
+    finally:
+        cache.delete(_refresh_lock_key(arxiv_idv, context))
+
+
+def get_abs_extras(arxiv_idv, context='', fetch=True):
+    """The extras of ``arxiv_idv``, from the cache whenever possible.
+
+    Stale volatile fields are returned as they are and refreshed in the
+    background; arXiv is only fetched synchronously when nothing usable is
+    cached, or None is returned then if ``fetch`` is False.
+    """
+    cached = cache.get_many([_immutable_key(arxiv_idv), _volatile_key(arxiv_idv, context)])
+    immutable = cached.get(_immutable_key(arxiv_idv))
+    volatile = cached.get(_volatile_key(arxiv_idv, context))
+    if immutable is None or volatile is None:
+        return fetch_abs_extras(arxiv_idv, context) if fetch else None
+
+    stale = time.time() - volatile['fetched_at'] > settings.CENXIV_ABS_EXTRAS_TTL
+    stale_since = None
+    if stale and upstream.is_open(UPSTREAM_HOST):
+        # a refresh would fail now, show how old the extras are instead
+        stale_since = datetime.fromtimestamp(volatile['fetched_at'], timezone.utc)
+    # 只让一个请求触发后台刷新
+    elif stale and cache.add(_refresh_lock_key(arxiv_idv, context), 'locked', timeout=REFRESH_LOCK_TIMEOUT):
+        # imported here, tasks imports this module
+        from .tasks import refresh_abs_extras_task
+        refresh_abs_extras_task.delay(arxiv_idv, context)
+
+    return immutable | volatile['data'] | {'stale_since': stale_since}
+
+
+FORMAT_LABELS = {
+    'pdf': 'PDF',
+    'ps': 'PostScript',
+    'dvi': 'DVI',
+    'html': 'HTML',
+    'docx': 'DOCX',
+    'src': 'Source',
+}
+
+
+def _parse_formats(content):
+    soup = BeautifulSoup(content, 'lxml')
+    formats = {}
+    for dt in soup.find('dl').find_all('dt'):
+        for name, label in FORMAT_LABELS.items():
+            if label in dt.text:
+                formats[name] = True
+    return formats
+
+
+def get_formats(arxiv_idv):
+    """The formats arXiv offers for ``arxiv_idv``, as ``{format: True}`` flags for format.html."""
+    key = f'cenxiv:formats:{arxiv_idv}'
+    formats = cache.get(key)
+    if formats is None:
+        formats = singleflight.fetch(f'https://arxiv.org/format/{arxiv_idv}', _parse_formats)
+        cache.set(key, formats, timeout=settings.CENXIV_ABS_EXTRAS_MAX_STALE)
+    return formats
@@ -4,6 +4,7 @@ from django import forms
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 from .models import Article#, Author, Category, Link
+from .listing_rows import refresh_listing_rows
 from django.utils.html import escape
 from django.contrib.admin import DateFieldListFilter
 from django.contrib.admin.models import LogEntry, CHANGE
@@ -50,6 +51,8 @@ class ArticleAdmin(admin.ModelAdmin):
     # search_help_text = "支持按文章ID、标题、摘要、作者和分类搜索"
     search_help_text = _("Supports searching by article ID, title, abstract, author and category")
     show_facets = admin.ShowFacets.ALWAYS
+    ordering = ['-updated_date']
+    date_hierarchy = 'published_date'  # drilling down by year only touches that partition
     # inlines = [AuthorInline, CategoryInline, LinkInline]
 
     def has_add_permission(self, request):
@@ -110,6 +113,11 @@ class ArticleAdmin(admin.ModelAdmin):
                 change_message=_(f"Modified the translation of article {obj.entry_id}")
             )
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # 更新列表页使用的预计算数据
+        refresh_listing_rows([form.instance])
+
     # Define the fieldsets for the admin form
     fieldsets = [
         # (_("Entry Info"), {
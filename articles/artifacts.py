@@ -0,0 +1,439 @@
+"""Storing the compiled versions of papers, published atomically and deduplicated.
+
+``translate_arxiv`` compiles a version in a staging directory (see
+:func:`staging`), then :meth:`ArtifactStore.publish` stores its files, the
+Chinese PDF, the source and the figures, as blobs named by their SHA-256, so
+a file identical across versions is stored once, and writes the manifest of
+the version last::
+
+    {"arxiv_id": "2401.00001", "version": 2, "published_at": "...",
+     "files": {"cn_pdf/2401.00001v2.pdf": {"sha256": "...", "size": 123}, ...}}
+
+A version is published exactly when its manifest is, so a PDF still being
+written is never served, and what was compiled is known without listing
+directories. Every published version has its Chinese PDF.
+
+``CENXIV_ARTIFACT_STORE`` selects the backend of :func:`store`:
+
+* ``'local'`` (the default) keeps the blobs under ``CENXIV_FILE_PATH/.blobs``
+  and each version in its usual directory ``arxiv{arxiv_id}/v{version}``,
+  made of hard links to the blobs and the manifest, built aside and renamed
+  into place. The served paths do not change, nginx still sends the files
+  (see ``file_delivery``). Versions compiled before the store have no
+  manifest and count as published when their PDF exists, ``manage.py
+  publish_artifacts`` gives them one and deduplicates their files.
+* ``'s3'`` keeps them in the S3 compatible bucket
+  ``CENXIV_ARTIFACT_S3_BUCKET``, the blobs under ``blobs/`` and the manifests
+  at ``arxiv{arxiv_id}/v{version}/manifest.json``, and redirects to presigned
+  URLs of the PDFs. The published versions are listed in one index object,
+  ``published.json``, extended by each publish with conditional writes, which
+  each process reloads at most every ``INDEX_CHECK_INTERVAL`` seconds; a
+  version published since is known from its marker in the cache. So no
+  lookup makes a request per version or lists the bucket, only the first
+  publish without an index builds it from the manifests in the bucket.
+  ``CENXIV_ARTIFACT_S3_ENDPOINT_URL`` points it to a local stand-in such as
+  MinIO. It needs boto3, ``poetry install -E s3``.
+"""
+import os
+import re
+import json
+import uuid
+import shutil
+import time
+import hashlib
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponseRedirect
+
+from .file_delivery import serve_file
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+CHUNK_SIZE = 1024 * 1024
+PUBLISHED_TIMEOUT = 24 * 60 * 60 # seconds the s3 backend remembers a version is published
+INDEX = 'published.json'
+INDEX_CHECK_INTERVAL = 60 # seconds between checks for a new index of the s3 backend
+INDEX_WRITE_ATTEMPTS = 10
+
+
+def version_dir(arxiv_id, version):
+    """The directory of a version, ``arxiv_id`` may be old style with archive."""
+    return f'arxiv{arxiv_id}/v{version}'
+
+
+def cn_pdf_name(arxiv_id, version):
+    """The Chinese PDF among the files of a version."""
+    return f'cn_pdf/{arxiv_id.rsplit("/", 1)[-1]}v{version}.pdf'
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _blob_name(digest):
+    return f'blobs/{digest[:2]}/{digest}'
+
+
+def _scan(directory):
+    """The manifest entries of the files under ``directory``, and their paths, by relative path."""
+    files, paths = {}, {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            if os.path.islink(path):
+                continue
+            relative = os.path.relpath(path, directory)
+            files[relative] = {'sha256': file_digest(path), 'size': os.path.getsize(path)}
+            paths[relative] = path
+    return files, paths
+
+
+@contextmanager
+def staging(arxiv_idv):
+    """A fresh directory to compile ``arxiv_idv`` in, removed afterwards.
+
+    It is on the file system of ``CENXIV_FILE_PATH`` whatever the backend, so
+    the local one links the files instead of copying them.
+    """
+    path = f'{settings.CENXIV_FILE_PATH}/.staging/{arxiv_idv.replace("/", "_")}.{uuid.uuid4().hex}'
+    os.makedirs(path)
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class ArtifactStore:
+    """What the backends have in common, the publishing of a version."""
+
+    def publish(self, arxiv_id, version, directory):
+        """Store the files under ``directory`` as ``version`` of ``arxiv_id``, returns its manifest."""
+        files, paths = _scan(directory)
+        if cn_pdf_name(arxiv_id, version) not in files:
+            raise ValueError(f'No Chinese PDF in {directory}')
+        new_blobs = sum(self._put_blob(entry['sha256'], paths[relative]) for relative, entry in files.items())
+        manifest = {
+            'arxiv_id': arxiv_id,
+            'version': int(version),
+            'published_at': datetime.now(timezone.utc).isoformat(),
+            'files': files,
+        }
+        self._put_manifest(arxiv_id, version, manifest)
+        logger.info(f'Published arxiv:{arxiv_id}v{version}, {len(files)} files, {new_blobs} new blobs')
+        return manifest
+
+    def _put_blob(self, digest, path):
+        """Store the file at ``path`` as the blob ``digest`` unless it exists, returns whether it was stored."""
+        raise NotImplementedError
+
+    def _put_manifest(self, arxiv_id, version, manifest):
+        """Publish ``version`` with ``manifest``, its blobs are stored."""
+        raise NotImplementedError
+
+    def manifest(self, arxiv_id, version):
+        """The manifest of a published version, None if it is not published."""
+        raise NotImplementedError
+
+    def exists(self, arxiv_id, version):
+        """Whether ``version`` of ``arxiv_id`` is published."""
+        return self.manifest(arxiv_id, version) is not None
+
+    def exists_many(self, versions):
+        """The published ones of the ``(arxiv_id, version)`` pairs ``versions``."""
+        return {(arxiv_id, int(version)) for arxiv_id, version in versions if self.exists(arxiv_id, version)}
+
+    def versions(self, arxiv_id):
+        """The published versions of ``arxiv_id``, sorted."""
+        raise NotImplementedError
+
+    def papers(self):
+        """The arXiv ids the store has files of, some may have no published version yet."""
+        raise NotImplementedError
+
+    def serve_cn_pdf(self, request, arxiv_id, version):
+        """A response sending the Chinese PDF of a published version."""
+        raise NotImplementedError
+
+
+class LocalArtifactStore(ArtifactStore):
+    """The versions in their directories under ``root``, hard linked to the blobs."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def _put_blob(self, digest, path):
+        blob = self._path(f'.{_blob_name(digest)}')
+        if os.path.exists(blob):
+            return False
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        tmp = f'{blob}.{uuid.uuid4().hex}.tmp'
+        try:
+            os.link(path, tmp)
+        except OSError:
+            # another file system
+            shutil.copyfile(path, tmp)
+        # shared by the versions from now on
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, blob)
+        return True
+
+    def _put_manifest(self, arxiv_id, version, manifest):
+        final = self._path(version_dir(arxiv_id, version))
+        parent = os.path.dirname(final)
+        token = uuid.uuid4().hex
+        tmp = os.path.join(parent, f'.v{version}.{token}.tmp')
+        os.makedirs(tmp)
+        try:
+            for relative, entry in manifest['files'].items():
+                path = os.path.join(tmp, relative)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.link(self._path(f'.{_blob_name(entry["sha256"])}'), path)
+            with open(os.path.join(tmp, MANIFEST), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            old = None
+            if os.path.exists(final):
+                # published again, the version is missing until the rename below
+                old = os.path.join(parent, f'.v{version}.{token}.old')
+                os.rename(final, old)
+            os.rename(tmp, final)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+
+    def manifest(self, arxiv_id, version):
+        directory = self._path(version_dir(arxiv_id, version))
+        try:
+            with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            pass
+        # compiled before the store, its PDF is all we know of
+        name = cn_pdf_name(arxiv_id, version)
+        try:
+            size = os.path.getsize(os.path.join(directory, name))
+        except OSError:
+            return None
+        return {
+            'arxiv_id': arxiv_id,
+            'version': int(version),
+            'published_at': None,
+            'files': {name: {'sha256': None, 'size': size}},
+        }
+
+    def exists(self, arxiv_id, version):
+        # a version directory appears whole, its PDF is complete
+        return os.path.isfile(self._path(f'{version_dir(arxiv_id, version)}/{cn_pdf_name(arxiv_id, version)}'))
+
+    def versions(self, arxiv_id):
+        try:
+            names = os.listdir(self._path(f'arxiv{arxiv_id}'))
+        except FileNotFoundError:
+            return []
+        versions = [int(name[1:]) for name in names if re.fullmatch(r'v\d+', name)]
+        return sorted(version for version in versions if self.exists(arxiv_id, version))
+
+    def papers(self):
+        papers = []
+        for name in os.listdir(self.root):
+            path = self._path(name)
+            if not name.startswith('arxiv') or not os.path.isdir(path):
+                continue
+            children = os.listdir(path)
+            if any(re.fullmatch(r'v\d+', child) for child in children) or re.fullmatch(r'arxiv\d{4}\.\d{4,5}', name):
+                papers.append(name[len('arxiv'):])
+            else:
+                # an archive of old style ids, e.g. arxivhep-th/9901001
+                papers.extend(f'{name[len("arxiv"):]}/{child}' for child in children
+                              if os.path.isdir(os.path.join(path, child)))
+        return papers
+
+    def serve_cn_pdf(self, request, arxiv_id, version):
+        path = self._path(f'{version_dir(arxiv_id, version)}/{cn_pdf_name(arxiv_id, version)}')
+        return serve_file(request, path, content_type='application/pdf')
+
+
+class S3ArtifactStore(ArtifactStore):
+    """The blobs and manifests as objects of an S3 compatible bucket."""
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, url_expires=3600):
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError:
+            raise ImproperlyConfigured('The s3 artifact store needs boto3, install it with `poetry install -E s3`.')
+        if not bucket:
+            raise ImproperlyConfigured('CENXIV_ARTIFACT_S3_BUCKET is not set.')
+        # credentials from the usual AWS_* environment variables
+        self.client = boto3.client('s3', endpoint_url=endpoint_url or None)
+        self.bucket = bucket
+        self.prefix = prefix
+        self.url_expires = url_expires
+        self._client_error = ClientError
+        self._index_lock = threading.Lock()
+        self._index = {}
+        self._index_etag = None
+        self._index_checked = -INDEX_CHECK_INTERVAL
+
+    def _key(self, name):
+        return f'{self.prefix}{name}'
+
+    def _manifest_key(self, arxiv_id, version):
+        return self._key(f'{version_dir(arxiv_id, version)}/{MANIFEST}')
+
+    def _published_key(self, arxiv_id, version):
+        return f'cenxiv:artifacts:published:{arxiv_id}v{version}'
+
+    def _is_missing(self, error):
+        return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+    def _put_blob(self, digest, path):
+        key = self._key(_blob_name(digest))
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return False
+        except self._client_error as e:
+            if not self._is_missing(e):
+                raise
+        self.client.upload_file(path, self.bucket, key)
+        return True
+
+    def _put_manifest(self, arxiv_id, version, manifest):
+        # an object is replaced whole by a put
+        self.client.put_object(
+            Bucket=self.bucket, Key=self._manifest_key(arxiv_id, version),
+            Body=json.dumps(manifest, ensure_ascii=False).encode(), ContentType='application/json',
+        )
+        self._add_to_index(arxiv_id, version)
+        cache.set(self._published_key(arxiv_id, version), True, timeout=PUBLISHED_TIMEOUT)
+
+    def manifest(self, arxiv_id, version):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._manifest_key(arxiv_id, version))
+        except self._client_error as e:
+            if self._is_missing(e):
+                return None
+            raise
+        return json.loads(response['Body'].read())
+
+    # the index of the published versions
+
+    def _list_published(self):
+        """The published versions by paper from the manifests in the bucket, lists the whole bucket."""
+        index = {}
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key('arxiv')):
+            for item in page.get('Contents', []):
+                match = re.fullmatch(rf'arxiv(.+)/v(\d+)/{re.escape(MANIFEST)}', item['Key'][len(self._key('')):])
+                if match:
+                    index.setdefault(match[1], []).append(int(match[2]))
+        return {arxiv_id: sorted(versions) for arxiv_id, versions in index.items()}
+
+    def _load_index(self):
+        """The published versions by paper, refreshed from the bucket at most every ``INDEX_CHECK_INTERVAL`` seconds."""
+        with self._index_lock:
+            if time.monotonic() - self._index_checked < INDEX_CHECK_INTERVAL:
+                return self._index
+            try:
+                kwargs = {'IfNoneMatch': self._index_etag} if self._index_etag else {}
+                response = self.client.get_object(Bucket=self.bucket, Key=self._key(INDEX), **kwargs)
+                self._index = json.loads(response['Body'].read())
+                self._index_etag = response['ETag']
+            except self._client_error as e:
+                code = e.response.get('Error', {}).get('Code')
+                if code in ('304', 'NotModified'):
+                    pass
+                elif self._is_missing(e):
+                    self._index, self._index_etag = {}, None
+                else:
+                    raise
+            self._index_checked = time.monotonic()
+            return self._index
+
+    def _add_to_index(self, arxiv_id, version):
+        """Add a published version to the index object, with conditional writes against concurrent publishes."""
+        for _ in range(INDEX_WRITE_ATTEMPTS):
+            try:
+                response = self.client.get_object(Bucket=self.bucket, Key=self._key(INDEX))
+                index, condition = json.loads(response['Body'].read()), {'IfMatch': response['ETag']}
+            except self._client_error as e:
+                if not self._is_missing(e):
+                    raise
+                # the first publish with an index, the earlier versions are in it too
+                index, condition = self._list_published(), {'IfNoneMatch': '*'}
+            index[arxiv_id] = sorted(set(index.get(arxiv_id, [])) | {int(version)})
+            try:
+                self.client.put_object(
+                    Bucket=self.bucket, Key=self._key(INDEX), Body=json.dumps(index).encode(),
+                    ContentType='application/json', **condition,
+                )
+                with self._index_lock:
+                    self._index = index
+                return
+            except self._client_error as e:
+                if e.response.get('Error', {}).get('Code') not in ('412', 'PreconditionFailed', 'ConditionalRequestConflict'):
+                    raise
+                # written by another publish meanwhile, read it again
+        raise RuntimeError(f'Failed to add arxiv:{arxiv_id}v{version} to the index of the published versions')
+
+    def exists(self, arxiv_id, version):
+        return (arxiv_id, version) in self.exists_many([(arxiv_id, version)])
+
+    def exists_many(self, versions):
+        # versions published since the index was loaded have their marker
+        versions = [(arxiv_id, int(version)) for arxiv_id, version in versions]
+        markers = cache.get_many([self._published_key(arxiv_id, version) for arxiv_id, version in versions])
+        index = self._load_index()
+        return {
+            (arxiv_id, version) for arxiv_id, version in versions
+            if self._published_key(arxiv_id, version) in markers or version in index.get(arxiv_id, ())
+        }
+
+    def versions(self, arxiv_id):
+        return sorted(self._load_index().get(arxiv_id, []))
+
+    def papers(self):
+        return list(self._load_index())
+
+    def serve_cn_pdf(self, request, arxiv_id, version):
+        manifest = self.manifest(arxiv_id, version)
+        entry = manifest['files'][cn_pdf_name(arxiv_id, version)]
+        url = self.client.generate_presigned_url('get_object', Params={
+            'Bucket': self.bucket,
+            'Key': self._key(_blob_name(entry['sha256'])),
+            'ResponseContentType': 'application/pdf',
+            'ResponseContentDisposition': f'inline; filename="{cn_pdf_name(arxiv_id, version).rsplit("/", 1)[-1]}"',
+        }, ExpiresIn=self.url_expires)
+        return HttpResponseRedirect(url)
+
+
+@functools.cache
+def store():
+    """The artifact store selected by ``CENXIV_ARTIFACT_STORE``."""
+    if settings.CENXIV_ARTIFACT_STORE == 'local':
+        return LocalArtifactStore(settings.CENXIV_FILE_PATH)
+    if settings.CENXIV_ARTIFACT_STORE == 's3':
+        return S3ArtifactStore(
+            settings.CENXIV_ARTIFACT_S3_BUCKET,
+            prefix=settings.CENXIV_ARTIFACT_S3_PREFIX,
+            endpoint_url=settings.CENXIV_ARTIFACT_S3_ENDPOINT_URL,
+            url_expires=settings.CENXIV_ARTIFACT_S3_URL_EXPIRES,
+        )
+    raise ImproperlyConfigured(f'Unknown CENXIV_ARTIFACT_STORE {settings.CENXIV_ARTIFACT_STORE!r}')
@@ -0,0 +1,142 @@
+"""BibTeX entries generated from the stored articles.
+
+The entries follow ``https://arxiv.org/bibtex/<id>``: an ``@misc`` entry keyed
+``<first author last name><year><first three title words>`` with stop words
+left out. An entry only depends on one version of a paper, so it is cached
+per version without expiry. Requested ids are parsed as arXiv identifiers
+first (:func:`parse_id`), anything else is refused before it reaches the
+cache keys, the database or arXiv.
+"""
+import re
+import unicodedata
+
+from django.core.cache import cache
+from django.db.models import Max, Prefetch
+
+# From arxiv-base package
+from arxiv.identifier import Identifier, IdentifierException
+
+from .models import Article, Author
+
+
+# the words arXiv leaves out of citation keys
+STOP_WORDS = {
+    'a', 'about', 'above', 'after', 'again', 'against', 'all', 'am', 'an', 'and', 'any', 'are', 'as', 'at',
+    'be', 'because', 'been', 'before', 'being', 'below', 'between', 'both', 'but', 'by',
+    'can', 'did', 'do', 'does', 'doing', 'down', 'during', 'each', 'few', 'for', 'from', 'further',
+    'had', 'has', 'have', 'having', 'he', 'her', 'here', 'hers', 'herself', 'him', 'himself', 'his', 'how',
+    'i', 'if', 'in', 'into', 'is', 'it', 'its', 'itself', 'just', 'me', 'more', 'most', 'my', 'myself',
+    'no', 'nor', 'not', 'now', 'of', 'off', 'on', 'once', 'only', 'or', 'other', 'our', 'ours', 'ourselves',
+    'out', 'over', 'own', 's', 'same', 'she', 'should', 'so', 'some', 'such', 't', 'than', 'that', 'the',
+    'their', 'theirs', 'them', 'themselves', 'then', 'there', 'these', 'they', 'this', 'those', 'through',
+    'to', 'too', 'under', 'until', 'up', 'very', 'via', 'was', 'we', 'were', 'what', 'when', 'where', 'which',
+    'while', 'who', 'whom', 'why', 'will', 'with', 'you', 'your', 'yours', 'yourself', 'yourselves',
+}
+
+BATCH_SIZE = 200
+BULK_MAX_IDS = 2000
+
+
+def _ascii_words(text):
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return re.findall(r'[a-z0-9]+', text.lower())
+
+
+def bibtex_key(article, authors):
+    last_name = (_ascii_words(authors[0].name) or [''])[-1] if authors else ''
+    title_words = [word for word in _ascii_words(article.title_en) if word not in STOP_WORDS][:3]
+    return f'{last_name}{article.updated_date.year}{"".join(title_words)}'
+
+
+def bibtex_entry(article, authors):
+    """The BibTeX entry of one stored version, ``authors`` in paper order."""
+    return (
+        f'@misc{{{bibtex_key(article, authors)},\n'
+        f'      title={{{article.title_en}}}, \n'
+        f'      author={{{" and ".join(author.name for author in authors)}}},\n'
+        f'      year={{{article.updated_date.year}}},\n'
+        f'      eprint={{{article.entry_id}}},\n'
+        f'      archivePrefix={{arXiv}},\n'
+        f'      primaryClass={{{article.primary_category}}},\n'
+        f'      url={{https://arxiv.org/abs/{article.entry_id}}}, \n'
+        f'}}\n'
+    )
+
+
+def parse_id(arxiv_id):
+    """The canonical form of the arXiv id ``arxiv_id``, with its version if given, None if it is not one."""
+    try:
+        identifier = Identifier(arxiv_id)
+    except IdentifierException:
+        return None
+    return identifier.idv if identifier.has_version else identifier.id
+
+
+def _cache_key(arxiv_idv):
+    return f'cenxiv:bibtex:{arxiv_idv}'
+
+
+def _split(arxiv_id):
+    """``(entry_id, version)`` of a requested id, version is None when not given."""
+    match = re.fullmatch(r'(.+?)v(\d+)', arxiv_id)
+    if match:
+        return match.group(1), int(match.group(2))
+    return arxiv_id, None
+
+
+def _load(wanted):
+    """Entries for ``wanted`` ``(entry_id, version)`` pairs, versionless ones resolve to the latest stored version."""
+    entry_ids = {entry_id for entry_id, _ in wanted}
+    latest = dict(
+        Article.objects.filter(source_archive='arxiv', entry_id__in=entry_ids)
+        .values_list('entry_id').annotate(latest=Max('entry_version'))
+    )
+    resolved = {
+        (entry_id, version): (entry_id, version or latest.get(entry_id))
+        for entry_id, version in wanted
+    }
+    idvs = {f'{entry_id}v{version}' for entry_id, version in resolved.values() if version}
+    articles = Article.objects.filter(source_archive='arxiv', entry_id__in=entry_ids).prefetch_related(
+        Prefetch('authors', queryset=Author.objects.order_by('id'))
+    )
+    entries = {}
+    for article in articles:
+        idv = f'{article.entry_id}v{article.entry_version}'
+        if idv in idvs:
+            entries[idv] = bibtex_entry(article, list(article.authors.all()))
+    cache.set_many({_cache_key(idv): entry for idv, entry in entries.items()}, timeout=None)
+    return {
+        requested: entries.get(f'{entry_id}v{version}')
+        for requested, (entry_id, version) in resolved.items()
+    }
+
+
+def get_bibtex(arxiv_ids):
+    """BibTeX entries for ``arxiv_ids`` (with or without version) as a dict, None for papers not stored."""
+    wanted = {arxiv_id: _split(arxiv_id) for arxiv_id in arxiv_ids}
+    cached = cache.get_many([_cache_key(arxiv_id) for arxiv_id, (_, version) in wanted.items() if version])
+    entries = {
+        arxiv_id: cached[_cache_key(arxiv_id)]
+        for arxiv_id in wanted if _cache_key(arxiv_id) in cached
+    }
+    missing = {arxiv_id: pair for arxiv_id, pair in wanted.items() if arxiv_id not in entries}
+    if missing:
+        loaded = _load(set(missing.values()))
+        entries.update((arxiv_id, loaded[pair]) for arxiv_id, pair in missing.items())
+    return entries
+
+
+def iter_bibtex(arxiv_ids):
+    """Stream the entries of many papers, ``BATCH_SIZE`` papers per query, invalid ids get a comment."""
+    arxiv_ids = list(dict.fromkeys(arxiv_ids))
+    for start in range(0, len(arxiv_ids), BATCH_SIZE):
+        batch = {arxiv_id: parse_id(arxiv_id) for arxiv_id in arxiv_ids[start:start + BATCH_SIZE]}
+        entries = get_bibtex({parsed for parsed in batch.values() if parsed})
+        for arxiv_id, parsed in batch.items():
+            if parsed is None:
+                # no line breaks of the request in the output
+                yield f'% {" ".join(arxiv_id.split())[:100]} is not an arXiv id\n\n'
+            elif entries[parsed] is None:
+                yield f'% arXiv:{parsed} not found\n\n'
+            else:
+                yield entries[parsed] + '\n'
@@ -0,0 +1,83 @@
+"""Per browse context index of the papers we hold, for prev/next navigation.
+
+Every stored paper is listed under its categories, their archives and
+``all``, with a sort key that orders ids the way arXiv numbers them (old
+style ids by year, month and number within their archive). Finding the
+previous or next paper of a context is then one indexed query.
+"""
+import re
+
+from arxiv.taxonomy.definitions import CATEGORIES
+
+from django.db.models import Q, prefetch_related_objects
+
+from .models import Article, BrowseIndexEntry
+
+
+def sort_key(entry_id):
+    """``YYYYMMNNNNNN`` of a new (``2401.00001``) or old (``hep-th/9901001``) style id, None if unparsable."""
+    match = re.fullmatch(r'(?:[a-z\-]+(?:\.[A-Z]{2})?/)?(\d{2})(\d{2})\.?(\d+)', entry_id)
+    if not match:
+        return None
+    yy, mm, number = match.groups()
+    year = 1900 + int(yy) if int(yy) >= 91 else 2000 + int(yy)
+    return f'{year}{mm}{int(number):06d}'
+
+
+def contexts_of(categories):
+    contexts = {'all'}
+    for name in categories:
+        contexts.add(name)
+        if name in CATEGORIES:
+            contexts.add(CATEGORIES[name].in_archive)
+    return contexts
+
+
+def index_articles(articles):
+    """Add the papers of ``articles`` to the index, papers already indexed are left alone."""
+    articles = [article for article in articles if article.source_archive == 'arxiv']
+    if not articles:
+        return
+    prefetch_related_objects(articles, 'categories')
+    entries = {}
+    for article in articles:
+        key = sort_key(article.entry_id)
+        if key is None:
+            continue
+        for context in contexts_of([cat.name for cat in article.categories.all()]):
+            entries[(context, article.entry_id)] = BrowseIndexEntry(context=context, entry_id=article.entry_id, sort_key=key)
+    BrowseIndexEntry.objects.bulk_create(entries.values(), ignore_conflicts=True)
+
+
+def get_sequential_id(paper_id, is_next, context):
+    """The id of the known paper before or after ``paper_id`` in ``context``, None if there is none.
+
+    ``paper_id`` is an :class:`arxiv.identifier.Identifier`, it does not have
+    to be indexed itself. Old style ids only navigate within their own
+    archive, like arXiv does.
+    """
+    key = sort_key(paper_id.id)
+    if key is None:
+        return None
+    entries = BrowseIndexEntry.objects.filter(context=context)
+    if paper_id.is_old_id:
+        entries = entries.filter(entry_id__startswith=f'{paper_id.archive}/')
+    if is_next:
+        entries = entries.filter(Q(sort_key__gt=key) | Q(sort_key=key, entry_id__gt=paper_id.id)).order_by('sort_key', 'entry_id')
+    else:
+        entries = entries.filter(Q(sort_key__lt=key) | Q(sort_key=key, entry_id__lt=paper_id.id)).order_by('-sort_key', '-entry_id')
+    return entries.values_list('entry_id', flat=True).first()
+
+
+def rebuild(batch_size=2000):
+    """Index every stored article, returns the number of articles seen."""
+    count = 0
+    batch = []
+    for article in Article.objects.filter(source_archive='arxiv').iterator(chunk_size=batch_size):
+        batch.append(article)
+        if len(batch) >= batch_size:
+            index_articles(batch)
+            count += len(batch)
+            batch = []
+    index_articles(batch)
+    return count + len(batch)
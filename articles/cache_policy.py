@@ -0,0 +1,155 @@
+"""How long each page may be cached, per route.
+
+arXiv announces new papers Sunday to Thursday at 20:00 US Eastern time, and
+most pages only change then: the new/recent listings, the current month and
+year, abs pages (a new version only appears with an announcement, and the
+versioned pages also list the versions) and the catchup page of today. They
+are cached until the next announcement. Pages that can no longer change, the
+listings of months and years that are over and catchup pages of past days,
+are cached for ``CENXIV_CACHE_IMMUTABLE_TTL`` seconds. Everything else gets
+``CENXIV_CACHE_DEFAULT_TTL`` seconds.
+
+Right after an announcement arXiv's own pages may still be updating, so for
+``CENXIV_ANNOUNCE_SETTLE`` seconds after it the announcement bound pages are
+only cached for the default time, instead of keeping an early copy until the
+next announcement.
+
+The TTL is shortened by a random jitter (see ``stampede``), so the pages
+cached right after an announcement do not all expire together, and is sent
+as ``Cache-Control`` and ``Surrogate-Control`` max-age. It is also what the
+page cache (see ``middleware``) keeps the page fresh for. The
+cache key includes the language, both from the ``/en`` and ``/zh-hans`` URL
+prefix and from Django's cache keys under ``USE_I18N``.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from functools import wraps
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.utils.cache import get_max_age, patch_cache_control
+
+from .stampede import jittered
+
+
+ANNOUNCE_TZ = ZoneInfo('America/New_York')
+ANNOUNCE_TIME = time(20, 0)
+ANNOUNCE_WEEKDAYS = {6, 0, 1, 2, 3} # Sunday to Thursday
+
+# late papers of a month are announced in the first days of the next one
+MONTH_COMPLETE_AFTER = timedelta(days=7)
+
+STALE_TTL = 60 # seconds for pages shown with stale data while arXiv is down
+
+
+def next_announcement(now=None):
+    """The aware datetime of the next arXiv announcement after ``now``."""
+    now = (now or datetime.now(timezone.utc)).astimezone(ANNOUNCE_TZ)
+    day = now.date()
+    while True:
+        announcement = datetime.combine(day, ANNOUNCE_TIME, tzinfo=ANNOUNCE_TZ)
+        if day.weekday() in ANNOUNCE_WEEKDAYS and announcement > now:
+            return announcement
+        day += timedelta(days=1)
+
+
+def last_announcement(now=None):
+    """The aware datetime of the latest arXiv announcement up to ``now``."""
+    now = (now or datetime.now(timezone.utc)).astimezone(ANNOUNCE_TZ)
+    day = now.date()
+    while True:
+        announcement = datetime.combine(day, ANNOUNCE_TIME, tzinfo=ANNOUNCE_TZ)
+        if day.weekday() in ANNOUNCE_WEEKDAYS and announcement <= now:
+            return announcement
+        day -= timedelta(days=1)
+
+
+def until_next_announcement(now=None):
+    """TTL of a page that changes with every announcement."""
+    now = now or datetime.now(timezone.utc)
+    if now - last_announcement(now) < timedelta(seconds=settings.CENXIV_ANNOUNCE_SETTLE):
+        return settings.CENXIV_CACHE_DEFAULT_TTL
+    return max(int((next_announcement(now) - now).total_seconds()), 1)
+
+
+def _announced_day(now=None):
+    """The date (US Eastern) of the latest announcement."""
+    return last_announcement(now).date()
+
+
+def _until_complete(first_day_after):
+    """TTL of a listing covering the days before ``first_day_after``."""
+    if _announced_day() >= first_day_after + MONTH_COMPLETE_AFTER:
+        return settings.CENXIV_CACHE_IMMUTABLE_TTL
+    return until_next_announcement()
+
+
+def default(request, **kwargs):
+    return settings.CENXIV_CACHE_DEFAULT_TTL
+
+
+def abs_page(request, arxiv_id='', **kwargs):
+    # versioned pages too, they show the version history and link the latest version
+    return until_next_announcement()
+
+
+def abs_extras(request, arxiv_id='', **kwargs):
+    # journal ref, DOI, trackbacks and new versions are added to any version
+    return settings.CENXIV_ABS_EXTRAS_TTL
+
+
+def listing(request, context='', subcontext='', **kwargs):
+    # imported here, the controllers need the full app loaded
+    from .controllers.list_page import year_month
+
+    if request.GET.get('year'):
+        # the archive page form, redirected by the controller
+        return settings.CENXIV_CACHE_DEFAULT_TTL
+    if subcontext in ('new', 'recent', 'pastweek', 'current'):
+        return until_next_announcement()
+    yandm = year_month(subcontext)
+    if yandm is None or yandm[0]:
+        # 'all', invalid periods and redirects
+        return settings.CENXIV_CACHE_DEFAULT_TTL
+    _, year, month = yandm
+    if month is None:
+        return _until_complete(date(year + 1, 1, 1))
+    if not 1 <= month <= 12:
+        return settings.CENXIV_CACHE_DEFAULT_TTL
+    return _until_complete(date(year + month // 12, month % 12 + 1, 1))
+
+
+def year(request, archive='', year=None, **kwargs):
+    if year is None:
+        return until_next_announcement()
+    # the monthly counts of December are final by February, see controllers/year.py
+    if _announced_day() >= date(year + 1, 2, 1):
+        return settings.CENXIV_CACHE_IMMUTABLE_TTL
+    return until_next_announcement()
+
+
+def catchup(request, subject='', date='', **kwargs):
+    try:
+        day = datetime.strptime(date, '%Y-%m-%d').date()
+    except ValueError:
+        return settings.CENXIV_CACHE_DEFAULT_TTL
+    if day < _announced_day():
+        return settings.CENXIV_CACHE_IMMUTABLE_TTL
+    return until_next_announcement()
+
+
+def cache_with_policy(policy):
+    """Let the page cache keep the view's pages for the TTL given by ``policy(request, **view_kwargs)``.
+
+    The view may already have set a shorter max-age, e.g. for a page shown
+    with stale data while arXiv is down, which is then kept.
+    """
+    def decorator(view):
+        @wraps(view)
+        def view_with_policy(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                patch_cache_control(response, public=True, max_age=jittered(policy(request, **kwargs)))
+                response['Surrogate-Control'] = f'max-age={get_max_age(response)}'
+            return response
+        return view_with_policy
+    return decorator
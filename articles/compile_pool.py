@@ -0,0 +1,185 @@
+"""Running compiles within the resources left to them by the web processes.
+
+Every compile spawns xelatex many times, and a few of them at once could
+starve the uwsgi processes of the same container or be killed by the OOM
+killer. So the compile tasks only run on dedicated workers
+(``manage.py compile_worker``, see ``config/supervisor/supervisord.conf``),
+and the general worker does not take the compile queues:
+
+* :func:`worker_concurrency` sizes the compile workers from the cores and
+  memory of the container (its cgroup limits, or the machine's), keeping
+  ``CENXIV_COMPILE_RESERVED_CORES`` and ``CENXIV_COMPILE_RESERVED_MEMORY_MB``
+  for the web, and ``CENXIV_COMPILE_MEMORY_MB`` per compile. The
+  ``compile_user`` worker runs ``CENXIV_COMPILE_USER_CONCURRENCY`` of them,
+  the worker of the other compile queues what is left.
+* :func:`run_compile` runs each compile in a child process of its own
+  (``manage.py compile_arxiv``) with lowered priority and resource limits
+  that the xelatex processes it spawns inherit (:func:`limit_this_process`):
+  ``CENXIV_COMPILE_MEMORY_MB`` of data (``RLIMIT_DATA``: the heap and
+  private mappings, not the fonts and libraries mapped from files, which an
+  address space limit would count) and ``CENXIV_COMPILE_CPU_SECONDS`` of CPU
+  per process. With ``CENXIV_COMPILE_CGROUP``, a cgroup v2 directory
+  delegated to the worker that no process lives in itself, the compile also
+  gets a cgroup of its own capping the memory and ``CENXIV_COMPILE_CPUS`` of
+  all its processes together, the memory and cpu controllers are enabled for
+  the children of the directory first. A compile running
+  longer than ``CENXIV_COMPILE_TIMEOUT`` seconds is killed with all its
+  processes.
+"""
+import os
+import sys
+import math
+import signal
+import logging
+import resource
+import subprocess
+
+from django.conf import settings
+
+from .compile_queue import USER, queue_name
+
+
+logger = logging.getLogger(__name__)
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+CPU_PERIOD = 100000 # microseconds, the cpu.max period
+STDERR_TAIL = 4000 # characters of the output of a failed compile kept in its error
+
+
+class CompileError(Exception):
+    """A compile process failed, was killed, or timed out."""
+
+
+def _read_cgroup(name):
+    try:
+        with open(f'{CGROUP_ROOT}/{name}') as f:
+            return f.read().split()
+    except OSError:
+        return None
+
+
+def available_cores():
+    """The cores this process may use, within the CPU quota of its cgroup."""
+    cores = len(os.sched_getaffinity(0))
+    quota = _read_cgroup('cpu.max')
+    if quota and quota[0] != 'max':
+        cores = min(cores, math.ceil(int(quota[0]) / int(quota[1])))
+    return cores
+
+
+def available_memory():
+    """The bytes of memory of the machine, within the limit of the cgroup of this process."""
+    memory = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    limit = _read_cgroup('memory.max')
+    if limit and limit[0] != 'max':
+        memory = min(memory, int(limit[0]))
+    return memory
+
+
+def compile_concurrency():
+    """The compiles that can run at once without starving the web processes, at least one."""
+    if settings.CENXIV_COMPILE_CONCURRENCY:
+        return settings.CENXIV_COMPILE_CONCURRENCY
+    by_cores = available_cores() - settings.CENXIV_COMPILE_RESERVED_CORES
+    by_memory = (available_memory() // 2**20 - settings.CENXIV_COMPILE_RESERVED_MEMORY_MB) // settings.CENXIV_COMPILE_MEMORY_MB
+    return max(min(by_cores, by_memory), 1)
+
+
+def worker_concurrency(queues):
+    """The concurrency of a compile worker taking ``queues``, a worker of the user queue alone takes its share first."""
+    if list(queues) == [queue_name(USER)]:
+        return settings.CENXIV_COMPILE_USER_CONCURRENCY
+    if queue_name(USER) in queues:
+        return compile_concurrency()
+    return max(compile_concurrency() - settings.CENXIV_COMPILE_USER_CONCURRENCY, 1)
+
+
+def _cgroup_path(pid):
+    return f'{settings.CENXIV_COMPILE_CGROUP}/compile-{pid}'
+
+
+def _enable_controllers():
+    """Let the children of ``CENXIV_COMPILE_CGROUP`` have memory and cpu limits."""
+    path = f'{settings.CENXIV_COMPILE_CGROUP}/cgroup.subtree_control'
+    with open(path) as f:
+        enabled = f.read().split()
+    if 'memory' not in enabled or 'cpu' not in enabled:
+        with open(path, 'w') as f:
+            f.write('+memory +cpu')
+
+
+def _join_cgroup():
+    path = _cgroup_path(os.getpid())
+    try:
+        _enable_controllers()
+        os.makedirs(path, exist_ok=True)
+        with open(f'{path}/memory.max', 'w') as f:
+            f.write(str(settings.CENXIV_COMPILE_MEMORY_MB * 2**20))
+        with open(f'{path}/cpu.max', 'w') as f:
+            f.write(f'{int(settings.CENXIV_COMPILE_CPUS * CPU_PERIOD)} {CPU_PERIOD}')
+        with open(f'{path}/cgroup.procs', 'w') as f:
+            f.write('0')
+    except OSError as e:
+        # not delegated or not cgroup v2, the rlimits still hold
+        logger.warning(f'Failed to put the compile in the cgroup {path}: {e}')
+
+
+def limit_this_process():
+    """Apply the compile limits to this process, and so to the processes it spawns."""
+    os.nice(settings.CENXIV_COMPILE_NICE)
+    memory = settings.CENXIV_COMPILE_MEMORY_MB * 2**20
+    for limit, value in ((resource.RLIMIT_DATA, memory), (resource.RLIMIT_CPU, settings.CENXIV_COMPILE_CPU_SECONDS)):
+        _, hard = resource.getrlimit(limit)
+        if hard != resource.RLIM_INFINITY:
+            value = min(value, hard)
+        resource.setrlimit(limit, (value, hard))
+    if settings.CENXIV_COMPILE_CGROUP:
+        _join_cgroup()
+
+
+def _describe(returncode):
+    if returncode >= 0:
+        return f'exit status {returncode}'
+    name = signal.Signals(-returncode).name
+    if -returncode == signal.SIGXCPU:
+        return f'{name}, more than {settings.CENXIV_COMPILE_CPU_SECONDS}s of CPU'
+    if -returncode == signal.SIGKILL:
+        return f'{name}, out of memory?'
+    return name
+
+
+def _kill(process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def run_compile(arxiv_idv, output):
+    """Translate and compile ``arxiv_idv`` into the directory ``output`` in a limited child process."""
+    command = [
+        sys.executable, str(settings.BASE_DIR / 'manage.py'), 'compile_arxiv', arxiv_idv, output, '--skip-checks',
+    ]
+    # a process group of its own, so the xelatex processes are killed with it
+    process = subprocess.Popen(command, stderr=subprocess.PIPE, text=True, errors='replace', process_group=0)
+    try:
+        _, stderr = process.communicate(timeout=settings.CENXIV_COMPILE_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        _kill(process)
+        process.communicate()
+        raise CompileError(f'The compile of arxiv:{arxiv_idv} took more than {settings.CENXIV_COMPILE_TIMEOUT}s')
+    except BaseException:
+        # the task is stopped, its compile too
+        _kill(process)
+        process.wait()
+        raise
+    finally:
+        if settings.CENXIV_COMPILE_CGROUP:
+            try:
+                os.rmdir(_cgroup_path(process.pid))
+            except OSError:
+                pass
+    if process.returncode != 0:
+        raise CompileError(f'The compile of arxiv:{arxiv_idv} failed ({_describe(process.returncode)}): {stderr[-STDERR_TAIL:]}')
+    if stderr:
+        logger.info(f'Compile of arxiv:{arxiv_idv}:\n{stderr[-STDERR_TAIL:]}')
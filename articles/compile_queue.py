@@ -0,0 +1,304 @@
+"""Queueing the compilation of Chinese PDFs by priority, each paper once.
+
+Views used to send a ``download_and_compile_arxiv`` message for every paper
+on the page, every time, and the workers only dropped the duplicates once
+they had taken the compile lock. :func:`enqueue` first skips the versions
+that are already compiled (published in the artifact store) or already queued (one
+``get_many`` of the queued markers), and takes the marker of the others with
+``cache.add``, so each version is queued once until its task finishes.
+
+The tasks go to one Celery queue per priority, highest first:
+
+* ``user``: the paper somebody is looking at, its abs page or cn-pdf link;
+* ``new``: the papers of the ``/new`` listings, just announced;
+* ``background``: everything else, recent, month and catchup listings and
+  older versions.
+
+A version queued with a lower priority is queued again when it is asked for
+with a higher one, whichever task comes first compiles it, the other finds
+the PDF. A version whose compile failed or whose worker died (see
+:func:`job_status`) is queued again once its retry time has passed, starting
+``CENXIV_COMPILE_RETRY_BACKOFF`` seconds after the failure and doubling with
+every attempt, and not at all after ``CENXIV_COMPILE_MAX_ATTEMPTS``
+attempts; until then it is not queued however often it is asked for. A dedicated worker takes the ``user`` queue, so those compiles
+never wait behind the prefetched tasks of the others (see
+``config/supervisor/supervisord.conf``).
+
+The depth of each queue is read from the broker, and the time the latest
+started task of each queue spent waiting is kept in the cache, see
+``manage.py compile_queue_stats``.
+
+Each version has a :class:`~articles.models.CompileJob` with its state
+(queued, running, failed, done) and timings, which the no_cn_pdf page polls
+through :func:`job_status`. A running compile holds a :class:`CompileLock`
+of ``CENXIV_COMPILE_LOCK_TIMEOUT`` seconds, extended by a heartbeat every
+``CENXIV_COMPILE_HEARTBEAT_INTERVAL`` seconds and released when the compile
+ends, so the lock of a killed worker is gone soon after its last heartbeat
+and the version can be compiled again.
+"""
+import re
+import time
+import uuid
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, models
+from django.utils import timezone
+
+from . import artifacts
+from .models import CompileJob
+
+
+logger = logging.getLogger(__name__)
+
+USER = 'user'
+NEW = 'new'
+BACKGROUND = 'background'
+PRIORITIES = [USER, NEW, BACKGROUND] # highest first
+
+
+def queue_name(priority):
+    """The Celery queue of ``priority``."""
+    return f'compile_{priority}'
+
+
+def _queued_key(arxiv_idv):
+    return f'cenxiv:compile_queued:{arxiv_idv}'
+
+
+def _wait_key(priority):
+    return f'cenxiv:compile_queue:last_wait:{priority}'
+
+
+def compiled(arxiv_idvs):
+    """The ``arxiv_idvs`` whose Chinese PDF is published, asking the store once for all of them."""
+    versions = {}
+    for arxiv_idv in arxiv_idvs:
+        match = re.fullmatch(r'(.+)v(\d+)', arxiv_idv)
+        if match:
+            versions[arxiv_idv] = (match[1], int(match[2]))
+    published = artifacts.store().exists_many(versions.values())
+    return {arxiv_idv for arxiv_idv, version in versions.items() if version in published}
+
+
+def is_compiled(arxiv_idv):
+    """Whether the Chinese PDF of ``arxiv_idv`` is published."""
+    return arxiv_idv in compiled([arxiv_idv])
+
+
+def retry_at(attempts, finished_at):
+    """When a compile that failed ``attempts`` times, the last at ``finished_at``, may run again, None for never."""
+    if attempts >= settings.CENXIV_COMPILE_MAX_ATTEMPTS:
+        return None
+    backoff = settings.CENXIV_COMPILE_RETRY_BACKOFF * 2 ** max(attempts - 1, 0)
+    return (finished_at or timezone.now()) + timedelta(seconds=backoff)
+
+
+def _failed_jobs(arxiv_idvs):
+    """Those of ``arxiv_idvs`` whose job failed, or is running without a heartbeat for the lock timeout.
+
+    Returns the ones to queue again, their task is gone, and the ones to
+    leave alone until their retry time, or for good after
+    ``CENXIV_COMPILE_MAX_ATTEMPTS`` attempts.
+    """
+    if not arxiv_idvs:
+        return set(), set()
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.CENXIV_COMPILE_LOCK_TIMEOUT)
+    dead, held = set(), set()
+    jobs = (
+        CompileJob.objects.filter(arxiv_idv__in=arxiv_idvs)
+        .filter(models.Q(state=CompileJob.FAILED) | models.Q(state=CompileJob.RUNNING, heartbeat_at__lt=stale))
+        .values_list('arxiv_idv', 'attempts', 'finished_at', 'heartbeat_at')
+    )
+    for arxiv_idv, attempts, finished_at, heartbeat_at in jobs:
+        retry = retry_at(attempts, finished_at or heartbeat_at)
+        if retry is None or retry > now:
+            held.add(arxiv_idv)
+        else:
+            dead.add(arxiv_idv)
+    return dead, held
+
+
+def enqueue(arxiv_idvs, priority):
+    """Queue the compilation of the ``arxiv_idvs`` not compiled or queued yet, returns those queued."""
+    if not settings.CELERY_DOWNLOAD_AND_COMPILE_ARXIV:
+        return []
+    # imported here, tasks imports the whole app
+    from .tasks import download_and_compile_arxiv
+
+    arxiv_idvs = list(dict.fromkeys(arxiv_idvs))
+    done = compiled(arxiv_idvs)
+    arxiv_idvs = [arxiv_idv for arxiv_idv in arxiv_idvs if arxiv_idv not in done]
+    dead, held = _failed_jobs(arxiv_idvs)
+    arxiv_idvs = [arxiv_idv for arxiv_idv in arxiv_idvs if arxiv_idv not in held]
+    markers = cache.get_many([_queued_key(arxiv_idv) for arxiv_idv in arxiv_idvs])
+    rank = PRIORITIES.index(priority)
+    queued = []
+    for arxiv_idv in arxiv_idvs:
+        marker = markers.get(_queued_key(arxiv_idv))
+        if arxiv_idv in dead:
+            # its task is gone, maybe without clearing the marker, queue it again
+            cache.set(_queued_key(arxiv_idv), priority, timeout=settings.CENXIV_COMPILE_QUEUED_TIMEOUT)
+        elif marker is None:
+            if not cache.add(_queued_key(arxiv_idv), priority, timeout=settings.CENXIV_COMPILE_QUEUED_TIMEOUT):
+                # queued by another request meanwhile
+                continue
+        elif PRIORITIES.index(marker) > rank:
+            # queued with a lower priority, queue it again with this one
+            cache.set(_queued_key(arxiv_idv), priority, timeout=settings.CENXIV_COMPILE_QUEUED_TIMEOUT)
+        else:
+            continue
+        queued.append(arxiv_idv)
+
+    now = timezone.now()
+    CompileJob.objects.bulk_create(
+        [CompileJob(arxiv_idv=arxiv_idv, state=CompileJob.QUEUED, priority=priority, queued_at=now) for arxiv_idv in queued],
+        update_conflicts=True, unique_fields=['arxiv_idv'], update_fields=['state', 'priority', 'queued_at'],
+    )
+    queued_at = now.timestamp()
+    for arxiv_idv in queued:
+        download_and_compile_arxiv.apply_async(
+            (arxiv_idv,), {'priority': priority, 'queued_at': queued_at}, queue=queue_name(priority),
+        )
+    return queued
+
+
+def started(arxiv_idv, priority, queued_at):
+    """Note that the compile task of ``arxiv_idv`` started, called by the task."""
+    if priority in PRIORITIES and queued_at:
+        waited = time.time() - queued_at
+        cache.set(_wait_key(priority), {'seconds': waited, 'at': time.time()}, timeout=None)
+        if priority == USER and waited > settings.CENXIV_COMPILE_USER_WAIT_WARNING:
+            logger.warning(f'Compile of arxiv:{arxiv_idv} waited {waited:.0f}s in the {queue_name(priority)} queue')
+
+
+def finished(arxiv_idv):
+    """Let ``arxiv_idv`` be queued again, called by the task once it is done."""
+    cache.delete(_queued_key(arxiv_idv))
+
+
+def _compile_lock_key(arxiv_idv):
+    return f'cenxiv:compile_lock:{arxiv_idv}'
+
+
+class CompileLock:
+    """The lock of a running compile, kept by a heartbeat while it is held.
+
+    ``acquire`` takes the lock and starts a thread that extends it and the
+    ``heartbeat_at`` of the job every ``CENXIV_COMPILE_HEARTBEAT_INTERVAL``
+    seconds, ``release`` stops the thread and frees the lock if it is still
+    ours. When the worker dies the lock expires
+    ``CENXIV_COMPILE_LOCK_TIMEOUT`` seconds after the last heartbeat.
+    """
+
+    def __init__(self, arxiv_idv):
+        self.arxiv_idv = arxiv_idv
+        self.key = _compile_lock_key(arxiv_idv)
+        self.token = uuid.uuid4().hex
+        self._stop = threading.Event()
+        self._thread = None
+
+    def acquire(self):
+        if not cache.add(self.key, self.token, timeout=settings.CENXIV_COMPILE_LOCK_TIMEOUT):
+            return False
+        self._thread = threading.Thread(target=self._beat, name=f'compile-heartbeat-{self.arxiv_idv}', daemon=True)
+        self._thread.start()
+        return True
+
+    def _beat(self):
+        try:
+            while not self._stop.wait(settings.CENXIV_COMPILE_HEARTBEAT_INTERVAL):
+                try:
+                    if cache.get(self.key) != self.token:
+                        logger.warning(f'Lost the compile lock of arxiv:{self.arxiv_idv}')
+                        return
+                    cache.touch(self.key, timeout=settings.CENXIV_COMPILE_LOCK_TIMEOUT)
+                    CompileJob.objects.filter(arxiv_idv=self.arxiv_idv).update(heartbeat_at=timezone.now())
+                except Exception as e:
+                    # the next beat tries again, the lock outlives a few missed ones
+                    logger.warning(f'Heartbeat of the compile of arxiv:{self.arxiv_idv} failed: {e}')
+        finally:
+            # the connection of this thread, nobody else would close it
+            connection.close()
+
+    def release(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if cache.get(self.key) == self.token:
+            cache.delete(self.key)
+
+
+def job_started(arxiv_idv, priority):
+    """Mark the job of ``arxiv_idv`` running, called by the task once it holds the lock."""
+    now = timezone.now()
+    job, _ = CompileJob.objects.get_or_create(arxiv_idv=arxiv_idv, defaults={'priority': priority or '', 'queued_at': now})
+    CompileJob.objects.filter(pk=job.pk).update(
+        state=CompileJob.RUNNING, started_at=now, heartbeat_at=now, finished_at=None, error='',
+        attempts=models.F('attempts') + 1,
+    )
+
+
+def job_finished(arxiv_idv, error=''):
+    """Mark the job of ``arxiv_idv`` done, or failed with ``error`` or without a PDF."""
+    if not error and not is_compiled(arxiv_idv):
+        error = 'The compile produced no PDF.'
+    CompileJob.objects.filter(arxiv_idv=arxiv_idv).update(
+        state=CompileJob.FAILED if error else CompileJob.DONE, finished_at=timezone.now(), error=error[:10000],
+    )
+
+
+def job_status(arxiv_idv):
+    """The state and timings of the compile of ``arxiv_idv`` for the status endpoint."""
+    if is_compiled(arxiv_idv):
+        return {'arxiv_idv': arxiv_idv, 'state': CompileJob.DONE}
+    job = CompileJob.objects.filter(arxiv_idv=arxiv_idv).first()
+    if job is None:
+        return {'arxiv_idv': arxiv_idv, 'state': None}
+
+    state, retry = job.state, None
+    if state == CompileJob.RUNNING and job.heartbeat_at < timezone.now() - timedelta(seconds=settings.CENXIV_COMPILE_LOCK_TIMEOUT):
+        # the worker died without a word, its lock is gone too
+        state = CompileJob.FAILED
+    elif state == CompileJob.DONE:
+        # the PDF was removed since
+        state = None
+    if state == CompileJob.FAILED:
+        retry = retry_at(job.attempts, job.finished_at or job.heartbeat_at)
+    return {
+        'arxiv_idv': arxiv_idv,
+        'state': state,
+        'attempts': job.attempts,
+        'retry_at': retry,
+        'queued_at': job.queued_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
+
+
+def queue_depths():
+    """The number of messages waiting in each compile queue, None when the broker can not tell."""
+    from cenxiv.celery import app
+
+    depths = {}
+    with app.connection_for_read() as connection:
+        channel = connection.default_channel
+        for priority in PRIORITIES:
+            try:
+                depths[priority] = channel.queue_declare(queue=queue_name(priority), passive=True).message_count
+            except Exception as e:
+                # not declared yet, or not a broker that counts
+                logger.info(f'No depth for {queue_name(priority)}: {e}')
+                depths[priority] = None
+                channel = connection.channel()
+    return depths
+
+
+def last_waits():
+    """How long the latest started task of each priority waited, with when it started."""
+    waits = cache.get_many([_wait_key(priority) for priority in PRIORITIES])
+    return {priority: waits.get(_wait_key(priority)) for priority in PRIORITIES}
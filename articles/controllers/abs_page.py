@@ -9,9 +9,6 @@ from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import urljoin
 # import requests
-import openai
-from bs4 import BeautifulSoup
-from celery import group
 
 from http import HTTPStatus as status
 from dateutil import parser
@@ -19,9 +16,11 @@ from dateutil.tz import tzutc
 from flask import request, url_for, current_app
 from werkzeug.exceptions import InternalServerError
 
-import django
 from django.utils.translation import get_language
 from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils.html import format_html
 
 import arxivapi  # The PyPI arxiv package
 
@@ -72,29 +71,33 @@ from browse.controllers.response_headers import mime_header_date
 # from browse.formatting.metatags import meta_tag_metadata
 
 from . import check_supplied_identifier
-from ..models import Article, Author, Category, Link
-from ..tasks import download_and_compile_arxiv
+from ..abs_extras import get_abs_extras
+from ..models import Article
+from .. import compile_queue
+from ..tasks import ingest_arxiv_versions_task
 from ..templatetags import article_filters
-from ..utils import get_translation_dict, request_get, chinese_week_days, truncate_for_model, translate_latex_paragraph
-from ..translators import translator
+from ..upstream import arxiv_client
+from ..utils import get_translation_dict, chinese_week_days, ingest_arxiv_versions
 
 
 logger = logging.getLogger(__name__)
 
-tl = settings.TRANSLATOR
-
 Response = Tuple[Dict[str, Any], int, Dict[str, Any]]
 
 truncate_author_list_size = 100
 
 
-def get_abs_page(request, arxiv_id: str) -> Response:
+def get_abs_page(request, arxiv_id: str, defer_extras: bool = True) -> Response:
     """Get abs page data from the document metadata service.
 
     Parameters
     ----------
     arxiv_id : str
         The arXiv identifier as provided in the request.
+    defer_extras : bool
+        When the extras scraped from the arXiv abs page are not cached, render
+        with local stand-ins and let the page load them from
+        :func:`abstract_extras` instead of waiting for arXiv.
     download_format_pref: str
         Download format preference.
 
@@ -138,257 +141,39 @@ def get_abs_page(request, arxiv_id: str) -> Response:
         )
         response_data["requested_id"] = request_id
 
-        # Create the search client
-        client = arxivapi.Client()
-
-        # Create the search query
-        # first search for the latest version
-        search = arxivapi.Search(id_list=[arxiv_identifier.id])
-        result = list(client.results(search))[0]
-
-        # arxiv_id, latest_version = result.entry_id.split('/')[-1].split('v')
-        arxiv_id, latest_version = result.entry_id.split(r'/abs/')[-1].rsplit('v', 1)
-        latest_version = int(latest_version)
+        arxiv_id = arxiv_identifier.id
         if 'v' in request_id.split('/')[-1]:
             request_version = int(request_id.rsplit('v', 1)[-1])
         else:
+            request_version = None
+
+        # render from the local store when the paper is there, arXiv is asked
+        # for newer versions in the background at most every
+        # CENXIV_ABS_VERSION_CHECK_INTERVAL seconds
+        articles = {article.entry_version: article for article in Article.objects.for_entry(arxiv_id)}
+        stored_all_versions = bool(articles) and len(articles) == max(articles)
+        if stored_all_versions and (request_version is None or request_version in articles):
+            if cache.add(f'cenxiv:abs_versions_checked:{arxiv_id}', 'checked', timeout=settings.CENXIV_ABS_VERSION_CHECK_INTERVAL):
+                ingest_arxiv_versions_task.delay(arxiv_id)
+        else:
+            # first search for the latest version
+            client = arxiv_client()
+            search = arxivapi.Search(id_list=[arxiv_id])
+            result = list(client.results(search))[0]
+            latest_version = int(result.entry_id.split(r'/abs/')[-1].rsplit('v', 1)[-1])
+            if request_version is not None and request_version > latest_version:
+                raise AbsVersionNotFoundException(f'arxiv:{arxiv_id}v{request_version}')
+            articles = ingest_arxiv_versions(arxiv_id, result)
+        latest_version = max(articles)
+        if request_version is None:
             request_version = latest_version
 
-        # use celery to download and compile pdfs asynchronously
-        if settings.CELERY_DOWNLOAD_AND_COMPILE_ARXIV:
-            processing_group = group(download_and_compile_arxiv.s(f'{arxiv_id}v{v}') for v in range(1, latest_version+1))
-            processing_group.apply_async()
-
-        # text_translator = translate.TextTranslator(tl, 'en', 'zh-CN')
-        # latex_translator = translate.LatexTranslator(text_translator, debug=False, threads=0)
-
-        retries = 3
-        retry = 0
-        while True:
-            if retry >= retries:
-                msg = f'Failed to translate article arxiv:{arxiv_id}v{latest_version} after {retries} retries'
-                logger.error(msg)
-                raise Exception(msg)
-
-            try:
-                article = Article.objects.get(source_archive='arxiv', entry_id=arxiv_id, entry_version=latest_version)
-                if request_version == latest_version:
-                    request_article = article
-                break
-            except Article.DoesNotExist:
-                try:
-                    # title_cn = latex_translator.translate_full_latex(result.title, make_complete=False).strip()
-                    # abstract_cn = latex_translator.translate_full_latex(result.summary, make_complete=False).strip()
-                    try:
-                        title_cn = translate_latex_paragraph(result.title, tl)
-                    except openai.BadRequestError as e:
-                        if e.status_code == 400: # data may contain inappropriate content
-                            title_cn = 'TO_BE_TRANSLATED: ' + result.title
-                        else:
-                            raise
-                    try:
-                        abstract_cn = translate_latex_paragraph(result.summary, tl)
-                    except openai.BadRequestError as e:
-                        if e.status_code == 400: # data may contain inappropriate content
-                            abstract_cn = 'TO_BE_TRANSLATED: ' + result.summary
-                        else:
-                            raise
-                    comment_cn = None
-                    journal_ref_cn = None
-                    if result.comment:
-                        try:
-                            comment_cn = translator(tl)(result.comment.replace('\n', ' '))
-                        except openai.BadRequestError as e:
-                            if e.status_code == 400: # data may contain inappropriate content
-                                comment_cn = 'TO_BE_TRANSLATED: ' + result.comment
-                            else:
-                                raise
-                    if result.journal_ref:
-                        try:
-                            journal_ref_cn = translator(tl)(result.journal_ref.replace('\n', ' '))
-                        except openai.BadRequestError as e:
-                            if e.status_code == 400: # data may contain inappropriate content
-                                journal_ref_cn = 'TO_BE_TRANSLATED: ' + result.journal_ref
-                            else:
-                                raise
-                    # title_cn = '中文标题'
-                    # abstract_cn = '中文摘要'
-                    logger.info(f'Successfully translated arxiv:{arxiv_id}v{latest_version}.')
-                except Exception as e:
-                    logger.warning(f'Failed to translate arxiv:{arxiv_id}v{latest_version} due to {e}, will retry latter.')
-                    retry += 1
-                    continue
-
-                data = dict(
-                    entry_id=arxiv_id,
-                    entry_version=latest_version,
-                    title_en=result.title,
-                    title_cn=title_cn,
-                    abstract_en=result.summary,
-                    abstract_cn=abstract_cn,
-                    published_date=result.published,
-                    updated_date=result.updated,
-                    comment_en=result.comment,
-                    comment_cn=comment_cn,
-                    journal_ref_en=result.journal_ref,
-                    journal_ref_cn=journal_ref_cn,
-                    doi=result.doi,
-                    primary_category=result.primary_category,
-                )
-                # 截断超长字符串
-                truncated_data = truncate_for_model(Article, data)
-                article = Article(**truncated_data)
-                try:
-                    article.save()
-                except django.db.utils.IntegrityError:
-                    # already exist in db
-                    pass
-
-                for author in result.authors:
-                    author_ = Author(name=author.name, article=article)
-                    try:
-                        author_.save()
-                    except django.db.utils.IntegrityError:
-                        # already exist in db
-                        pass
-                for category in result.categories:
-                    category_ = Category(name=category, article=article)
-                    try:
-                        category_.save()
-                    except django.db.utils.IntegrityError:
-                        # already exist in db
-                        pass
-                for link in result.links:
-                    link_ = Link(url=link.href, article=article)
-                    try:
-                        link_.save()
-                    except django.db.utils.IntegrityError:
-                        # already exist in db
-                        pass
-
-                if request_version == latest_version:
-                    request_article = article
-
-                break
-
-        # then search for all other latest versions
-        versions = list(range(1, latest_version))
-        retry = 0
-        while versions:
-            if retry >= retries:
-                msg = f'Failed to translate versions {versions} of the article arxiv:{arxiv_id} after {retries} retries'
-                logger.error(msg)
-                raise Exception(msg)
-
-            for version in list(versions):  # Copy the versions list so we can alter it.
-                try:
-                    article = Article.objects.get(source_archive='arxiv', entry_id=arxiv_id, entry_version=version)
-                    if request_version == version:
-                        request_article = article
-                except Article.DoesNotExist:
-                    search = arxivapi.Search(id_list=[f'{arxiv_id}v{version}'])
-                    result = list(client.results(search))[0]
-
-                    try:
-                        # title_cn = latex_translator.translate_full_latex(result.title, make_complete=False).strip()
-                        # abstract_cn = latex_translator.translate_full_latex(result.summary, make_complete=False).strip()
-                        try:
-                            title_cn = translate_latex_paragraph(result.title, tl)
-                        except openai.BadRequestError as e:
-                            if e.status_code == 400: # data may contain inappropriate content
-                                title_cn = 'TO_BE_TRANSLATED: ' + result.title
-                            else:
-                                raise
-                        try:
-                            abstract_cn = translate_latex_paragraph(result.summary, tl)
-                        except openai.BadRequestError as e:
-                            if e.status_code == 400: # data may contain inappropriate content
-                                abstract_cn = 'TO_BE_TRANSLATED: ' + result.summary
-                            else:
-                                raise
-                        comment_cn = None
-                        journal_ref_cn = None
-                        if result.comment:
-                            try:
-                                comment_cn = translator(tl)(result.comment.replace('\n', ' '))
-                            except openai.BadRequestError as e:
-                                if e.status_code == 400: # data may contain inappropriate content
-                                    comment_cn = 'TO_BE_TRANSLATED: ' + result.comment
-                                else:
-                                    raise
-                        if result.journal_ref:
-                            try:
-                                journal_ref_cn = translator(tl)(result.journal_ref.replace('\n', ' '))
-                            except openai.BadRequestError as e:
-                                if e.status_code == 400: # data may contain inappropriate content
-                                    journal_ref_cn = 'TO_BE_TRANSLATED: ' + result.journal_ref
-                                else:
-                                    raise
-                        # title_cn = '中文标题'
-                        # abstract_cn = '中文摘要'
-                        logger.info(f'Successfully translated arxiv:{arxiv_id}v{version}.')
-                    except Exception as e:
-                        logger.warning(f'Failed to translate arxiv:{arxiv_id}v{version} due to {e}, will retry latter.')
-                        continue
-
-                    data = dict(
-                        entry_id=arxiv_id,
-                        entry_version=version,
-                        title_en=result.title,
-                        title_cn=title_cn,
-                        abstract_en=result.summary,
-                        abstract_cn=abstract_cn,
-                        published_date=result.published,
-                        updated_date=result.updated,
-                        comment_en=result.comment,
-                        comment_cn=comment_cn,
-                        journal_ref_en=result.journal_ref,
-                        journal_ref_cn=journal_ref_cn,
-                        doi=result.doi,
-                        primary_category=result.primary_category,
-                    )
-                    # 截断超长字符串
-                    truncated_data = truncate_for_model(Article, data)
-                    article = Article(**truncated_data)
-                    try:
-                        article.save()
-                    except django.db.utils.IntegrityError:
-                        # already exist in db
-                        pass
-
-                    for author in result.authors:
-                        author_ = Author(name=author.name, article=article)
-                        try:
-                            author_.save()
-                        except django.db.utils.IntegrityError:
-                            # already exist in db
-                            pass
-                    for category in result.categories:
-                        category_ = Category(name=category, article=article)
-                        try:
-                            category_.save()
-                        except django.db.utils.IntegrityError:
-                            # already exist in db
-                            pass
-                    for link in result.links:
-                        link_ = Link(url=link.href, article=article)
-                        try:
-                            link_.save()
-                        except django.db.utils.IntegrityError:
-                            # already exist in db
-                            pass
-
-                    if request_version == version:
-                        request_article = article
-
-                versions.remove(version)
-
-            retry += 1
-
+        # use celery to download and compile pdfs asynchronously, the version looked at first
+        compile_queue.enqueue([f'{arxiv_id}v{request_version}'], compile_queue.USER)
+        compile_queue.enqueue([f'{arxiv_id}v{v}' for v in range(1, latest_version+1)], compile_queue.BACKGROUND)
 
         # get article of the request_version
-        # article = Article.objects.get(source_archive='arxiv', entry_id=arxiv_id, entry_version=request_version)
-        article = request_article
+        article = articles[request_version]
 
         language = get_language()
 
@@ -419,7 +204,7 @@ def get_abs_page(request, arxiv_id: str) -> Response:
                 VersionEntry(
                     version=version,
                     raw="",
-                    submitted_date=Article.objects.get(source_archive='arxiv', entry_id=arxiv_id, entry_version=version).updated_date,
+                    submitted_date=articles[version].updated_date,
                     size_kilobytes=0,
                     source_flag=''
                 ) for version in range(1, latest_version+1)
@@ -498,144 +283,32 @@ def get_abs_page(request, arxiv_id: str) -> Response:
         # response_data["primary_archive"] = primary_archive
         # response_data["primary_category"] = primary_category
 
-        url = request.get_full_path()
-        url = url.replace('/en', '')
-        url = url.replace('/zh-hans', '')
-        arxiv_url = 'https://arxiv.org' + url
-        retries = 3
-        retry_delay = 0.5
-        response = request_get(arxiv_url, retries=retries, retry_delay=retry_delay)
-        if not response:
-            msg = f"Failed to fetch URL: {arxiv_url} after {retries} attempts."
-            # logger.error(msg)
-            raise Exception(msg)
-        soup = BeautifulSoup(response.content, 'lxml')
-
-        meta_tags = soup.find_all('meta')
-
-        div_content_inner = soup.find('div', {'id': 'content-inner'})
-        authors_div = div_content_inner.find('div', {'class': 'authors'})
-        abs_meta.author_list = str(authors_div)
-        # metadata related
-        msc_class_td = div_content_inner.find('td', {'class': "tablecell msc-classes"})
-        if msc_class_td:
-            response_data['msc_class'] = msc_class_td.string
-        acm_class_td = div_content_inner.find('td', {'class': "tablecell acm-classes"})
-        if acm_class_td:
-            response_data['acm_class'] = acm_class_td.string
-        report_number_td = div_content_inner.find('td', {'class': "tablecell jref"}) # jref may be wrong
-        if report_number_td:
-            response_data['report_number'] = report_number_td.string
-        # datacite doi related
-        datacite_doi_td = div_content_inner.find('td', {'class': "tablecell arxivdoi"})
-        doi_a = datacite_doi_td.find('a', {'id': "arxiv-doi-link"})
-        doi_link = doi_a['href']
-        response_data['doi_link'] = doi_link
-        if not 'pending' in datacite_doi_td.find('div', {'id': "more-info-desc-1"}).text:
-            response_data['datacite_doi'] = True
-        # journal ref
-        journal_ref_td = div_content_inner.find('td', {'class': "tablecell jref"})
-        if journal_ref_td:
-            response_data['journal_ref'] = journal_ref_td.string
-        # doi
-        doi_td = div_content_inner.find('td', {'class': "tablecell doi"})
-        if doi_td:
-            response_data['doi'] = str(doi_td.contents[0])
-
-        # for a in div_content_inner.find_all('a'):
-        #     if a.get('href', ''):
-        #         a['href'] = a['href'].replace('https://arxiv.org', '')
-
-        # if get_language() == 'zh-hans':
-        #     div_content_inner.find('h1', {'class': "title mathjax"}).span.next_sibling.replace_with(article.title_cn)
-        #     div_content_inner.find('blockquote', {'class': "abstract mathjax"}).span.next_sibling.replace_with(article.abstract_cn)
-
-        div_submission_history = soup.find('div', {'class': 'submission-history'})
-        submitter_name = ''
-        show_email_link = ''
-        br_idx = 0
-        for i, ct in enumerate(div_submission_history.contents):
-            if ct.string and 'From: ' in ct.string.strip():
-                submitter_name = ct.string.strip().replace('From: ', '').replace(' [', '')
-            if ct.string and ct.string == 'view email' and ct.get('href', ''):
-                show_email_link = ct['href']
-            if ct.name == 'br':
-                br_idx = i
-                break
-        submission_history_entries = [ str(ct) for ct in div_submission_history.contents[br_idx:] ]
-        response_data['submitter_name'] = submitter_name
-        response_data['show_email_link'] = show_email_link
-        response_data['submission_history_entries'] = submission_history_entries
-
-        div_extra_services = soup.find('div', {'class': 'extra-services'})
-        # for img in div_extra_services.find_all('img'):
-        #     if img.get('src', ''):
-        #         img['src'] = re.sub(r'/static/browse/[\d.]+/images/', '/static/images/', img['src'])
-        # div_extra_alink = div_extra_services.find('a', {'id': 'bib-cite-css'})
-        # div_extra_alink['href'] = re.sub(r'/static/browse/[\d.]+/css/', '/static/css/', div_extra_alink['href'])
-
-        # ancillary_files related
-        ancillary_files_div = div_extra_services.find('div', {'class': "ancillary"})
-        if ancillary_files_div:
-            response_data['ancillary_files'] = True
-        # TODO: need some further work for anc_file_list
-        # trackback_ping_count
-        trackback_ping_count_div = div_extra_services.find('div', {'class': "extra-general"})
-        if trackback_ping_count_div:
-            response_data['trackback_ping_count'] = int(trackback_ping_count_div.find('h3').text.strip().split(' ')[0])
-        # dblp
-        # dblp_div = div_extra_services.find('div', {'class': "dblp"})
-        # if dblp_div:
-        #     # response_data['dblp'] = True
-        # TODO: work for dblp
-
-        # latexml_link = ''
-        format_list = ['cn-pdf']
-        lis = div_extra_services.find('ul').find_all('li')
-        for li in lis:
-            if 'PDF' in li.text:
-                format_list.append('pdf')
-            if 'HTML' in li.text and 'experimental' in li.text:
-                format_list.append('latexml')
-                # latexml_link = li.a['href']
-            if 'Source' in li.text:
-                format_list.append('src')
-            if 'HTML' in li.text and (not 'experimental' in li.text):
-                format_list.append('html')
-            if 'Other' in li.text:
-                format_list.append('other')
-        response_data['format_list'] = format_list
-
-        # for license
-        license_effective_uri = ''
-        license_icon_uri_path = ''
-        license_div = div_extra_services.find('div', {'class': "abs-license"})
-        license_a = license_div.find('a')
-        if license_a:
-            license_effective_uri = license_a['href']
-            if 'has_license' in license_a.get('class', []): # return a list
-                license_icon_uri_path = license_a.find('img')['src']
-        response_data['license_effective_uri'] = license_effective_uri
-        response_data['license_icon_uri_path'] = license_icon_uri_path
-
-        # for browse
-        response_data['browse_context'] = div_extra_services.find('div', {'class': 'browse'}).find('div', {'class': 'current'}).string
-
-        browse_context_previous_url = None
-        browse_context_next_url = None
-        prevnext_div = div_extra_services.find('div', {'class': 'prevnext'})
-        prev_a = prevnext_div.find('a', {'class': "abs-button prev-url"})
-        if prev_a:
-            browse_context_previous_url = prev_a['href']
-        next_a = prevnext_div.find('a', {'class': "abs-button next-url"})
-        if next_a:
-            browse_context_next_url = next_a['href']
-
-        response_data['browse_context_previous_url'] = browse_context_previous_url
-        response_data['browse_context_next_url'] = browse_context_next_url
-        response_data['yyyymm'] = div_extra_services.find('div', {'class': 'list'}).find('a', {'class': "abs-button abs-button-grey abs-button-small context-id"}).string
-
-        response_data['meta_tags'] = [ str(mt) for mt in meta_tags ]
+        # extras scraped from the arXiv abs page, cached per version (see abs_extras)
+        context = request.GET.get('context', '')
+        if not re.fullmatch(r'[\w.\-]*', context):
+            context = ''
+        extras = get_abs_extras(f'{arxiv_id}v{request_version}', context, fetch=not defer_extras)
+        response_data['extras_deferred'] = extras is None
+        if extras is None:
+            extras = _local_extras(article, abs_meta, context)
+            response_data['extras_url'] = reverse('articles:abstract_extras', kwargs={'arxiv_id': request_id}) + (f'?context={context}' if context else '')
+        # set when arXiv is unreachable and the extras are older than CENXIV_ABS_EXTRAS_TTL
+        response_data['stale_since'] = extras.get('stale_since')
+        abs_meta.author_list = extras['author_list']
+        for name in ['msc_class', 'acm_class', 'report_number', 'journal_ref', 'doi', 'trackback_ping_count']:
+            if extras[name] is not None:
+                response_data[name] = extras[name]
+        for name in ['datacite_doi', 'ancillary_files']:
+            if extras[name]:
+                response_data[name] = True
+        for name in [
+            'doi_link', 'submitter_name', 'show_email_link', 'submission_history_entries', 'format_list',
+            'license_effective_uri', 'license_icon_uri_path',
+            'browse_context', 'browse_context_previous_url', 'browse_context_next_url', 'yyyymm', 'meta_tags',
+        ]:
+            response_data[name] = extras[name]
+        submitter_name = extras['submitter_name']
+        submission_history_entries = extras['submission_history_entries']
         # response_data['div_content_inner'] = str(div_content_inner)
         # response_data['div_submission_history'] = str(div_submission_history)
         # response_data['div_extra_services'] = str(div_extra_services)
@@ -661,10 +334,15 @@ def get_abs_page(request, arxiv_id: str) -> Response:
         # if response_data['latexml_url'] is not None:
         #     response_data['formats'].insert(1, 'latexml')
 
-        sh_entries = [ entry for entry in submission_history_entries if 'KB' in entry ]
-        pattern = r"\(([\d,]+) KB\)"
-        matches = [ re.search(pattern, text) for text in sh_entries ]
-        kbs = [ match.group(1) if match else 0 for match in matches ]
+        if response_data['extras_deferred']:
+            # sizes and withdrawals are only known from arXiv
+            sh_entries = [''] * latest_version
+            kbs = [None] * latest_version
+        else:
+            sh_entries = [ entry for entry in submission_history_entries if 'KB' in entry ]
+            pattern = r"\(([\d,]+) KB\)"
+            matches = [ re.search(pattern, text) for text in sh_entries ]
+            kbs = [ match.group(1) if match else 0 for match in matches ]
         if language == 'zh-hans':
             sh_dates = [ (chinese_week_days[abs_meta.version_history[v].submitted_date.weekday()] + '， ' + abs_meta.version_history[v].submitted_date.strftime('%Y 年 %-m 月 %-d 日 %H:%M:%S %Z')) for v in range(0, latest_version) ]
         else:
@@ -824,6 +502,38 @@ def _get_req_header(header: str) -> Optional[str]:
     return next((value for key, value in request.headers.items()
                  if key.lower() == header.lower()), None)
 
+def _local_extras(article: Article, abs_meta: DocMetadata, context: str) -> Dict[str, Any]:
+    """Stand-ins for the arXiv abs page extras, built from the stored article."""
+    browse_context = context or abs_meta.primary_category.id
+    prevnext_url = f"{reverse('articles:previous_next')}?id={article.entry_id}&context={browse_context}&function="
+    return {
+        'author_list': format_html(
+            '<div class="authors"><span class="descriptor">Authors:</span>{}</div>',
+            ', '.join(author.name for author in article.authors.all()),
+        ),
+        'msc_class': None,
+        'acm_class': None,
+        'report_number': None,
+        'submitter_name': '',
+        'show_email_link': '',
+        'license_effective_uri': None,
+        'license_icon_uri_path': None,
+        'ancillary_files': False,
+        'yyyymm': article.published_date.strftime('%Y-%m'),
+        'doi_link': None,
+        'datacite_doi': False,
+        'journal_ref': article.journal_ref_en,
+        'doi': format_html('<a href="https://doi.org/{}">{}</a>', article.doi, article.doi) if article.doi else None,
+        'submission_history_entries': [],
+        'trackback_ping_count': None,
+        'format_list': ['cn-pdf', 'pdf'],
+        'browse_context': browse_context,
+        'browse_context_previous_url': prevnext_url + 'prev',
+        'browse_context_next_url': prevnext_url + 'next',
+        'meta_tags': [],
+    }
+
+
 def _check_legacy_id_params(request, arxiv_id: str) -> str:
     """Check for legacy request parameters related to old arXiv identifiers.
 
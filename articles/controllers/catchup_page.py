@@ -9,7 +9,6 @@ from typing import Tuple, Union, Dict, Any, List
 from datetime import date, datetime, timedelta
 # import requests
 from bs4 import BeautifulSoup
-from celery import group
 import concurrent.futures
 
 from http import HTTPStatus
@@ -17,35 +16,80 @@ from http import HTTPStatus
 from werkzeug.exceptions import BadRequest
 
 from django.urls import reverse
-from django.conf import settings
 from django.utils.translation import get_language
 from django.utils.translation import gettext_lazy as _
 
 import arxivapi  # The PyPI arxiv package
 
-from arxiv.document.metadata import DocMetadata
 from arxiv.integration.fastly.headers import add_surrogate_key
 from arxiv.taxonomy.category import Group, Archive, Category
 from arxiv.taxonomy.definitions import CATEGORIES, ARCHIVES, GROUPS, ARCHIVES_ACTIVE
-from arxiv.document.version import VersionEntry
-from arxiv.document.metadata import DocMetadata, AuthorList as AuList
 
 # from browse.controllers.archive_page.by_month_form import MONTHS
 from browse.controllers.list_page import latexml_links_for_articles, dl_for_articles, authors_for_articles, Response
 from browse.services.database.catchup import get_catchup_data, CATCHUP_LIMIT, get_next_announce_day
 from browse.services.listing import ListingNew, ListingItem, gen_expires
 
-from .list_page import sub_sections_for_types
-from ..models import Article#, Author, Category, Link
-from ..tasks import download_and_compile_arxiv
-from ..templatetags import article_filters
-from ..utils import get_translation_dict, chinese_week_days, request_get, translate_and_save_article
+from .list_page import parse_listing_entries, sub_sections_for_types
+from ..listing_rows import listing_docs
+from .. import singleflight
+from .. import compile_queue
+from ..upstream import arxiv_client
+from ..utils import chinese_week_days, translate_and_save_article
 from .archive_page.by_month_form import MONTHS
 # from ..translators import translator
 
 
 logger = logging.getLogger(__name__)
 
+
+def _parse_catchup_page(content: bytes) -> Dict[str, Any]:
+    soup = BeautifulSoup(content, 'lxml')
+    count = 0
+    next_announce_day = None
+
+    # Define the regex pattern to match the text and capture count and date
+    pattern = r'Total of (\d+) entries for (\w{3}, \s*\d{2} \w{3} \d{4})'
+    # Find the div that matches the regex pattern
+    target_div = soup.find('div', {'id': 'dlpage'}).find('div')
+    if target_div:
+        # Extract the text from the div
+        text = target_div.text.strip()
+
+        # Use regex to extract count and date
+        match = re.search(pattern, text)
+        if match:
+            count = int(match.group(1))  # Extract the count
+        #     date_str = match.group(2)     # Extract the date string
+
+        #     print(f"Count: {count}, Date: {date_str}")
+        # else:
+        #     print("No match found in the div text.")
+
+        # get next_day
+        next_day_alink = target_div.find('a')
+        if next_day_alink:
+            next_announce_day = next_day_alink['href'].split('?')[0].split('/')[-1]
+    # else:
+        # print("Div not found.")
+
+    if count > 0:
+        new_start = int(soup.find('a', text="New submissions")['href'].replace('#item', ''))
+        cross_start = int(soup.find('a', text="Cross-lists")['href'].replace('#item', ''))
+        rep_start = int(soup.find('a', text="Replacements")['href'].replace('#item', ''))
+    else:
+        new_start = cross_start = rep_start = None
+
+    return {
+        'count': count,
+        'next_announce_day': next_announce_day,
+        'new_start': new_start,
+        'cross_start': cross_start,
+        'rep_start': rep_start,
+        'entries': parse_listing_entries(soup) if count > 0 else [],
+    }
+
+
 def get_catchup_page(request, subject_str:str, date:str)-> Response:
     """get the catchup page for a given set of request parameters
     see process_catchup_params for details on parameters
@@ -90,59 +134,22 @@ def get_catchup_page(request, subject_str:str, date:str)-> Response:
     # response_data['downloads'] = dl_for_articles(listing.listings)
     # response_data['latexml'] = latexml_links_for_articles(listing.listings)
 
-    count = 0
-    next_announce_day = None
-
     url = request.get_full_path()
     url = url.replace('/en', '')
     url = url.replace('/zh-hans', '')
     arxiv_url = 'https://arxiv.org' + url
     retries = 3
     retry_delay = 0.5
-    response = request_get(arxiv_url, retries=retries, retry_delay=retry_delay)
-    if not response:
-        msg = f"Failed to fetch URL: {arxiv_url} after {retries} attempts."
-        # logger.error(msg)
-        raise Exception(msg)
-    soup = BeautifulSoup(response.content, 'lxml')
-
-    # Define the regex pattern to match the text and capture count and date
-    pattern = r'Total of (\d+) entries for (\w{3}, \s*\d{2} \w{3} \d{4})'
-    # Find the div that matches the regex pattern
-    target_div = soup.find('div', {'id': 'dlpage'}).find('div')
-    if target_div:
-        # Extract the text from the div
-        text = target_div.text.strip()
-
-        # Use regex to extract count and date
-        match = re.search(pattern, text)
-        if match:
-            count = int(match.group(1))  # Extract the count
-        #     date_str = match.group(2)     # Extract the date string
-
-        #     print(f"Count: {count}, Date: {date_str}")
-        # else:
-        #     print("No match found in the div text.")
-
-        # get next_day
-        next_day_alink = target_div.find('a')
-        if next_day_alink:
-            next_announce_day = next_day_alink['href'].split('?')[0].split('/')[-1]
-    # else:
-        # print("Div not found.")
+    parsed = singleflight.fetch(arxiv_url, _parse_catchup_page, retries=retries, retry_delay=retry_delay)
+    count, next_announce_day = parsed['count'], parsed['next_announce_day']
 
     if count > 0:
-        new_start = int(soup.find('a', text="New submissions")['href'].replace('#item', ''))
-        cross_start = int(soup.find('a', text="Cross-lists")['href'].replace('#item', ''))
-        rep_start = int(soup.find('a', text="Replacements")['href'].replace('#item', ''))
-
-        paper_ids = []
-        atags = soup.find_all('a', {'title': 'Abstract'})
-        for atag in atags:
-            paper_ids.append(atag['id'])
+        new_start, cross_start, rep_start = parsed['new_start'], parsed['cross_start'], parsed['rep_start']
+        entries = parsed['entries']
+        paper_ids = [entry['paper_id'] for entry in entries]
 
         # Create the search client
-        client = arxivapi.Client()
+        client = arxiv_client()
 
         # Create the search query
         results = []
@@ -154,9 +161,7 @@ def get_catchup_page(request, subject_str:str, date:str)-> Response:
         # arxiv_idvs = [ result.entry_id.split('/')[-1] for result in results ]
         arxiv_idvs = [ result.entry_id.split(r'/abs/')[-1] for result in results ]
         # use celery to download and compile pdfs asynchronously
-        if settings.CELERY_DOWNLOAD_AND_COMPILE_ARXIV:
-            processing_group = group(download_and_compile_arxiv.s(arxiv_idv) for arxiv_idv in arxiv_idvs)
-            processing_group.apply_async()
+        compile_queue.enqueue(arxiv_idvs, compile_queue.BACKGROUND)
 
         retry = 0
         while results:
@@ -236,11 +241,8 @@ def get_catchup_page(request, subject_str:str, date:str)-> Response:
         cross_count = rep_start - cross_start
         rep_count = len(paper_ids) - new_count - cross_count
 
-        dts = soup.find_all('dt')
-        # dds = soup.find_all('dd')
-        authors_divs = soup.find_all('div', {'class': 'list-authors'})
-
         # organize results into expected listing
+        docs = listing_docs(arxiv_idvs, language)
         items = []
         for i, paper_id in enumerate(paper_ids):
             if i < new_count:
@@ -250,8 +252,6 @@ def get_catchup_page(request, subject_str:str, date:str)-> Response:
             else:
                 listing_type = 'rep'
 
-            article = Article.objects.filter(source_archive='arxiv', entry_id=paper_id).order_by('entry_version').last()
-
             # dt = dts[i]
             # new_a = soup.new_tag('a', attrs={'href': f"/cn-pdf/{paper_id}", 'title': "Download Chinese PDF", 'id': f"cn-pdf-{paper_id}", 'aria-labelledby': f"cn-pdf-{paper_id}"})
             # if get_language() == 'zh-hans':
@@ -269,80 +269,19 @@ def get_catchup_page(request, subject_str:str, date:str)-> Response:
             #     if dd.p:
             #         dd.p.string = article.abstract_cn
 
-            arxiv_id, version = article.entry_id, article.entry_version
-            primary_cat = CATEGORIES[article.primary_category]
-            secondary_cats = [ CATEGORIES[sc.name] for sc in article.categories.all() if sc.name in CATEGORIES ]
-            modified = max(article.updated_date, article.published_date)
-
-            doc = DocMetadata(
-                arxiv_id=arxiv_id,
-                arxiv_id_v=f'{arxiv_id}v{version}',
-                title=article.title_cn if language == 'zh-hans' else article.title_en,
-                authors=AuList(', '.join([ author.name for author in article.authors.all() ])),
-                abstract=article.abstract_cn if language == 'zh-hans' else article.abstract_en,
-                categories=[ cat.name for cat in article.categories.all() ],
-                primary_category=primary_cat,
-                secondary_categories=secondary_cats,
-                comments=article.comment_cn if language == 'zh-hans' else article.comment_en,
-                journal_ref=article.journal_ref_cn if language == 'zh-hans' else article.journal_ref_en,
-                version=version,
-                version_history=[
-                    VersionEntry(
-                        version=version,
-                        raw="",
-                        submitted_date=None, # type: ignore
-                        size_kilobytes=0,
-                        source_flag=''
-                    )
-                ],
-                raw_safe="",
-                submitter=None, # type: ignore
-                arxiv_identifier=None, # type: ignore
-                primary_archive=primary_cat.get_archive(),
-                primary_group=primary_cat.get_archive().get_group(),
-                modified=modified
-            )
+            doc = docs[i]
+            if doc is None:
+                # not stored, logged by listing_docs
+                continue
+            arxiv_id = doc.arxiv_id
+            primary_cat = doc.primary_category
+
+            if entries[i]['latexml_link']:
+                doc.latexml_link = entries[i]['latexml_link']
+            if entries[i]['other_link']:
+                doc.other_link = entries[i]['other_link']
 
-            a_html = dts[i].find('a', string='html')
-            if a_html:
-                doc.latexml_link = a_html['href']
-            a_other = dts[i].find('a', string='other')
-            if a_other:
-                doc.other_link = a_other['href']
-
-            doc.authors_list = str(authors_divs[i])
-            doc.primary_display = doc.primary_category.display()
-            doc.secondaries_display = doc.display_secondaries()
-
-            doc.title_other_language = article.title_en if language == 'zh-hans' else article.title_cn
-            doc.abstract_other_language = article.abstract_en if language == 'zh-hans' else article.abstract_cn
-            doc.show_title_text = '显示英文标题' if language == 'zh-hans' else 'Show Chinese title'
-            doc.hide_title_text = '隐藏英文标题' if language == 'zh-hans' else 'Hide Chinese title'
-            doc.show_abstract_text = '显示英文摘要' if language == 'zh-hans' else 'Show Chinese abstract'
-            doc.hide_abstract_text = '隐藏英文摘要' if language == 'zh-hans' else 'Hide Chinese abstract'
-
-            if language == 'zh-hans':
-                translation_dict = get_translation_dict()
-                # Define the regex pattern
-                pattern = r'^(.*?) \((.*?)\)$'
-
-                # Use re.search to find matches
-                match = re.search(pattern, doc.primary_display)
-                if match:
-                    # Extract the two groups
-                    cat_full_name = match.group(1)  # e.g. 'High Energy Astrophysical Phenomena'
-                    category = match.group(2)  # e.g. 'astro-ph.HE'
-                    cat_full_name_cn = article_filters.dict_get_key(translation_dict, cat_full_name)
-                    doc.primary_display = f'{cat_full_name_cn} ({category})'
-
-                for i, secondary_display in enumerate(doc.secondaries_display):
-                    match = re.search(pattern, secondary_display)
-                    if match:
-                        # Extract the two groups
-                        cat_full_name = match.group(1)  # e.g. 'High Energy Astrophysical Phenomena'
-                        category = match.group(2)  # e.g. 'astro-ph.HE'
-                        cat_full_name_cn = article_filters.dict_get_key(translation_dict, cat_full_name)
-                        doc.secondaries_display[i] = f'{cat_full_name_cn} ({category})'
+            doc.authors_list = entries[i]['authors_list']
 
             item = ListingItem(
                 id=arxiv_id,
@@ -39,7 +39,6 @@ Differences from legacy arxiv:
 Doesn't handle the /view path.
 """
 import time
-import glob
 import calendar
 import logging
 import math
@@ -50,7 +49,6 @@ import re
 import itertools
 # import requests
 from bs4 import BeautifulSoup
-from celery import group
 import concurrent.futures
 
 import arxivapi  # The PyPI arxiv package
@@ -58,30 +56,30 @@ import arxivapi  # The PyPI arxiv package
 # From arxiv-base package
 from arxiv.taxonomy.definitions import CATEGORIES, ARCHIVES_SUBSUMED, ARCHIVES
 from arxiv.integration.fastly.headers import add_surrogate_key
-from arxiv.document.version import VersionEntry#, SourceFlag
-from arxiv.document.metadata import DocMetadata, AuthorList as AuList
+from arxiv.document.metadata import DocMetadata
 from arxiv.formats import formats_from_source_flag
 
 from browse.controllers.abs_page import truncate_author_list_size
 # from browse.controllers.list_page.paging import paging
 from browse.formatting.search_authors import AuthorList, queries_for_authors, split_long_author_list
 from browse.services.documents import get_doc_service
-from browse.services.listing import Listing, ListingNew, NotModifiedResponse, get_listing_service, ListingItem, gen_expires
+from browse.services.listing import Listing, ListingNew, NotModifiedResponse, ListingItem, gen_expires
 # from browse.services.listing import db_listing
 from browse.formatting.latexml import get_latexml_url, get_latexml_urls_for_articles
 
 from django.urls import reverse
-from django.conf import settings
 from django.http import HttpResponseBadRequest
-from django.core.cache import cache
+from django.core.cache import caches
 from django.utils.translation import get_language
 from django.utils.translation import gettext_lazy as _
 
 from .paging import paging
-from ...models import Article#, Author, Category, Link
-from ...tasks import download_and_compile_arxiv
-from ...templatetags import article_filters
-from ...utils import get_translation_dict, chinese_week_days, request_get, translate_and_save_article
+from ...listing_rows import listing_docs
+from ... import artifacts, compile_queue, result_codec
+from ... import singleflight
+from ... import upstream
+from ...upstream import arxiv_client
+from ...utils import chinese_week_days, translate_and_save_article
 # from ...translators import translator
 
 
@@ -211,13 +209,15 @@ def get_listing(request, subject_or_category: str, time_period: str, skip: str =
 
     response_data: Dict[str, Any] = {}
     response_headers: Dict[str, Any] = {}
+    # set when arXiv is unreachable and the last good listing is shown
+    stale_since = None
 
     if time_period == 'new':
         list_type = 'new'
         response_headers = add_surrogate_key(response_headers, ["list-new", "announce", f"list-new-{list_ctx_id}"])
 
         # items, dts, dds = get_new_listing(request, list_ctx_id, skipn, shown)
-        items = get_new_listing(request, list_ctx_id, skipn, shown)
+        items, stale_since = upstream.with_fallback(request.get_full_path(), lambda: get_new_listing(request, list_ctx_id, skipn, shown))
         if _check_modified(items.listings, if_mod_since):
             new_resp = NotModifiedResponse(True, gen_expires())
         else:
@@ -239,7 +239,7 @@ def get_listing(request, subject_or_category: str, time_period: str, skip: str =
         response_headers = add_surrogate_key(response_headers, ["list-recent", "announce", f"list-recent-{list_ctx_id}"])
 
         # items, dts, dds = get_recent_listing(request, list_ctx_id, skipn, shown)
-        items = get_recent_listing(request, list_ctx_id, skipn, shown)
+        items, stale_since = upstream.with_fallback(request.get_full_path(), lambda: get_recent_listing(request, list_ctx_id, skipn, shown))
         if _check_modified(items.listings, if_mod_since):
             rec_resp = NotModifiedResponse(True, gen_expires())
         else:
@@ -318,7 +318,7 @@ def get_listing(request, subject_or_category: str, time_period: str, skip: str =
                 list_year += 1900
 
             # items, dts, dds = get_articles_for_month(request, list_ctx_id, time_period, list_year, list_month, skipn, shown)
-            items = get_articles_for_month(request, list_ctx_id, time_period, list_year, list_month, skipn, shown)
+            items, stale_since = upstream.with_fallback(request.get_full_path(), lambda: get_articles_for_month(request, list_ctx_id, time_period, list_year, list_month, skipn, shown))
             if _check_modified(items.listings, if_mod_since):
                 resp = NotModifiedResponse(True, gen_expires())
             else:
@@ -336,7 +336,7 @@ def get_listing(request, subject_or_category: str, time_period: str, skip: str =
                 list_year += 1900
 
             # items, dts, dds = get_articles_for_month(request, list_ctx_id, time_period, list_year, None, skipn, shown)
-            items = get_articles_for_month(request, list_ctx_id, time_period, list_year, None, skipn, shown)
+            items, stale_since = upstream.with_fallback(request.get_full_path(), lambda: get_articles_for_month(request, list_ctx_id, time_period, list_year, None, skipn, shown))
             if _check_modified(items.listings, if_mod_since):
                 resp = NotModifiedResponse(True, gen_expires())
             else:
@@ -390,6 +390,7 @@ def get_listing(request, subject_or_category: str, time_period: str, skip: str =
         'list_ctx_in_archive': list_ctx_in_archive,
         'paging': paging(count, skipn, shown, list_ctx_id, time_period),
         'viewing_all': shown >= count,
+        'stale_since': stale_since,
         'template': type_to_template[list_type]
     })
 
@@ -500,7 +501,8 @@ def authors_for_article(article: DocMetadata)->Dict[str, Any]:
 
 def authors_for_articles(listings: List[Any])->Dict[str, Any]:
     """Returns a Dict of article id to author links."""
-    return {item.article.arxiv_id_v: author_links(item.article)
+    # Items hydrated from listing rows come with their author links.
+    return {item.article.arxiv_id_v: getattr(item.article, 'author_links', None) or author_links(item.article)
             for item in listings}
 
 
@@ -706,22 +708,37 @@ def _check_modified(items: List[ListingItem], if_modified_since: Optional[str] =
                 return True
     return False
 
-def get_new_listing(request, archive_or_cat: str, skip: int, show: int) -> ListingNew:
-    "Gets the most recent day of listings for an archive or category"
-    language = get_language()
+def parse_listing_entries(soup) -> List[Dict[str, Any]]:
+    """The papers of an arXiv listing page in page order, with the links and author list we show from it."""
+    entries = []
+    dts = soup.find_all('dt')
+    # dds = soup.find_all('dd')
+    authors_divs = soup.find_all('div', {'class': 'list-authors'})
+    atags = soup.find_all('a', {'title': 'Abstract'})
+    for atag, dt, authors_div in zip(atags, dts, authors_divs):
+        a_html = dt.find('a', string='html')
+        a_other = dt.find('a', string='other')
+        entries.append({
+            'paper_id': atag['id'],
+            'latexml_link': a_html['href'] if a_html else None,
+            'other_link': a_other['href'] if a_other else None,
+            'authors_list': str(authors_div),
+        })
+    return entries
+
+
+def _parse_total(soup) -> int:
+    paging_div = soup.find('div', class_='paging')
+    total = 0
+    if paging_div:
+        match = re.search(r'Total of (\d+) entries', paging_div.text)
+        if match:
+            total = int(match.group(1))
+    return total
 
-    url = request.get_full_path()
-    url = url.replace('/en', '')
-    url = url.replace('/zh-hans', '')
-    arxiv_url = 'https://arxiv.org' + url
-    retries = 3
-    retry_delay = 0.5
-    response = request_get(arxiv_url, retries=retries, retry_delay=retry_delay)
-    if not response:
-        msg = f"Failed to fetch URL: {arxiv_url} after {retries} attempts."
-        # logger.error(msg)
-        raise Exception(msg)
-    soup = BeautifulSoup(response.content, 'lxml')
+
+def _parse_new_listing(content: bytes) -> Dict[str, Any]:
+    soup = BeautifulSoup(content, 'lxml')
     # Find the specific h3 containing the target text
     target_h3 = soup.find('h3', string=re.compile(r'Showing new listings for'))
     # Extract the date part using regex
@@ -731,13 +748,7 @@ def get_new_listing(request, archive_or_cat: str, skip: int, show: int) -> Listi
     # print('announced:', announced)
 
     # get the number of total entries
-    paging_div = soup.find('div', class_='paging')
-    total = 0
-    if paging_div:
-        match = re.search(r'Total of (\d+) entries', paging_div.text)
-        if match:
-            total = int(match.group(1))
-
+    total = _parse_total(soup)
 
     new_start = 1
     cross_start = 1
@@ -762,40 +773,89 @@ def get_new_listing(request, archive_or_cat: str, skip: int, show: int) -> Listi
     cross_count = rep_start - cross_start
     rep_count = total - new_count - cross_count
 
+    return {
+        'announced': announced,
+        'new_count': new_count,
+        'cross_count': cross_count,
+        'rep_count': rep_count,
+        'entries': parse_listing_entries(soup),
+    }
 
-    paper_ids = []
-    atags = soup.find_all('a', {'title': 'Abstract'})
-    for atag in atags:
-        paper_ids.append(atag['id'])
 
-    results = []
-    uncached_inds = []
-    uncached_pids = []
-    for i, pid in enumerate(paper_ids):
-        cache_key = f"{announced.strftime('%Y%m%d')}_{pid}"
-        result = cache.get(cache_key)
-        if result:
-            results.append(result)
-        else:
-            results.append(None)
-            uncached_inds.append(i)
-            uncached_pids.append(pid)
+def _parse_recent_listing(content: bytes) -> Dict[str, Any]:
+    soup = BeautifulSoup(content, 'lxml')
+    total = _parse_total(soup)
+
+    # Find all <a> tags that are inside <li> tags that are inside <ul> tags
+    skip_dates = []
+    a_links = soup.select('ul li a')
+    for link in a_links:
+        # Extract skip number
+        href = link.get('href', '')
+        skip_match = re.search(r'skip=(\d+)', href)
+        if skip_match:
+            skip_number = int(skip_match.group(1))
+            # Extract date
+            date_text = link.text.strip()
+            try:
+                date = datetime.strptime(date_text, '%a, %d %b %Y')
+                skip_dates.append((skip_number, date))
+            except ValueError as e:
+                print(f"Error parsing date '{date_text}': {e}")
+
+    daily_counts = []
+    num_dates = len(skip_dates)
+    for i in range(num_dates):
+        next_skip = skip_dates[i+1][0] if i < num_dates - 1 else total
+        day, number = skip_dates[i][1], next_skip - skip_dates[i][0]
+        daily_counts.append((day, number))
+
+    return {'total': total, 'daily_counts': daily_counts, 'entries': parse_listing_entries(soup)}
+
+
+def _parse_month_listing(content: bytes) -> Dict[str, Any]:
+    soup = BeautifulSoup(content, 'lxml')
+    return {'total': _parse_total(soup), 'entries': parse_listing_entries(soup)}
+
+
+def get_new_listing(request, archive_or_cat: str, skip: int, show: int) -> ListingNew:
+    "Gets the most recent day of listings for an archive or category"
+    language = get_language()
+
+    url = request.get_full_path()
+    url = url.replace('/en', '')
+    url = url.replace('/zh-hans', '')
+    arxiv_url = 'https://arxiv.org' + url
+    retries = 3
+    page = singleflight.fetch(arxiv_url, _parse_new_listing, retries=retries, retry_delay=0.5)
+    announced = page['announced']
+    new_count, cross_count, rep_count = page['new_count'], page['cross_count'], page['rep_count']
+    entries = page['entries']
+    paper_ids = [entry['paper_id'] for entry in entries]
+
+    def cache_key(pid):
+        return result_codec.cache_key('cenxiv:announced', announced.strftime('%Y%m%d'), pid)
+
+    # the results of an announcement are read by every new listing page
+    hot_cache = caches['hot']
+    cached = {
+        key: result_codec.decode(data)
+        for key, data in hot_cache.get_many([cache_key(pid) for pid in paper_ids]).items()
+    }
+    uncached_pids = [pid for pid in paper_ids if cache_key(pid) not in cached]
 
     if len(uncached_pids) > 0:
         # Create the search client
-        client = arxivapi.Client()
+        client = arxiv_client()
 
         # build cache
         for pids in itertools.batched(uncached_pids, 200):
             search = arxivapi.Search(id_list=pids)
-            for pid, result in zip(pids, client.results(search)):
-                cache_key = f"{announced.strftime('%Y%m%d')}_{pid}"
-                cache.set(cache_key, result, 3*24*3600) # cache for 3 days
+            fetched = {cache_key(pid): result for pid, result in zip(pids, client.results(search))}
+            hot_cache.set_many({key: result_codec.encode(result) for key, result in fetched.items()}, 3*24*3600) # cache for 3 days
+            cached.update(fetched)
 
-        # get results from cache
-        for ui, pid in zip(uncached_inds, uncached_pids):
-            cache_key = f"{announced.strftime('%Y%m%d')}_{pid}"
-            results[ui] = cache.get(cache_key)
+    results = [cached.get(cache_key(pid)) for pid in paper_ids]
 
     # # Create the search query
     # results = []
@@ -815,9 +875,7 @@ def get_new_listing(request, archive_or_cat: str, skip: int, show: int) -> Listi
     # arxiv_idvs = [ result.entry_id.split('/')[-1] for result in results ]
     arxiv_idvs = [ result.entry_id.split(r'/abs/')[-1] for result in results ]
     # use celery to download and compile pdfs asynchronously
-    if settings.CELERY_DOWNLOAD_AND_COMPILE_ARXIV:
-        processing_group = group(download_and_compile_arxiv.s(arxiv_idv) for arxiv_idv in arxiv_idvs)
-        processing_group.apply_async()
+    compile_queue.enqueue(arxiv_idvs, compile_queue.NEW)
 
 
     oks = [False] * len(results)
@@ -843,11 +901,9 @@ def get_new_listing(request, archive_or_cat: str, skip: int, show: int) -> Listi
         retry += 1
 
 
-    dts = soup.find_all('dt')
-    # dds = soup.find_all('dd')
-    authors_divs = soup.find_all('div', {'class': 'list-authors'})
 
     # organize results into expected listing
+    docs = listing_docs([f'{article.entry_id}v{article.entry_version}' for article in results], language)
     items = []
     for i, paper_id in enumerate(paper_ids):
         if skip + i < new_count:
@@ -858,7 +914,6 @@ def get_new_listing(request, archive_or_cat: str, skip: int, show: int) -> Listi
             listing_type = 'rep'
 
         # article = Article.objects.filter(source_archive='arxiv', entry_id=paper_id).order_by('entry_version').last()
-        article = results[i]
 
         # dt = dts[i]
         # new_a = soup.new_tag('a', attrs={'href': f"/cn-pdf/{paper_id}", 'title': "Download Chinese PDF", 'id': f"cn-pdf-{paper_id}", 'aria-labelledby': f"cn-pdf-{paper_id}"})
@@ -877,79 +932,19 @@ def get_new_listing(request, archive_or_cat: str, skip: int, show: int) -> Listi
         #     if dd.p:
         #         dd.p.string = article.abstract_cn
 
-        arxiv_id, version = article.entry_id, article.entry_version
-        primary_cat = CATEGORIES[article.primary_category]
-        secondary_cats = [ CATEGORIES[sc.name] for sc in article.categories.all() if sc.name in CATEGORIES ]
-        modified = max(article.updated_date, article.published_date)
-        doc = DocMetadata(
-            arxiv_id=arxiv_id,
-            arxiv_id_v=f'{arxiv_id}v{version}',
-            title=article.title_cn if language == 'zh-hans' else article.title_en,
-            authors=AuList(', '.join([ author.name for author in article.authors.all() ])),
-            abstract=article.abstract_cn if language == 'zh-hans' else article.abstract_en,
-            categories=[ cat.name for cat in article.categories.all() ],
-            primary_category=primary_cat,
-            secondary_categories=secondary_cats,
-            comments=article.comment_cn if language == 'zh-hans' else article.comment_en,
-            journal_ref=article.journal_ref_cn if language == 'zh-hans' else article.journal_ref_en,
-            version=version,
-            version_history=[
-                VersionEntry(
-                    version=version,
-                    raw="",
-                    submitted_date=None, # type: ignore
-                    size_kilobytes=0,
-                    source_flag=''
-                )
-            ],
-            raw_safe="",
-            submitter=None, # type: ignore
-            arxiv_identifier=None, # type: ignore
-            primary_archive=primary_cat.get_archive(),
-            primary_group=primary_cat.get_archive().get_group(),
-            modified=modified
-        )
+        doc = docs[i]
+        if doc is None:
+            # not stored, logged by listing_docs
+            continue
+        arxiv_id = doc.arxiv_id
+        primary_cat = doc.primary_category
 
-        a_html = dts[i].find('a', string='html')
-        if a_html:
-            doc.latexml_link = a_html['href']
-        a_other = dts[i].find('a', string='other')
-        if a_other:
-            doc.other_link = a_other['href']
+        if entries[i]['latexml_link']:
+            doc.latexml_link = entries[i]['latexml_link']
+        if entries[i]['other_link']:
+            doc.other_link = entries[i]['other_link']
 
-        doc.authors_list = str(authors_divs[i])
-        doc.primary_display = doc.primary_category.display()
-        doc.secondaries_display = doc.display_secondaries()
-
-        doc.title_other_language = article.title_en if language == 'zh-hans' else article.title_cn
-        doc.abstract_other_language = article.abstract_en if language == 'zh-hans' else article.abstract_cn
-        doc.show_title_text = '显示英文标题' if language == 'zh-hans' else 'Show Chinese title'
-        doc.hide_title_text = '隐藏英文标题' if language == 'zh-hans' else 'Hide Chinese title'
-        doc.show_abstract_text = '显示英文摘要' if language == 'zh-hans' else 'Show Chinese abstract'
-        doc.hide_abstract_text = '隐藏英文摘要' if language == 'zh-hans' else 'Hide Chinese abstract'
-
-        if language == 'zh-hans':
-            translation_dict = get_translation_dict()
-            # Define the regex pattern
-            pattern = r'^(.*?) \((.*?)\)$'
-
-            # Use re.search to find matches
-            match = re.search(pattern, doc.primary_display)
-            if match:
-                # Extract the two groups
-                cat_full_name = match.group(1)  # e.g. 'High Energy Astrophysical Phenomena'
-                category = match.group(2)  # e.g. 'astro-ph.HE'
-                cat_full_name_cn = article_filters.dict_get_key(translation_dict, cat_full_name)
-                doc.primary_display = f'{cat_full_name_cn} ({category})'
-
-            for i, secondary_display in enumerate(doc.secondaries_display):
-                match = re.search(pattern, secondary_display)
-                if match:
-                    # Extract the two groups
-                    cat_full_name = match.group(1)  # e.g. 'High Energy Astrophysical Phenomena'
-                    category = match.group(2)  # e.g. 'astro-ph.HE'
-                    cat_full_name_cn = article_filters.dict_get_key(translation_dict, cat_full_name)
-                    doc.secondaries_display[i] = f'{cat_full_name_cn} ({category})'
+        doc.authors_list = entries[i]['authors_list']
 
         item = ListingItem(
             id=arxiv_id,
@@ -975,51 +970,12 @@ def get_recent_listing(request, archive_or_cat: str, skip: int, show: int) -> Li
     url = url.replace('/zh-hans', '')
     arxiv_url = 'https://arxiv.org' + url
     retries = 3
-    retry_delay = 0.5
-    response = request_get(arxiv_url, retries=retries, retry_delay=retry_delay)
-    if not response:
-        msg = f"Failed to fetch URL: {arxiv_url} after {retries} attempts."
-        # logger.error(msg)
-        raise Exception(msg)
-    soup = BeautifulSoup(response.content, 'lxml')
-    paging_div = soup.find('div', class_='paging')
-    total = 0
-    if paging_div:
-        match = re.search(r'Total of (\d+) entries', paging_div.text)
-        if match:
-            total = int(match.group(1))
-
-    # Find all <a> tags that are inside <li> tags that are inside <ul> tags
-    skip_dates = []
-    a_links = soup.select('ul li a')
-    for link in a_links:
-        # Extract skip number
-        href = link.get('href', '')
-        skip_match = re.search(r'skip=(\d+)', href)
-        if skip_match:
-            skip_number = int(skip_match.group(1))
-            # Extract date
-            date_text = link.text.strip()
-            try:
-                date = datetime.strptime(date_text, '%a, %d %b %Y')
-                skip_dates.append((skip_number, date))
-            except ValueError as e:
-                print(f"Error parsing date '{date_text}': {e}")
-
-    daily_counts = []
-    num_dates = len(skip_dates)
-    for i in range(num_dates):
-        next_skip = skip_dates[i+1][0] if i < num_dates - 1 else total
-        day, number = skip_dates[i][1], next_skip - skip_dates[i][0]
-        daily_counts.append((day, number))
-
-    paper_ids = []
-    atags = soup.find_all('a', {'title': 'Abstract'})
-    for atag in atags:
-        paper_ids.append(atag['id'])
+    page = singleflight.fetch(arxiv_url, _parse_recent_listing, retries=retries, retry_delay=0.5)
+    total, daily_counts, entries = page['total'], page['daily_counts'], page['entries']
+    paper_ids = [entry['paper_id'] for entry in entries]
 
     # Create the search client
-    client = arxivapi.Client()
+    client = arxiv_client()
 
     # Create the search query
     results = []
@@ -1031,9 +987,7 @@ def get_recent_listing(request, archive_or_cat: str, skip: int, show: int) -> Li
     # arxiv_idvs = [ result.entry_id.split('/')[-1] for result in results ]
     arxiv_idvs = [ result.entry_id.split(r'/abs/')[-1] for result in results ]
     # use celery to download and compile pdfs asynchronously
-    if settings.CELERY_DOWNLOAD_AND_COMPILE_ARXIV:
-        processing_group = group(download_and_compile_arxiv.s(arxiv_idv) for arxiv_idv in arxiv_idvs)
-        processing_group.apply_async()
+    compile_queue.enqueue(arxiv_idvs, compile_queue.BACKGROUND)
 
 
     oks = [False] * len(results)
@@ -1111,15 +1065,12 @@ def get_recent_listing(request, archive_or_cat: str, skip: int, show: int) -> Li
 
         # retry += 1
 
-    dts = soup.find_all('dt')
-    # dds = soup.find_all('dd')
-    authors_divs = soup.find_all('div', {'class': 'list-authors'})
 
     # organize results into expected listing
+    docs = listing_docs([f'{article.entry_id}v{article.entry_version}' for article in results], language)
     items = []
     for i, paper_id in enumerate(paper_ids):
         # article = Article.objects.filter(source_archive='arxiv', entry_id=paper_id).order_by('entry_version').last()
-        article = results[i]
 
         # dt = dts[i]
         # new_a = soup.new_tag('a', attrs={'href': f"/cn-pdf/{paper_id}", 'title': "Download Chinese PDF", 'id': f"cn-pdf-{paper_id}", 'aria-labelledby': f"cn-pdf-{paper_id}"})
@@ -1139,82 +1090,22 @@ def get_recent_listing(request, archive_or_cat: str, skip: int, show: int) -> Li
         #         dd.p.string = article.abstract_cn
 
         listing_type = 'new' # need to get the correct 'new' or 'cross'
-        arxiv_id, version = article.entry_id, article.entry_version
-        primary_cat = CATEGORIES[article.primary_category]
-        secondary_cats = [ CATEGORIES[sc.name] for sc in article.categories.all() if sc.name in CATEGORIES ]
-        modified = max(article.updated_date, article.published_date)
-        doc = DocMetadata(
-            arxiv_id=arxiv_id,
-            arxiv_id_v=f'{arxiv_id}v{version}',
-            title=article.title_cn if language == 'zh-hans' else article.title_en,
-            authors=AuList(', '.join([ author.name for author in article.authors.all() ])),
-            abstract=article.abstract_cn if language == 'zh-hans' else article.abstract_en,
-            categories=[ cat.name for cat in article.categories.all() ],
-            primary_category=primary_cat,
-            secondary_categories=secondary_cats,
-            comments=article.comment_cn if language == 'zh-hans' else article.comment_en,
-            journal_ref=article.journal_ref_cn if language == 'zh-hans' else article.journal_ref_en,
-            version=version,
-            version_history=[
-                VersionEntry(
-                    version=version,
-                    raw="",
-                    submitted_date=None, # type: ignore
-                    size_kilobytes=0,
-                    source_flag=''
-                )
-            ],
-            raw_safe="",
-            submitter=None, # type: ignore
-            arxiv_identifier=None, # type: ignore
-            primary_archive=primary_cat.get_archive(),
-            primary_group=primary_cat.get_archive().get_group(),
-            modified=modified
-        )
+        doc = docs[i]
+        if doc is None:
+            # not stored, logged by listing_docs
+            continue
+        arxiv_id = doc.arxiv_id
+        primary_cat = doc.primary_category
 
         if doc.primary_category.in_archive  != archive_or_cat:
             listing_type = 'cross'
 
-        a_html = dts[i].find('a', string='html')
-        if a_html:
-            doc.latexml_link = a_html['href']
-        a_other = dts[i].find('a', string='other')
-        if a_other:
-            doc.other_link = a_other['href']
-
-        doc.authors_list = str(authors_divs[i])
-        doc.primary_display = doc.primary_category.display()
-        doc.secondaries_display = doc.display_secondaries()
-
-        doc.title_other_language = article.title_en if language == 'zh-hans' else article.title_cn
-        doc.abstract_other_language = article.abstract_en if language == 'zh-hans' else article.abstract_cn
-        doc.show_title_text = '显示英文标题' if language == 'zh-hans' else 'Show Chinese title'
-        doc.hide_title_text = '隐藏英文标题' if language == 'zh-hans' else 'Hide Chinese title'
-        doc.show_abstract_text = '显示英文摘要' if language == 'zh-hans' else 'Show Chinese abstract'
-        doc.hide_abstract_text = '隐藏英文摘要' if language == 'zh-hans' else 'Hide Chinese abstract'
+        if entries[i]['latexml_link']:
+            doc.latexml_link = entries[i]['latexml_link']
+        if entries[i]['other_link']:
+            doc.other_link = entries[i]['other_link']
 
-        if language == 'zh-hans':
-            translation_dict = get_translation_dict()
-            # Define the regex pattern
-            pattern = r'^(.*?) \((.*?)\)$'
-
-            # Use re.search to find matches
-            match = re.search(pattern, doc.primary_display)
-            if match:
-                # Extract the two groups
-                cat_full_name = match.group(1)  # e.g. 'High Energy Astrophysical Phenomena'
-                category = match.group(2)  # e.g. 'astro-ph.HE'
-                cat_full_name_cn = article_filters.dict_get_key(translation_dict, cat_full_name)
-                doc.primary_display = f'{cat_full_name_cn} ({category})'
-
-            for i, secondary_display in enumerate(doc.secondaries_display):
-                match = re.search(pattern, secondary_display)
-                if match:
-                    # Extract the two groups
-                    cat_full_name = match.group(1)  # e.g. 'High Energy Astrophysical Phenomena'
-                    category = match.group(2)  # e.g. 'astro-ph.HE'
-                    cat_full_name_cn = article_filters.dict_get_key(translation_dict, cat_full_name)
-                    doc.secondaries_display[i] = f'{cat_full_name_cn} ({category})'
+        doc.authors_list = entries[i]['authors_list']
 
         item = ListingItem(
             id=arxiv_id,
@@ -1245,27 +1136,12 @@ def get_articles_for_month(request, archive_or_cat: str, time_period: str, year:
     url = url.replace('/zh-hans', '')
     arxiv_url = 'https://arxiv.org' + url
     retries = 3
-    retry_delay = 0.5
-    response = request_get(arxiv_url, retries=retries, retry_delay=retry_delay)
-    if not response:
-        msg = f"Failed to fetch URL: {arxiv_url} after {retries} attempts."
-        # logger.error(msg)
-        raise Exception(msg)
-    soup = BeautifulSoup(response.content, 'lxml')
-    paging_div = soup.find('div', class_='paging')
-    total = 0
-    if paging_div:
-        match = re.search(r'Total of (\d+) entries', paging_div.text)
-        if match:
-            total = int(match.group(1))
-
-    paper_ids = []
-    atags = soup.find_all('a', {'title': 'Abstract'})
-    for atag in atags:
-        paper_ids.append(atag['id'])
+    page = singleflight.fetch(arxiv_url, _parse_month_listing, retries=retries, retry_delay=0.5)
+    total, entries = page['total'], page['entries']
+    paper_ids = [entry['paper_id'] for entry in entries]
 
     # Create the search client
-    client = arxivapi.Client()
+    client = arxiv_client()
 
     # Create the search query
     results = []
@@ -1277,9 +1153,7 @@ def get_articles_for_month(request, archive_or_cat: str, time_period: str, year:
     # arxiv_idvs = [ result.entry_id.split('/')[-1] for result in results ]
     arxiv_idvs = [ result.entry_id.split(r'/abs/')[-1] for result in results ]
     # use celery to download and compile pdfs asynchronously
-    if settings.CELERY_DOWNLOAD_AND_COMPILE_ARXIV:
-        processing_group = group(download_and_compile_arxiv.s(arxiv_idv) for arxiv_idv in arxiv_idvs)
-        processing_group.apply_async()
+    compile_queue.enqueue(arxiv_idvs, compile_queue.BACKGROUND)
 
 
     oks = [False] * len(results)
@@ -1357,15 +1231,12 @@ def get_articles_for_month(request, archive_or_cat: str, time_period: str, year:
 
         # retry += 1
 
-    dts = soup.find_all('dt')
-    # dds = soup.find_all('dd')
-    authors_divs = soup.find_all('div', {'class': 'list-authors'})
 
     # organize results into expected listing
+    docs = listing_docs([f'{article.entry_id}v{article.entry_version}' for article in results], language)
     items = []
     for i, paper_id in enumerate(paper_ids):
         # article = Article.objects.filter(source_archive='arxiv', entry_id=paper_id).order_by('entry_version').last()
-        article = results[i]
 
         # dt = dts[i]
         # new_a = soup.new_tag('a', attrs={'href': f"/cn-pdf/{paper_id}", 'title': "Download Chinese PDF", 'id': f"cn-pdf-{paper_id}", 'aria-labelledby': f"cn-pdf-{paper_id}"})
@@ -1385,82 +1256,22 @@ def get_articles_for_month(request, archive_or_cat: str, time_period: str, year:
         #         dd.p.string = article.abstract_cn
 
         listing_type = 'new' # need to get the correct 'new' or 'cross'
-        arxiv_id, version = article.entry_id, article.entry_version
-        primary_cat = CATEGORIES[article.primary_category]
-        secondary_cats = [ CATEGORIES[sc.name] for sc in article.categories.all() if sc.name in CATEGORIES ]
-        modified = max(article.updated_date, article.published_date)
-        doc = DocMetadata(
-            arxiv_id=arxiv_id,
-            arxiv_id_v=f'{arxiv_id}v{version}',
-            title=article.title_cn if language == 'zh-hans' else article.title_en,
-            authors=AuList(', '.join([ author.name for author in article.authors.all() ])),
-            abstract=article.abstract_cn if language == 'zh-hans' else article.abstract_en,
-            categories=[ cat.name for cat in article.categories.all() ],
-            primary_category=primary_cat,
-            secondary_categories=secondary_cats,
-            comments=article.comment_cn if language == 'zh-hans' else article.comment_en,
-            journal_ref=article.journal_ref_cn if language == 'zh-hans' else article.journal_ref_en,
-            version=version,
-            version_history=[
-                VersionEntry(
-                    version=version,
-                    raw="",
-                    submitted_date=None, # type: ignore
-                    size_kilobytes=0,
-                    source_flag=''
-                )
-            ],
-            raw_safe="",
-            submitter=None, # type: ignore
-            arxiv_identifier=None, # type: ignore
-            primary_archive=primary_cat.get_archive(),
-            primary_group=primary_cat.get_archive().get_group(),
-            modified=modified
-        )
+        doc = docs[i]
+        if doc is None:
+            # not stored, logged by listing_docs
+            continue
+        arxiv_id = doc.arxiv_id
+        primary_cat = doc.primary_category
 
         if doc.primary_category.in_archive  != archive_or_cat:
             listing_type = 'cross'
 
-        a_html = dts[i].find('a', string='html')
-        if a_html:
-            doc.latexml_link = a_html['href']
-        a_other = dts[i].find('a', string='other')
-        if a_other:
-            doc.other_link = a_other['href']
-
-        doc.authors_list = str(authors_divs[i])
-        doc.primary_display = doc.primary_category.display()
-        doc.secondaries_display = doc.display_secondaries()
+        if entries[i]['latexml_link']:
+            doc.latexml_link = entries[i]['latexml_link']
+        if entries[i]['other_link']:
+            doc.other_link = entries[i]['other_link']
 
-        doc.title_other_language = article.title_en if language == 'zh-hans' else article.title_cn
-        doc.abstract_other_language = article.abstract_en if language == 'zh-hans' else article.abstract_cn
-        doc.show_title_text = '显示英文标题' if language == 'zh-hans' else 'Show Chinese title'
-        doc.hide_title_text = '隐藏英文标题' if language == 'zh-hans' else 'Hide Chinese title'
-        doc.show_abstract_text = '显示英文摘要' if language == 'zh-hans' else 'Show Chinese abstract'
-        doc.hide_abstract_text = '隐藏英文摘要' if language == 'zh-hans' else 'Hide Chinese abstract'
-
-        if language == 'zh-hans':
-            translation_dict = get_translation_dict()
-            # Define the regex pattern
-            pattern = r'^(.*?) \((.*?)\)$'
-
-            # Use re.search to find matches
-            match = re.search(pattern, doc.primary_display)
-            if match:
-                # Extract the two groups
-                cat_full_name = match.group(1)  # e.g. 'High Energy Astrophysical Phenomena'
-                category = match.group(2)  # e.g. 'astro-ph.HE'
-                cat_full_name_cn = article_filters.dict_get_key(translation_dict, cat_full_name)
-                doc.primary_display = f'{cat_full_name_cn} ({category})'
-
-            for i, secondary_display in enumerate(doc.secondaries_display):
-                match = re.search(pattern, secondary_display)
-                if match:
-                    # Extract the two groups
-                    cat_full_name = match.group(1)  # e.g. 'High Energy Astrophysical Phenomena'
-                    category = match.group(2)  # e.g. 'astro-ph.HE'
-                    cat_full_name_cn = article_filters.dict_get_key(translation_dict, cat_full_name)
-                    doc.secondaries_display[i] = f'{cat_full_name_cn} ({category})'
+        doc.authors_list = entries[i]['authors_list']
 
         item = ListingItem(
             id=arxiv_id,
@@ -1492,8 +1303,8 @@ def get_articles_for_month(request, archive_or_cat: str, time_period: str, year:
 def get_all_cn_pdfs(request, skip: int, show: int) -> Listing:
     language = get_language()
 
-    cn_pdf_base_dir = f'{settings.CENXIV_FILE_PATH}'
-    arxiv_ids = [ arxiv_dir.split('/')[-1][5:15] for arxiv_dir in glob.glob(cn_pdf_base_dir + '/*') if re.match(r'arxiv\d{4}\.\d{5}', arxiv_dir.split('/')[-1]) ]
+    store = artifacts.store()
+    arxiv_ids = [ arxiv_id for arxiv_id in store.papers() if re.fullmatch(r'\d{4}\.\d{5}', arxiv_id) ]
     arxiv_ids = sorted(arxiv_ids)[::-1]
     # arxiv_ids = arxiv_ids[:2] # for test
     total = len(arxiv_ids)
@@ -1501,11 +1312,11 @@ def get_all_cn_pdfs(request, skip: int, show: int) -> Listing:
     paper_ids = arxiv_ids[skip:skip+show]
     arxiv_idvs = []
     for arxiv_id in paper_ids:
-        arxiv_idvs.extend([ f'{arxiv_id}v{version.split('/')[-1][1:]}' for version in glob.glob(f'{cn_pdf_base_dir}/arxiv{arxiv_id}/*') if re.match(r'v\d+', version.split('/')[-1]) ])
+        arxiv_idvs.extend([ f'{arxiv_id}v{version}' for version in store.versions(arxiv_id) ])
 
 
     # Create the search client
-    client = arxivapi.Client()
+    client = arxiv_client()
 
     # Create the search query
     results = []
@@ -1539,78 +1350,19 @@ def get_all_cn_pdfs(request, skip: int, show: int) -> Listing:
 
 
     # organize results into expected listing
+    docs = listing_docs([f'{article.entry_id}v{article.entry_version}' for article in results], language)
     items = []
     for i, paper_id in enumerate(paper_ids):
         # article = Article.objects.filter(source_archive='arxiv', entry_id=paper_id).order_by('entry_version').last()
-        article = results[i]
 
         listing_type = 'new' # need to get the correct 'new' or 'cross'
-        arxiv_id, version = article.entry_id, article.entry_version
-        primary_cat = CATEGORIES[article.primary_category]
-        secondary_cats = [ CATEGORIES[sc.name] for sc in article.categories.all() if sc.name in CATEGORIES ]
-        modified = max(article.updated_date, article.published_date)
-        doc = DocMetadata(
-            arxiv_id=arxiv_id,
-            arxiv_id_v=f'{arxiv_id}v{version}',
-            title=article.title_cn if language == 'zh-hans' else article.title_en,
-            authors=AuList(', '.join([ author.name for author in article.authors.all() ])),
-            abstract=article.abstract_cn if language == 'zh-hans' else article.abstract_en,
-            categories=[ cat.name for cat in article.categories.all() ],
-            primary_category=primary_cat,
-            secondary_categories=secondary_cats,
-            comments=article.comment_cn if language == 'zh-hans' else article.comment_en,
-            journal_ref=article.journal_ref_cn if language == 'zh-hans' else article.journal_ref_en,
-            version=version,
-            version_history=[
-                VersionEntry(
-                    version=version,
-                    raw="",
-                    submitted_date=None, # type: ignore
-                    size_kilobytes=0,
-                    source_flag=''
-                )
-            ],
-            raw_safe="",
-            submitter=None, # type: ignore
-            arxiv_identifier=None, # type: ignore
-            primary_archive=primary_cat.get_archive(),
-            primary_group=primary_cat.get_archive().get_group(),
-            modified=modified
-        )
-
-        doc.authors_list = ', '.join([ author.name for author in article.authors.all() ])
-        doc.primary_display = doc.primary_category.display()
-        doc.secondaries_display = doc.display_secondaries()
+        doc = docs[i]
+        if doc is None:
+            # not stored, logged by listing_docs
+            continue
+        arxiv_id = doc.arxiv_id
+        primary_cat = doc.primary_category
 
-        doc.title_other_language = article.title_en if language == 'zh-hans' else article.title_cn
-        doc.abstract_other_language = article.abstract_en if language == 'zh-hans' else article.abstract_cn
-        doc.show_title_text = '显示英文标题' if language == 'zh-hans' else 'Show Chinese title'
-        doc.hide_title_text = '隐藏英文标题' if language == 'zh-hans' else 'Hide Chinese title'
-        doc.show_abstract_text = '显示英文摘要' if language == 'zh-hans' else 'Show Chinese abstract'
-        doc.hide_abstract_text = '隐藏英文摘要' if language == 'zh-hans' else 'Hide Chinese abstract'
-
-        if language == 'zh-hans':
-            translation_dict = get_translation_dict()
-            # Define the regex pattern
-            pattern = r'^(.*?) \((.*?)\)$'
-
-            # Use re.search to find matches
-            match = re.search(pattern, doc.primary_display)
-            if match:
-                # Extract the two groups
-                cat_full_name = match.group(1)  # e.g. 'High Energy Astrophysical Phenomena'
-                category = match.group(2)  # e.g. 'astro-ph.HE'
-                cat_full_name_cn = article_filters.dict_get_key(translation_dict, cat_full_name)
-                doc.primary_display = f'{cat_full_name_cn} ({category})'
-
-            for i, secondary_display in enumerate(doc.secondaries_display):
-                match = re.search(pattern, secondary_display)
-                if match:
-                    # Extract the two groups
-                    cat_full_name = match.group(1)  # e.g. 'High Energy Astrophysical Phenomena'
-                    category = match.group(2)  # e.g. 'astro-ph.HE'
-                    cat_full_name_cn = article_filters.dict_get_key(translation_dict, cat_full_name)
-                    doc.secondaries_display[i] = f'{cat_full_name_cn} ({category})'
 
         item = ListingItem(
             id=arxiv_id,
@@ -1,17 +1,20 @@
 """Handle requests to support sequential navigation between arXiv IDs."""
 
 import logging
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Optional, Tuple
 from http import HTTPStatus as status
 
 from django.urls import reverse
 from django.utils.html import escape
 from django.core.exceptions import BadRequest
-# from django.http import Http404
+from django.http import Http404
 
 from arxiv.taxonomy.definitions import ARCHIVES, CATEGORIES_ACTIVE
 from arxiv.identifier import Identifier, IdentifierException
 
+from ..browse_index import get_sequential_id
+from .. import upstream
+
 
 logger = logging.getLogger(__name__)
 
@@ -63,14 +66,33 @@ def get_prevnext(id: str, function: str, context: str) -> Response:
     except IdentifierException as ex:
         raise BadRequest(escape(f"Invalid article identifier {id}"))
 
-    # seq_id = get_sequential_id(paper_id=arxiv_id,
-    #                            is_next=function == 'next',
-    #                            context=context)
-    # if not seq_id:
-    #     raise Http404(
-    #         escape(f'No {function} article found for '
-    #                f'{arxiv_id.id} in {context}'))
-
-    # redirect_url = reverse('articles:abstract', kwargs={'arxiv_id': arxiv_id.idv, 'context': context})
-    redirect_url = reverse('articles:abstract', kwargs={'arxiv_id': arxiv_id.idv}) + f'?context={context}'
-    return {}, status.MOVED_PERMANENTLY, {'Location': redirect_url}
+    seq_id = get_sequential_id(paper_id=arxiv_id,
+                               is_next=function == 'next',
+                               context=context)
+    if not seq_id:
+        seq_id = _upstream_sequential_id(arxiv_id, function, context)
+    if not seq_id:
+        raise Http404(
+            escape(f'No {function} article found for '
+                   f'{arxiv_id.id} in {context}'))
+
+    # the local index grows, so the answer may change: not a permanent redirect
+    redirect_url = reverse('articles:abstract', kwargs={'arxiv_id': seq_id}) + f'?context={context}'
+    return {}, status.FOUND, {'Location': redirect_url}
+
+
+def _upstream_sequential_id(arxiv_id: Identifier, function: str, context: str) -> Optional[str]:
+    """Ask arXiv, for papers around which we hold nothing."""
+    try:
+        response = upstream.get(
+            'https://arxiv.org/prevnext',
+            params={'id': arxiv_id.id, 'function': function, 'context': context},
+            allow_redirects=False,
+        )
+    except Exception as e:
+        logger.warning(f'Failed to get the {function} article of arxiv:{arxiv_id.id} in {context} from arXiv due to {e}')
+        return None
+    if response.status_code not in (status.MOVED_PERMANENTLY, status.FOUND):
+        return None
+    # e.g. https://arxiv.org/abs/2401.00002?context=hep-th
+    return response.headers['Location'].split('/abs/', 1)[-1].split('?', 1)[0] or None
@@ -1,24 +1,43 @@
 """Handle requests for info about one year of archive activity."""
 
+import re
+import logging
 from dataclasses import dataclass
 from datetime import date
 from typing import Any, Dict, List, Optional, Tuple
 from http import HTTPStatus as status
-import requests
 from bs4 import BeautifulSoup
 
 from arxiv.taxonomy.definitions import ARCHIVES
+from django.core.cache import cache, caches
 from django.urls import reverse
 from werkzeug.exceptions import BadRequest, NotFound
 
 from arxiv.integration.fastly.headers import add_surrogate_key
 
 # from browse.controllers.list_page import get_listing_service
-# from browse.controllers.years_operating import stats_by_year, years_operating
-from browse.services.listing import MonthCount
+from .years_operating import stats_by_year, years_operating
+from .. import stampede
+from ..utils import request_get
 
 
+logger = logging.getLogger(__name__)
+
 YEAR_CACHE_TIME= 60*60*24*10 #10 days
+CURRENT_YEAR_COUNTS_TIMEOUT = 60*60*6 # seconds, the counts of the current year grow daily
+NO_COUNTS_TIMEOUT = 60*10 # seconds before a year page without counts is fetched again
+
+
+class NoCountsFound(Exception):
+    """The arXiv year page has no monthly counts, e.g. after a change of its markup."""
+
+@dataclass
+class MonthCount:
+    """Counts of one month, the fields of browse.services.listing.MonthCount used here"""
+    year: int
+    month: int
+    new: int
+    cross: int
 
 @dataclass
 class MonthData:
@@ -92,44 +111,29 @@ def year_page(archive_id: str, year: Optional[int]) -> Any:
         if year > end:
             raise BadRequest(f"Invalid year: {year}. {archive.full_name} ended in {end}")
 
-    # listing_service = get_listing_service()
-    # count_listing = listing_service.monthly_counts(archive.id, year)
-    # month_data = [
-    #     MonthData(
-    #         month_count=month_count,
-    #         art=ascii_art_month(archive.id, month_count),
-    #         yymm=f"{month_count.month:02}",
-    #         my=date(year=int(month_count.year),
-    #         month=int(month_count.month), day=1).strftime("%b %Y"),
-    #         url=reverse('articles:list_articles', kwargs={
-    #             'context': archive.id,
-    #             'subcontext': f"{month_count.year:04}-{month_count.month:02}"
-    #         })
-    #     )
-    #     for month_count in count_listing.by_month
-    # ]
-
-    url = f'https://arxiv.org/year/{archive_id}/{year}'
-    response = requests.get(url)
-    soup = BeautifulSoup(response.content, 'lxml')
-
-    content_div = soup.main.find('div', {'id': 'content'})
-    ul = content_div.ul
-    target_p = ul.next_sibling.next_sibling
-    new_count = target_p.b.string.replace(' articles', '')
-    cross_count = target_p.i.string.replace(' cross-lists', '')
-    li_as = target_p.next_sibling.next_sibling.next_sibling.contents[2:]
+    counts = monthly_counts(archive.id, year)
+    month_data = [
+        MonthData(
+            month_count=month_count,
+            art=ascii_art_month(archive.id, month_count),
+            yymm=f"{month_count.month:02}",
+            my=date(year=int(month_count.year),
+            month=int(month_count.month), day=1).strftime("%b %Y"),
+            url=reverse('articles:list_articles', kwargs={
+                'context': archive.id,
+                'subcontext': f"{month_count.year:04}-{month_count.month:02}"
+            })
+        )
+        for month_count in counts
+    ]
 
     response_data: Dict[str, Any] = {
         'archive': archive,
-        # 'month_data': month_data,
-        # 'listing': count_listing,
+        'month_data': month_data,
         'year': str(year),
-        # 'stats_by_year': stats_by_year(archive, years_operating(archive), year)
-        'ul': str(ul),
-        'new_count': new_count,
-        'cross_count': cross_count,
-        'li_as': [ str(a) for a in li_as ]
+        'new_count': sum(month_count.new for month_count in counts) if counts else None,
+        'cross_count': sum(month_count.cross for month_count in counts) if counts else None,
+        'stats_by_year': stats_by_year(archive, years_operating(archive), year),
     }
     headers["Surrogate-Control"] = f"max-age={YEAR_CACHE_TIME}"
     headers = add_surrogate_key(headers, ["year", f"year-{archive.id}", f"year-{archive.id}-{year:04d}"])
@@ -141,6 +145,63 @@ def year_page(archive_id: str, year: Optional[int]) -> Any:
     return response_data, response_status, headers
 
 
+def monthly_counts(archive_id: str, year: int) -> List[MonthCount]:
+    """New and cross-listed article counts per month of ``year``.
+
+    The counts come from the arXiv year page, they can not be aggregated from
+    our store which only holds the papers that were looked at. They are
+    cached permanently once the year is over, and for
+    ``CURRENT_YEAR_COUNTS_TIMEOUT`` seconds during the current year. A page
+    without counts is not cached, no counts are shown and it is fetched again
+    after ``NO_COUNTS_TIMEOUT`` seconds.
+    """
+    def fetch_counts():
+        url = f'https://arxiv.org/year/{archive_id}/{year}'
+        response = request_get(url, retries=3, retry_delay=0.5)
+        if not response:
+            raise Exception(f"Failed to fetch URL: {url} after 3 attempts.")
+        counts = _parse_year_page(response.content, year)
+        if not counts:
+            raise NoCountsFound(f'No monthly counts in {url}')
+        return counts
+
+    no_counts_key = f'cenxiv:year_counts_missing:{archive_id}:{year}'
+    if cache.get(no_counts_key):
+        return []
+    # late announcements of December papers are done by the end of January
+    finished = date.today() >= date(year + 1, 2, 1)
+    try:
+        counts = stampede.get_or_build(
+            f'cenxiv:year_counts:{archive_id}:{year}:v2', fetch_counts,
+            timeout=None if finished else CURRENT_YEAR_COUNTS_TIMEOUT, cache=caches['hot'],
+        )
+    except NoCountsFound as e:
+        logger.warning(e)
+        cache.set(no_counts_key, True, timeout=NO_COUNTS_TIMEOUT)
+        return []
+    return [MonthCount(**month_count) for month_count in counts]
+
+
+def _parse_year_page(content: bytes, year: int) -> List[Dict[str, int]]:
+    """The monthly counts of an arXiv year page as plain dicts, which cache well."""
+    soup = BeautifulSoup(content, 'lxml')
+    counts = []
+    for idx, li in enumerate(soup.main.find('div', {'id': 'content'}).ul.find_all('li', recursive=False)):
+        month = idx + 1
+        for a in li.find_all('a', href=True):
+            match = re.search(r'/(\d{4})-(\d{2})', a['href'])
+            if match:
+                month = int(match.group(2))
+                break
+        # e.g. "01 ||||||! 1234 + 567 (Jan 2024)"
+        match = re.search(r'([\d,]+)\s*\+\s*([\d,]+)', li.get_text(' '))
+        if not match:
+            continue
+        new, cross = (int(number.replace(',', '')) for number in match.groups())
+        counts.append({'year': year, 'month': month, 'new': new, 'cross': cross})
+    return counts
+
+
 ASCII_ART_STEP = 20
 ASCII_ART_CHR = '|'
 ASCII_ART_URL_STEP = 100
@@ -0,0 +1,124 @@
+"""Serving the files stored under ``CENXIV_FILE_PATH``, e.g. the Chinese PDFs.
+
+Only files under ``CENXIV_FILE_PATH`` are served, any other path is a 404.
+
+With ``CENXIV_FILE_DELIVERY = 'x-accel'`` the response only carries an
+``X-Accel-Redirect`` header with the path of the file relative to
+``CENXIV_FILE_PATH``, and nginx sends the file from its internal
+``CENXIV_X_ACCEL_PREFIX`` location, an alias of that directory (see
+config/nginx/default.conf.template), with sendfile, byte ranges and conditional requests, so no uwsgi worker is
+held while a PDF is downloaded.
+
+Otherwise (``'python'``, the default, e.g. for the development server) Django
+serves the file itself with the same ETag, Last-Modified and single byte
+range support. Whole files go through ``wsgi.file_wrapper``, which uwsgi
+turns into sendfile.
+"""
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _etag(stat):
+    return quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+
+
+def _parse_range(header, size):
+    """The inclusive ``(start, end)`` of a single byte range, None if the header is unusable.
+
+    ``start >= size`` means the range cannot be satisfied. Multiple ranges are
+    not supported, the whole file is sent instead which RFC 9110 allows.
+    """
+    match = re.fullmatch(r'bytes=(\d*)-(\d*)', header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    elif last:
+        # suffix range, the last bytes of the file
+        start = max(size - int(last), 0)
+        end = size - 1
+        if int(last) == 0:
+            start = size
+    else:
+        return None
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is None:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _iter_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _relative_path(path):
+    """``path`` relative to ``CENXIV_FILE_PATH``, None if it resolves outside of it."""
+    root = os.path.realpath(settings.CENXIV_FILE_PATH)
+    path = os.path.realpath(path)
+    if os.path.commonpath([root, path]) != root or path == root:
+        return None
+    return os.path.relpath(path, root)
+
+
+def serve_file(request, path, content_type='application/octet-stream'):
+    """Respond with the file at ``path`` under ``CENXIV_FILE_PATH``, see the module docstring."""
+    relative_path = _relative_path(path)
+    if relative_path is None:
+        raise Http404('No such file')
+    path = os.path.join(os.path.realpath(settings.CENXIV_FILE_PATH), relative_path)
+
+    if settings.CENXIV_FILE_DELIVERY == 'x-accel':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = f'{settings.CENXIV_X_ACCEL_PREFIX.rstrip("/")}/{quote(relative_path)}'
+        return response
+
+    stat = os.stat(path)
+    etag = _etag(stat)
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        byte_range = None
+        if 'HTTP_RANGE' in request.META and _if_range_matches(request, etag, last_modified):
+            byte_range = _parse_range(request.META['HTTP_RANGE'], stat.st_size)
+
+        if byte_range is None:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+        elif byte_range[0] >= stat.st_size:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(_iter_range(path, start, end - start + 1), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = str(end - start + 1)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -0,0 +1,301 @@
+"""A per-process LRU tier in front of memcached for small, hot objects.
+
+Some small objects are read many times per request: the arXiv API results of
+the papers of an announcement, the latest versions of papers, the year
+counts. ``CACHES['hot']`` keeps copies of them in each process in front of
+the cache named by its ``LOCATION`` (``default``, memcached), so repeated
+reads do not each make a network round trip::
+
+    from django.core.cache import caches
+    caches['hot'].get_many(keys)
+
+The local tier is bounded by ``MAX_ENTRIES`` entries and ``MAX_BYTES``
+pickled bytes, least recently used entries are evicted first, and objects
+larger than ``MAX_ITEM_BYTES`` are only kept in memcached. Local copies live
+for at most ``LOCAL_TIMEOUT`` seconds, or the timeout they were set with if
+shorter; a copy read from memcached may outlive the memcached entry by that
+long, so keys that must expire exactly (locks, breakers) do not belong here.
+
+Keys are grouped in namespaces, their first two ``:`` separated parts (e.g.
+``cenxiv:latest_version``). Each namespace has a version stamp in memcached
+that ``delete``, ``delete_many`` and :meth:`TwoTierCache.invalidate` renew,
+and local copies are only used while the stamp they were stored with is
+current. The stamps are looked up at most every ``STAMP_CHECK_INTERVAL``
+seconds, so a deletion by one worker is seen by all the others after at most
+that long. Writes (``set``, ``set_many``, ``add``, ``incr``) do not renew the
+stamp, filling in a missing key must not drop the copies of its neighbours:
+the other workers see a changed value once their copy expires, after at most
+``LOCAL_TIMEOUT`` seconds. Values that must change everywhere at once are
+deleted, or their namespace invalidated.
+
+Local hits, memcached hits and misses are counted per namespace, and added
+up across processes in memcached every ``STATS_FLUSH_INTERVAL`` seconds,
+see ``manage.py hot_cache_stats``.
+"""
+import time
+import uuid
+import pickle
+import logging
+import threading
+from collections import Counter, OrderedDict, defaultdict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+logger = logging.getLogger(__name__)
+
+STATS_KINDS = ('local', 'remote', 'miss')
+NAMESPACES_KEY = 'cenxiv:hot_cache:namespaces'
+
+_MISSING = object()
+
+# the tier is shared by the threads of a process, Django makes a cache instance per thread
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+def namespace(key):
+    """The namespace of ``key``, its first two ``:`` separated parts."""
+    return ':'.join(str(key).split(':')[:2])
+
+
+def _stamp_key(ns):
+    return f'cenxiv:hot_cache:stamp:{ns}'
+
+
+def _stats_key(ns, kind):
+    return f'cenxiv:hot_cache:stats:{ns}:{kind}'
+
+
+class _Tier:
+    """The local entries, namespace stamps and counters of one process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict() # key -> (pickled, expires, stamp)
+        self.size = 0
+        self.stamps = {} # namespace -> (stamp, checked at)
+        self.stats = defaultdict(Counter)
+        self.flushed_at = time.monotonic()
+
+
+class TwoTierCache(BaseCache):
+    """Cache backend keeping small values in a process local LRU in front of the cache ``LOCATION``."""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._remote_alias = location or 'default'
+        self._max_bytes = int(options.get('MAX_BYTES', 32 * 1024 * 1024))
+        self._max_item_bytes = int(options.get('MAX_ITEM_BYTES', 64 * 1024))
+        self._local_timeout = float(options.get('LOCAL_TIMEOUT', 60))
+        self._stamp_check_interval = float(options.get('STAMP_CHECK_INTERVAL', 1))
+        self._stats_flush_interval = float(options.get('STATS_FLUSH_INTERVAL', 60))
+        with _tiers_lock:
+            self._tier = _tiers.setdefault(self._remote_alias, _Tier())
+
+    @property
+    def _remote(self):
+        return caches[self._remote_alias]
+
+    # version stamps
+
+    def _current_stamps(self, namespaces):
+        now = time.monotonic()
+        with self._tier.lock:
+            stamps = {
+                ns: self._tier.stamps[ns][0] for ns in namespaces
+                if ns in self._tier.stamps and now - self._tier.stamps[ns][1] < self._stamp_check_interval
+            }
+        outdated = [ns for ns in namespaces if ns not in stamps]
+        if outdated:
+            found = self._remote.get_many([_stamp_key(ns) for ns in outdated])
+            for ns in outdated:
+                stamp = found.get(_stamp_key(ns))
+                if stamp is None:
+                    # new namespace, or its stamp was evicted
+                    self._remote.add(_stamp_key(ns), uuid.uuid4().hex, timeout=None)
+                    stamp = self._remote.get(_stamp_key(ns))
+                stamps[ns] = stamp
+            with self._tier.lock:
+                for ns in outdated:
+                    self._tier.stamps[ns] = (stamps[ns], now)
+        return stamps
+
+    def _renew_stamps(self, namespaces):
+        """Make every process drop its copies of the keys in ``namespaces``."""
+        stamps = {ns: uuid.uuid4().hex for ns in namespaces}
+        self._remote.set_many({_stamp_key(ns): stamp for ns, stamp in stamps.items()}, timeout=None)
+        now = time.monotonic()
+        with self._tier.lock:
+            for ns, stamp in stamps.items():
+                self._tier.stamps[ns] = (stamp, now)
+        return stamps
+
+    # local tier
+
+    def _local_key(self, key, version):
+        return self.make_and_validate_key(key, version=version)
+
+    def _get_local(self, local_key, stamp):
+        with self._tier.lock:
+            entry = self._tier.entries.get(local_key)
+            if entry is None:
+                return _MISSING
+            pickled, expires, entry_stamp = entry
+            if expires <= time.monotonic() or entry_stamp != stamp:
+                self._drop_local(local_key)
+                return _MISSING
+            self._tier.entries.move_to_end(local_key)
+        return pickle.loads(pickled)
+
+    def _set_local(self, local_key, value, stamp, timeout=None):
+        local_timeout = self._local_timeout if timeout is None else min(timeout, self._local_timeout)
+        if local_timeout <= 0:
+            return
+        try:
+            pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+        with self._tier.lock:
+            self._drop_local(local_key)
+            if len(pickled) > self._max_item_bytes:
+                return
+            self._tier.entries[local_key] = (pickled, time.monotonic() + local_timeout, stamp)
+            self._tier.size += len(pickled)
+            while self._tier.entries and (len(self._tier.entries) > self._max_entries or self._tier.size > self._max_bytes):
+                _, (evicted, _, _) = self._tier.entries.popitem(last=False)
+                self._tier.size -= len(evicted)
+
+    def _drop_local(self, local_key):
+        # with the tier lock held
+        entry = self._tier.entries.pop(local_key, None)
+        if entry is not None:
+            self._tier.size -= len(entry[0])
+
+    # hit ratio counters
+
+    def _count(self, ns, kind, n=1):
+        with self._tier.lock:
+            self._tier.stats[ns][kind] += n
+            if time.monotonic() - self._tier.flushed_at < self._stats_flush_interval:
+                return
+            stats, self._tier.stats = self._tier.stats, defaultdict(Counter)
+            self._tier.flushed_at = time.monotonic()
+        try:
+            self._flush_stats(stats)
+        except Exception as e:
+            logger.warning(f'Failed to flush the hot cache counters: {e}')
+
+    def _flush_stats(self, stats):
+        known = self._remote.get(NAMESPACES_KEY) or set()
+        if not known.issuperset(stats):
+            self._remote.set(NAMESPACES_KEY, known | set(stats), timeout=None)
+        for ns, counts in stats.items():
+            for kind, n in counts.items():
+                self._remote.add(_stats_key(ns, kind), 0, timeout=None)
+                self._remote.incr(_stats_key(ns, kind), n)
+
+    def local_stats(self):
+        """The counters of this process not yet added to memcached, by namespace."""
+        with self._tier.lock:
+            return {ns: dict(counts) for ns, counts in self._tier.stats.items()}
+
+    def stats(self):
+        """Local hits, memcached hits and misses of all processes, by namespace."""
+        namespaces = sorted(self._remote.get(NAMESPACES_KEY) or ())
+        counts = self._remote.get_many([_stats_key(ns, kind) for ns in namespaces for kind in STATS_KINDS])
+        return {
+            ns: {kind: counts.get(_stats_key(ns, kind), 0) for kind in STATS_KINDS}
+            for ns in namespaces
+        }
+
+    def _remote_timeout(self, timeout):
+        """Seconds a value set with ``timeout`` is kept in the remote cache, None for ever."""
+        return self._remote.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    # cache API
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        stamps = self._current_stamps({namespace(key) for key in keys})
+        found = {}
+        remote_keys = []
+        for key in keys:
+            value = self._get_local(self._local_key(key, version), stamps[namespace(key)])
+            if value is _MISSING:
+                remote_keys.append(key)
+            else:
+                found[key] = value
+        fetched = self._remote.get_many(remote_keys, version=version) if remote_keys else {}
+        for key in remote_keys:
+            if key in fetched:
+                self._set_local(self._local_key(key, version), fetched[key], stamps[namespace(key)])
+        found.update(fetched)
+
+        counts = Counter()
+        for key in keys:
+            ns = namespace(key)
+            counts[ns, 'local' if key not in remote_keys else 'remote' if key in fetched else 'miss'] += 1
+        for (ns, kind), n in counts.items():
+            self._count(ns, kind, n)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self._remote.set_many(data, timeout=timeout, version=version)
+        stamps = self._current_stamps({namespace(key) for key in data})
+        local_timeout = self._remote_timeout(timeout)
+        for key, value in data.items():
+            if key not in failed:
+                self._set_local(self._local_key(key, version), value, stamps[namespace(key)], local_timeout)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if not self._remote.add(key, value, timeout=timeout, version=version):
+            return False
+        stamp = self._current_stamps({namespace(key)})[namespace(key)]
+        self._set_local(self._local_key(key, version), value, stamp, self._remote_timeout(timeout))
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._remote.touch(key, timeout=timeout, version=version)
+
+    def delete(self, key, version=None):
+        deleted = self._remote.delete(key, version=version)
+        self._renew_stamps({namespace(key)})
+        with self._tier.lock:
+            self._drop_local(self._local_key(key, version))
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self._remote.delete_many(keys, version=version)
+        self._renew_stamps({namespace(key) for key in keys})
+        with self._tier.lock:
+            for key in keys:
+                self._drop_local(self._local_key(key, version))
+
+    def incr(self, key, delta=1, version=None):
+        value = self._remote.incr(key, delta, version=version)
+        with self._tier.lock:
+            self._drop_local(self._local_key(key, version))
+        return value
+
+    def invalidate(self, *namespaces):
+        """Make every process drop its copies of the keys in ``namespaces``."""
+        self._renew_stamps(set(namespaces))
+
+    def clear(self):
+        # the values are those of the remote cache, which is shared with its other users
+        self._remote.clear()
+        with self._tier.lock:
+            self._tier.entries.clear()
+            self._tier.size = 0
+            self._tier.stamps.clear()
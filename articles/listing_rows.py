@@ -0,0 +1,183 @@
+"""Precomputed listing rows.
+
+Building a listing item means a ``DocMetadata`` from the article and its
+authors and categories, the category display strings (translated for
+Chinese), the show/hide labels and the author links. All of that only
+changes with the article, so it is computed once per ``(arxiv_idv,
+language)`` into a :class:`~articles.models.ListingRow` when the article is
+stored or edited, and listing pages hydrate their items from the rows with
+one query.
+"""
+import re
+import logging
+from datetime import datetime
+
+from arxiv.taxonomy.definitions import CATEGORIES
+from arxiv.document.version import VersionEntry
+from arxiv.document.metadata import DocMetadata, AuthorList as AuList
+
+from browse.controllers.abs_page import truncate_author_list_size
+from browse.formatting.search_authors import queries_for_authors, split_long_author_list
+
+from django.db.models import prefetch_related_objects
+
+from .models import Article, ListingRow
+from .templatetags import article_filters
+
+
+logger = logging.getLogger(__name__)
+
+LANGUAGES = ['zh-hans', 'en']
+
+DISPLAY_FIELDS = [
+    'primary_display', 'secondaries_display',
+    'title_other_language', 'abstract_other_language',
+    'show_title_text', 'hide_title_text', 'show_abstract_text', 'hide_abstract_text',
+]
+
+
+def _translate_display(display, translation_dict):
+    # e.g. 'High Energy Astrophysical Phenomena (astro-ph.HE)'
+    match = re.search(r'^(.*?) \((.*?)\)$', display)
+    if not match:
+        return display
+    cat_full_name, category = match.groups()
+    return f'{article_filters.dict_get_key(translation_dict, cat_full_name)} ({category})'
+
+
+def build_payload(article, language, translation_dict):
+    """The listing row payload of ``article``, its authors and categories should be prefetched."""
+    zh = language == 'zh-hans'
+    categories = [cat.name for cat in article.categories.all()]
+    payload = dict(
+        arxiv_id=article.entry_id,
+        version=article.entry_version,
+        title=article.title_cn if zh else article.title_en,
+        abstract=article.abstract_cn if zh else article.abstract_en,
+        comments=article.comment_cn if zh else article.comment_en,
+        journal_ref=article.journal_ref_cn if zh else article.journal_ref_en,
+        authors=', '.join(author.name for author in article.authors.all()),
+        categories=categories,
+        primary_category=article.primary_category,
+        secondary_categories=[name for name in categories if name in CATEGORIES],
+        modified=max(article.updated_date, article.published_date).isoformat(),
+        title_other_language=article.title_en if zh else article.title_cn,
+        abstract_other_language=article.abstract_en if zh else article.abstract_cn,
+        show_title_text='显示英文标题' if zh else 'Show Chinese title',
+        hide_title_text='隐藏英文标题' if zh else 'Hide Chinese title',
+        show_abstract_text='显示英文摘要' if zh else 'Show Chinese abstract',
+        hide_abstract_text='隐藏英文摘要' if zh else 'Hide Chinese abstract',
+    )
+
+    doc = to_doc(payload)
+    payload['primary_display'] = doc.primary_category.display()
+    payload['secondaries_display'] = doc.display_secondaries()
+    if zh:
+        payload['primary_display'] = _translate_display(payload['primary_display'], translation_dict)
+        payload['secondaries_display'] = [_translate_display(d, translation_dict) for d in payload['secondaries_display']]
+    payload['author_links'] = split_long_author_list(queries_for_authors(payload['authors']), truncate_author_list_size)
+    return payload
+
+
+def _author_list(authors):
+    # JSON turned the (name, query) tuples into lists
+    return [tuple(author) if isinstance(author, list) else author for author in authors]
+
+
+def to_doc(payload):
+    """Rebuild the ``DocMetadata`` a listing item holds from a row payload."""
+    arxiv_id, version = payload['arxiv_id'], payload['version']
+    primary_cat = CATEGORIES[payload['primary_category']]
+    doc = DocMetadata(
+        arxiv_id=arxiv_id,
+        arxiv_id_v=f'{arxiv_id}v{version}',
+        title=payload['title'],
+        authors=AuList(payload['authors']),
+        abstract=payload['abstract'],
+        categories=payload['categories'],
+        primary_category=primary_cat,
+        secondary_categories=[CATEGORIES[name] for name in payload['secondary_categories']],
+        comments=payload['comments'],
+        journal_ref=payload['journal_ref'],
+        version=version,
+        version_history=[
+            VersionEntry(
+                version=version,
+                raw="",
+                submitted_date=None, # type: ignore
+                size_kilobytes=0,
+                source_flag=''
+            )
+        ],
+        raw_safe="",
+        submitter=None, # type: ignore
+        arxiv_identifier=None, # type: ignore
+        primary_archive=primary_cat.get_archive(),
+        primary_group=primary_cat.get_archive().get_group(),
+        modified=datetime.fromisoformat(payload['modified'])
+    )
+    # Listing pages scraped from arXiv replace this with the linked author html.
+    doc.authors_list = payload['authors']
+    for name in DISPLAY_FIELDS:
+        if name in payload:
+            setattr(doc, name, payload[name])
+    if 'author_links' in payload:
+        front, back, count = payload['author_links']
+        doc.author_links = (_author_list(front), _author_list(back), count)
+    return doc
+
+
+def refresh_listing_rows(articles):
+    """(Re)write the rows of ``articles`` in every language, returns the rows."""
+    # get_translation_dict lives in utils, which calls back into this module
+    from .utils import get_translation_dict
+
+    articles = list(articles)
+    if not articles:
+        return []
+    prefetch_related_objects(articles, 'authors', 'categories')
+    translation_dict = get_translation_dict()
+    rows = [
+        ListingRow(
+            arxiv_idv=f'{article.entry_id}v{article.entry_version}',
+            language=language,
+            article=article,
+            payload=build_payload(article, language, translation_dict),
+        )
+        for article in articles for language in LANGUAGES
+    ]
+    ListingRow.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['arxiv_idv', 'language'],
+        update_fields=['article', 'payload', 'updated_at'],
+    )
+    return rows
+
+
+def listing_docs(arxiv_idvs, language):
+    """``DocMetadata`` for every ``arxiv_idvs`` in ``language``, in the same order.
+
+    Rows that do not exist yet, e.g. for articles stored before listing rows
+    were introduced, are built from the stored articles on the way. An
+    ``arxiv_idv`` without a stored article either, e.g. one whose save
+    failed, gets None and is logged.
+    """
+    payloads = dict(
+        ListingRow.objects.filter(language=language, arxiv_idv__in=arxiv_idvs).values_list('arxiv_idv', 'payload')
+    )
+    missing = {idv for idv in arxiv_idvs if idv not in payloads}
+    if missing:
+        articles = [
+            article for article in Article.objects.filter(
+                source_archive='arxiv', entry_id__in={idv.rsplit('v', 1)[0] for idv in missing}
+            )
+            if f'{article.entry_id}v{article.entry_version}' in missing
+        ]
+        for row in refresh_listing_rows(articles):
+            if row.language == language:
+                payloads[row.arxiv_idv] = row.payload
+    not_stored = [idv for idv in arxiv_idvs if idv not in payloads]
+    if not_stored:
+        logger.warning(f'Leaving out of the listing the articles that are not stored: {", ".join(not_stored)}')
+    return [to_doc(payloads[idv]) if idv in payloads else None for idv in arxiv_idvs]
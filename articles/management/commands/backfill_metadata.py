@@ -0,0 +1,200 @@
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from articles.browse_index import index_articles
+from articles.metadata_dump import iter_dump
+from articles.listing_rows import refresh_listing_rows
+from articles.models import Article, Author, Category, Link
+from articles.tasks import translate_article
+from articles.utils import TO_BE_TRANSLATED, translate_pending_article, truncate_for_model
+
+
+ENGLISH_FIELDS = [
+    'title_en', 'abstract_en', 'published_date', 'updated_date',
+    'comment_en', 'journal_ref_en', 'doi', 'primary_category',
+]
+
+
+class Command(BaseCommand):
+    help = ('Stream a local arXiv metadata dump (JSON-lines snapshot or OAI-PMH arXivRaw XML, '
+            'optionally gzipped) into the article table, then translate the new articles.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('dump', help='Path of the dump file.')
+        parser.add_argument('--category', action='append', default=[],
+                            help='Only ingest papers in this category or archive, e.g. "hep-th" or "astro-ph". Repeatable.')
+        parser.add_argument('--year', type=int, action='append', default=[],
+                            help='Only ingest papers first published in this year. Repeatable.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Records per database transaction (default: 1000).')
+        parser.add_argument('--translate', choices=['celery', 'inline', 'none'], default='celery',
+                            help='Queue translations on the Celery workers (default), run them here, or leave them for later.')
+        parser.add_argument('--workers', type=int, default=4, help='Translation threads with --translate inline (default: 4).')
+        parser.add_argument('--checkpoint', default=None,
+                            help='Checkpoint file, defaults to the dump path with a ".checkpoint" suffix.')
+        parser.add_argument('--resume', action='store_true', help='Continue after the last batch recorded in the checkpoint.')
+        parser.add_argument('--limit', type=int, default=None, help='Stop after ingesting this many papers.')
+
+    def handle(self, *args, **options):
+        dump = options['dump']
+        if not os.path.isfile(dump):
+            raise CommandError(f'{dump} does not exist.')
+        self.checkpoint = options['checkpoint'] or f'{dump}.checkpoint'
+        self.categories = options['category']
+        self.years = set(options['year'])
+        self.translate = options['translate']
+        self.executor = ThreadPoolExecutor(max_workers=options['workers']) if self.translate == 'inline' else None
+
+        start = 0
+        self.stats = dict(read=0, created=0, updated=0, skipped=0, translated=0)
+        if options['resume'] and os.path.isfile(self.checkpoint):
+            with open(self.checkpoint, encoding='utf-8') as f:
+                state = json.load(f)
+            if state['dump'] != os.path.abspath(dump):
+                raise CommandError(f'{self.checkpoint} belongs to {state["dump"]}.')
+            start = state['position']
+            self.stats.update(state['stats'])
+            self.stdout.write(f'Resuming {dump} at position {start}.')
+
+        self.started = time.monotonic()
+        self.read_at_start = self.stats['read']
+        batch = []
+        ingested = 0
+        position = start
+        try:
+            for position, record in iter_dump(dump, start):
+                self.stats['read'] += 1
+                if not self.wanted(record):
+                    self.stats['skipped'] += 1
+                    continue
+                batch.append(record)
+                ingested += 1
+                if len(batch) >= options['batch_size'] or ingested == options['limit']:
+                    self.flush(batch, dump, position)
+                    batch = []
+                    if ingested == options['limit']:
+                        break
+            else:
+                self.flush(batch, dump, position)
+        finally:
+            if self.executor:
+                self.executor.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f'Done: {self.progress()}'))
+
+    def wanted(self, record):
+        if record is None:
+            return False
+        if self.years and record.published.year not in self.years:
+            return False
+        if self.categories:
+            return any(
+                category == wanted or category.split('.')[0] == wanted
+                for category in record.categories for wanted in self.categories
+            )
+        return True
+
+    def flush(self, batch, dump, position):
+        if batch:
+            with transaction.atomic():
+                pending = self.upsert(batch)
+            self.queue_translations(pending)
+        state = dict(dump=os.path.abspath(dump), position=position, stats=self.stats)
+        with open(f'{self.checkpoint}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(f'{self.checkpoint}.tmp', self.checkpoint)
+        self.stdout.write(self.progress())
+
+    def upsert(self, batch):
+        """Insert or update one batch, returns the articles still to be translated."""
+        # A dump may list the same paper twice, the later entry wins.
+        records = {(record.arxiv_id, record.version): record for record in batch}
+        existing = {
+            (article.entry_id, article.entry_version): article
+            for article in Article.objects.filter(
+                source_archive='arxiv', entry_id__in={arxiv_id for arxiv_id, _ in records}
+            )
+        }
+
+        new_articles, changed_articles = [], []
+        for key, record in records.items():
+            data = truncate_for_model(Article, dict(
+                title_en=record.title,
+                abstract_en=record.abstract,
+                published_date=record.published,
+                updated_date=record.updated,
+                comment_en=record.comment,
+                journal_ref_en=record.journal_ref,
+                doi=record.doi,
+                primary_category=record.primary_category,
+            ))
+            article = existing.get(key)
+            if article is None:
+                # Stored untranslated, the translation is filled in afterwards.
+                data.update(truncate_for_model(Article, dict(
+                    title_cn=TO_BE_TRANSLATED + record.title,
+                    abstract_cn=TO_BE_TRANSLATED + record.abstract,
+                    comment_cn=TO_BE_TRANSLATED + record.comment if record.comment else None,
+                    journal_ref_cn=TO_BE_TRANSLATED + record.journal_ref if record.journal_ref else None,
+                )))
+                new_articles.append(Article(entry_id=record.arxiv_id, entry_version=record.version, **data))
+            elif any(getattr(article, name) != value for name, value in data.items()):
+                for name, value in data.items():
+                    setattr(article, name, value)
+                changed_articles.append(article)
+
+        Article.objects.bulk_create(new_articles)
+        if changed_articles:
+            Article.objects.bulk_update(changed_articles, ENGLISH_FIELDS)
+
+        # Not every backend returns the primary keys from bulk_create.
+        created = Article.objects.filter(
+            source_archive='arxiv', entry_id__in={article.entry_id for article in new_articles}
+        )
+        created = [article for article in created if (article.entry_id, article.entry_version) in records
+                   and (article.entry_id, article.entry_version) not in existing]
+        authors, categories, links = [], [], []
+        for article in created:
+            record = records[(article.entry_id, article.entry_version)]
+            authors.extend(Author(name=name[:100], article=article) for name in record.authors)
+            categories.extend(Category(name=name, article=article) for name in record.categories)
+            links.extend(Link(url=url, article=article) for url in record.links)
+        Author.objects.bulk_create(authors)
+        Category.objects.bulk_create(categories)
+        Link.objects.bulk_create(links)
+        refresh_listing_rows(created + changed_articles)
+        index_articles(created)
+
+        self.stats['created'] += len(created)
+        self.stats['updated'] += len(changed_articles)
+        return created
+
+    def queue_translations(self, articles):
+        if self.translate == 'celery':
+            for article in articles:
+                translate_article.delay(article.pk)
+        elif self.translate == 'inline':
+            # Wait for the batch so that memory stays bounded and the
+            # checkpoint never gets ahead of the translations.
+            pks = [article.pk for article in articles]
+            for done in self.executor.map(self.translate_one, pks):
+                self.stats['translated'] += done
+
+    def translate_one(self, article_pk):
+        article = Article.objects.get(pk=article_pk)
+        try:
+            return translate_pending_article(article)
+        except Exception as e:
+            self.stderr.write(f'Failed to translate {article}: {e}')
+            return False
+
+    def progress(self):
+        elapsed = time.monotonic() - self.started
+        rate = (self.stats['read'] - self.read_at_start) / elapsed if elapsed else 0
+        return (f'{self.stats["read"]} records read ({rate:.0f}/s), {self.stats["created"]} created, '
+                f'{self.stats["updated"]} updated, {self.stats["skipped"]} skipped, '
+                f'{self.stats["translated"]} translated in {elapsed:.0f}s')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from articles import browse_index
+
+
+class Command(BaseCommand):
+    help = 'Add every stored article to the prev/next browse index, e.g. after upgrading.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Articles per insert (default: 2000).')
+
+    def handle(self, *args, **options):
+        count = browse_index.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} articles.'))
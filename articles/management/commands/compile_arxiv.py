@@ -0,0 +1,25 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from latextranslate import translate_arxiv
+
+from articles import compile_pool, translation_memory
+
+
+class Command(BaseCommand):
+    help = ('Translate and compile one arXiv version into a directory within the compile resource limits, '
+            'run by the download_and_compile_arxiv task.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('arxiv_idv', help='The arXiv id with version, e.g. 2401.00001v2.')
+        parser.add_argument('output', help='The directory to compile into.')
+
+    def handle(self, *args, **options):
+        arxiv_idv = options['arxiv_idv']
+        match = re.fullmatch(r'(.+)v(\d+)', arxiv_idv)
+        if not match:
+            raise CommandError(f'Invalid arxiv_idv format: {arxiv_idv}')
+
+        compile_pool.limit_this_process()
+        with translation_memory.reusing_translations(match[1]):
+            translate_arxiv.main([arxiv_idv, '-o', options['output']])
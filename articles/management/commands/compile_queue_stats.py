@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from articles import compile_queue
+
+
+class Command(BaseCommand):
+    help = 'Show the depth of each compile queue and how long its latest started task waited.'
+
+    def handle(self, *args, **options):
+        depths = compile_queue.queue_depths()
+        waits = compile_queue.last_waits()
+        self.stdout.write(f'{"queue":<20} {"depth":>8} {"last wait":>12} {"started":>14}')
+        for priority in compile_queue.PRIORITIES:
+            depth = '?' if depths[priority] is None else depths[priority]
+            wait = waits[priority]
+            last_wait = f'{wait["seconds"]:.0f}s' if wait else '-'
+            started = f'{time.time() - wait["at"]:.0f}s ago' if wait else '-'
+            self.stdout.write(f'{compile_queue.queue_name(priority):<20} {depth:>8} {last_wait:>12} {started:>14}')
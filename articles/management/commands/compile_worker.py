@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from articles import compile_pool, compile_queue
+
+
+class Command(BaseCommand):
+    help = ('Run a Celery worker for the compile queues, with a concurrency derived from the cores and memory '
+            'left by the web processes (see articles/compile_pool.py).')
+
+    def add_arguments(self, parser):
+        default_queues = ','.join(compile_queue.queue_name(priority) for priority in compile_queue.PRIORITIES)
+        parser.add_argument('-Q', '--queues', default=default_queues, help=f'The queues to take (default: {default_queues}).')
+        parser.add_argument('-c', '--concurrency', type=int, default=None, help='Compiles at once, derived by default.')
+        parser.add_argument('-n', '--hostname', default='compile@%h', help='The node name of the worker (default: compile@%%h).')
+        parser.add_argument('-l', '--loglevel', default='INFO')
+
+    def handle(self, *args, **options):
+        from cenxiv.celery import app
+
+        queues = options['queues'].split(',')
+        concurrency = options['concurrency'] or compile_pool.worker_concurrency(queues)
+        self.stdout.write(f'Compile worker on {", ".join(queues)} with concurrency {concurrency}')
+        app.worker_main([
+            'worker', '-l', options['loglevel'], '-Q', ','.join(queues), '-c', str(concurrency),
+            '-n', options['hostname'],
+        ])
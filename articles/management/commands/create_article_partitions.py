@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from articles import partitions
+
+
+class Command(BaseCommand):
+    help = 'Create the yearly partitions of the article table ahead of time (PostgreSQL only).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years-ahead', type=int, default=1,
+                            help='Create partitions up to this many years after the current one (default: 1).')
+        parser.add_argument('--from-year', type=int, default=None,
+                            help='First year to make sure of, defaults to the oldest existing partition.')
+        parser.add_argument('--list', action='store_true', help='Only list the existing yearly partitions.')
+
+    def handle(self, *args, **options):
+        if not partitions.is_postgresql(connection):
+            self.stdout.write(self.style.WARNING(f'Partitioning is not used on {connection.vendor}, nothing to do.'))
+            return
+        if not partitions.is_partitioned(connection):
+            raise CommandError(f'{partitions.TABLE} is not partitioned, run "manage.py migrate articles" first.')
+
+        if options['list']:
+            for year in partitions.partition_years(connection):
+                self.stdout.write(partitions.partition_name(year))
+            return
+
+        with transaction.atomic():
+            created = partitions.ensure_partitions(
+                connection,
+                years_ahead=options['years_ahead'],
+                first_year=options['from_year'],
+            )
+        if created:
+            for year in created:
+                self.stdout.write(self.style.SUCCESS(f'Created {partitions.partition_name(year)}'))
+        else:
+            self.stdout.write('All partitions already exist.')
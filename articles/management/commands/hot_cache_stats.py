@@ -0,0 +1,19 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Show the hit ratios of the per-process hot cache tier by key namespace, added up across processes.'
+
+    def handle(self, *args, **options):
+        stats = caches['hot'].stats()
+        if not stats:
+            self.stdout.write('No hot cache lookups counted yet.')
+            return
+        self.stdout.write(f'{"namespace":<32} {"local":>10} {"memcached":>10} {"miss":>10} {"hit ratio":>10}')
+        for ns, counts in stats.items():
+            total = sum(counts.values())
+            ratio = (counts['local'] + counts['remote']) / total if total else 0
+            self.stdout.write(
+                f'{ns:<32} {counts["local"]:>10} {counts["remote"]:>10} {counts["miss"]:>10} {ratio:>10.1%}'
+            )
@@ -0,0 +1,39 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from articles import artifacts
+
+
+class Command(BaseCommand):
+    help = ('Publish the versions compiled under CENXIV_FILE_PATH before the artifact store, '
+            'writing their manifests and deduplicating their files.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('arxiv_id', nargs='*', help='Only these papers, all by default.')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the versions without a manifest.')
+
+    def handle(self, *args, **options):
+        store = artifacts.store()
+        if not isinstance(store, artifacts.LocalArtifactStore):
+            raise CommandError('Only versions of the local artifact store can be published in place.')
+
+        published = failed = 0
+        for arxiv_id in options['arxiv_id'] or sorted(store.papers()):
+            for version in store.versions(arxiv_id):
+                directory = os.path.join(store.root, artifacts.version_dir(arxiv_id, version))
+                if os.path.isfile(os.path.join(directory, artifacts.MANIFEST)):
+                    continue
+                if options['dry_run']:
+                    self.stdout.write(f'{arxiv_id}v{version}')
+                    continue
+                try:
+                    manifest = store.publish(arxiv_id, version, directory)
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f'Failed to publish {arxiv_id}v{version}: {e}')
+                    continue
+                published += 1
+                self.stdout.write(f'{arxiv_id}v{version}: {len(manifest["files"])} files')
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Published {published} versions, {failed} failed.'))
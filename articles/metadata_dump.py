@@ -0,0 +1,148 @@
+"""Streaming readers for local arXiv metadata dumps.
+
+Two formats are understood:
+
+* the public JSON-lines snapshot (``arxiv-metadata-oai-snapshot.json``), one
+  paper per line;
+* OAI-PMH ``ListRecords`` responses in the ``arXivRaw`` metadata format, the
+  only OAI format that lists the versions of a paper.
+
+Both may be gzip compressed. Every reader yields ``(position, DumpRecord)``
+pairs, ``position`` is what has to be passed back as ``start`` to continue
+right after that record: a byte offset for JSON-lines, a record count for
+XML. Only the current record is kept in memory.
+"""
+import re
+import gzip
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+from lxml import etree
+
+
+OAI_NS = 'http://www.openarchives.org/OAI/2.0/'
+ARXIV_RAW_NS = 'http://arxiv.org/OAI/arXivRaw/'
+
+
+@dataclass
+class DumpRecord:
+    """The latest version of one paper, as found in a dump."""
+    arxiv_id: str
+    version: int
+    title: str
+    abstract: str
+    published: datetime
+    updated: datetime
+    primary_category: str
+    categories: list = field(default_factory=list)
+    authors: list = field(default_factory=list)
+    comment: str = None
+    journal_ref: str = None
+    doi: str = None
+
+    @property
+    def links(self):
+        links = [f'http://arxiv.org/abs/{self.arxiv_id}v{self.version}']
+        if self.doi:
+            links.append(f'http://dx.doi.org/{self.doi}')
+        links.append(f'http://arxiv.org/pdf/{self.arxiv_id}v{self.version}')
+        return links
+
+
+def _open(path):
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+
+def _clean(text):
+    """Collapse the line wrapping of the dumps, like the arXiv API does for titles."""
+    if text is None:
+        return None
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text or None
+
+
+def _split_authors(authors):
+    authors = re.sub(r'\s+', ' ', authors or '').strip()
+    return [name.strip() for name in re.split(r',\s*|\s+and\s+', authors) if name.strip()]
+
+
+def _record(arxiv_id, versions, title, abstract, categories, authors, comment, journal_ref, doi):
+    """Build a DumpRecord from ``versions``, a list of ``(number, RFC 2822 date)``."""
+    versions = sorted(versions)
+    categories = (categories or '').split()
+    if not versions or not categories:
+        return None
+    return DumpRecord(
+        arxiv_id=arxiv_id,
+        version=versions[-1][0],
+        title=_clean(title),
+        abstract=(abstract or '').strip(),
+        published=parsedate_to_datetime(versions[0][1]),
+        updated=parsedate_to_datetime(versions[-1][1]),
+        primary_category=categories[0],
+        categories=categories,
+        authors=authors,
+        comment=_clean(comment),
+        journal_ref=_clean(journal_ref),
+        doi=_clean(doi),
+    )
+
+
+def iter_json_lines(path, start=0):
+    with _open(path) as f:
+        f.seek(start)
+        while line := f.readline():
+            position = f.tell()
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            if data.get('authors_parsed'):
+                # [keyname, forenames, suffix]
+                authors = [' '.join(part for part in (a[1], a[0], *a[2:]) if part) for a in data['authors_parsed']]
+            else:
+                authors = _split_authors(data.get('authors'))
+            versions = [(int(v['version'].lstrip('v')), v['created']) for v in data.get('versions', [])]
+            record = _record(
+                data['id'], versions, data.get('title'), data.get('abstract'), data.get('categories'),
+                authors, data.get('comments'), data.get('journal-ref'), data.get('doi'),
+            )
+            yield position, record
+
+
+def iter_oai_xml(path, start=0):
+    def text(element, tag):
+        child = element.find(f'{{{ARXIV_RAW_NS}}}{tag}')
+        return child.text if child is not None else None
+
+    with _open(path) as f:
+        position = 0
+        for _, element in etree.iterparse(f, events=('end',), tag=f'{{{OAI_NS}}}record'):
+            position += 1
+            if position > start:
+                metadata = element.find(f'.//{{{ARXIV_RAW_NS}}}arXivRaw')
+                record = None
+                if metadata is not None:
+                    versions = [
+                        (int(v.get('version').lstrip('v')), v.findtext(f'{{{ARXIV_RAW_NS}}}date'))
+                        for v in metadata.iterfind(f'{{{ARXIV_RAW_NS}}}version')
+                    ]
+                    record = _record(
+                        text(metadata, 'id'), versions, text(metadata, 'title'), text(metadata, 'abstract'),
+                        text(metadata, 'categories'), _split_authors(text(metadata, 'authors')),
+                        text(metadata, 'comments'), text(metadata, 'journal-ref'), text(metadata, 'doi'),
+                    )
+                yield position, record
+            # Free the parsed record and everything before it.
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+
+def iter_dump(path, start=0):
+    """Yield ``(position, record)`` for every paper of a dump, ``record`` is None for deleted or broken entries."""
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith('.xml'):
+        return iter_oai_xml(path, start)
+    return iter_json_lines(path, start)
@@ -0,0 +1,282 @@
+"""Page cache that serves expired pages while one background task rebuilds them.
+
+Pages are cached with Django's cache middleware keys and format (the
+response itself under the ``learn_cache_key`` key), for as long as the
+``Cache-Control`` max-age set by their route policy (see ``cache_policy``).
+Responses without a max-age are not cached.
+
+Paths matching one of ``CENXIV_PAGE_CACHE_GRACE`` stay in the cache for
+that many seconds beyond their max-age. A request for such a page after it
+expired (past its ``Expires``) gets the expired copy at once, and only the
+request that takes the refresh lock queues ``refresh_page_task``, which
+requests the page again through the whole stack to replace it. So nobody
+waits for the scraping and translation of a rebuild unless the page is
+not cached at all. A fresh page is also refreshed that way a little before
+it expires, with a probability that grows as the expiry gets closer and the
+longer the page took to build (XFetch, see ``stampede``). The refresh
+request only carries the headers the page varies on, never the cookies or
+credentials of the visitor, so an expired page varying on them is rebuilt
+in the request instead.
+
+Cached pages are stored with gzip and, when the ``brotli`` package is
+installed, brotli encoded copies of their body, made once when the page is
+cached. Each response gets the best copy its ``Accept-Encoding`` allows
+(with ``Vary: Accept-Encoding``), so a cache hit costs no compression. The
+plain body is not stored along with them, which would make the largest
+listings too big for a memcached item, it is decompressed from the gzip copy
+for the rare clients that accept no encoding. The cache key does not depend
+on ``Accept-Encoding``, all clients share one entry.
+
+``UpdatePageCacheMiddleware`` goes first in ``MIDDLEWARE`` (after
+``GZipTextMiddleware``, which compresses the pages that are not cached) and
+``FetchFromPageCacheMiddleware`` last, like Django's cache middleware.
+"""
+import re
+import gzip
+import time
+import logging
+import functools
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.middleware.cache import FetchFromCacheMiddleware, UpdateCacheMiddleware
+from django.middleware.gzip import GZipMiddleware
+from django.test.client import RequestFactory
+from django.utils.cache import (
+    get_cache_key, get_max_age, has_vary_header, learn_cache_key, patch_cache_control, patch_response_headers,
+    patch_vary_headers,
+)
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import parse_http_date_safe
+
+from .stampede import refresh_early
+
+try:
+    import brotli
+except ImportError:
+    # not installed yet (e.g. an old lock file), pages are only stored gzip encoded
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+REFRESH_HEADER = 'X-Cenxiv-Page-Refresh'
+REFRESH_LOCK_TIMEOUT = 5 * 60 # seconds
+# credentials of the visitor, never handed to a background refresh
+PRIVATE_HEADERS = {'cookie', 'authorization'}
+
+MIN_ENCODE_SIZE = 200 # bytes, smaller pages are sent as they are
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/xml')
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9 # 11 takes seconds for the largest listings
+
+
+def grace_period(path):
+    """Seconds an expired page at ``path`` may still be served."""
+    for pattern, seconds in settings.CENXIV_PAGE_CACHE_GRACE:
+        if re.match(pattern, path):
+            return seconds
+    return 0
+
+
+def refresh_token(cache_key):
+    """Proves to the middleware that a request comes from ``refresh_page_task``."""
+    return salted_hmac('articles.middleware.refresh', cache_key).hexdigest()
+
+
+def _refresh_lock_key(cache_key):
+    return f'cenxiv:page_refresh_lock:{cache_key}'
+
+
+def _varies_on_private_headers(response):
+    return any(header.lower() in PRIVATE_HEADERS for header in re.split(r'\s*,\s*', response.get('Vary', '')))
+
+
+def _encode_variants(response):
+    """Store the encoded copies of the body of ``response`` along with it."""
+    content_type = response.get('Content-Type', '')
+    if (response.has_header('Content-Encoding') or len(response.content) < MIN_ENCODE_SIZE
+            or not content_type.startswith(COMPRESSIBLE_TYPES)):
+        return
+    variants = {'gzip': gzip.compress(response.content, GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(response.content, quality=BROTLI_QUALITY)
+    response.encoded_variants = {
+        encoding: content for encoding, content in variants.items() if len(content) < len(response.content)
+    }
+
+
+def _cache_response(cache, cache_key, response, timeout):
+    """Cache ``response``, without its plain body when it has a gzip copy to decompress it from."""
+    variants = getattr(response, 'encoded_variants', None)
+    if not variants or 'gzip' not in variants:
+        cache.set(cache_key, response, timeout)
+        return
+    content = response.content
+    response.content = b''
+    response.content_in_gzip = True
+    try:
+        cache.set(cache_key, response, timeout)
+    finally:
+        response.content = content
+        del response.content_in_gzip
+
+
+def _accepted_encodings(request):
+    """The content codings ``request`` accepts, without those with q=0."""
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        q = re.search(r'q\s*=\s*([\d.]+)', params)
+        try:
+            weight = float(q.group(1)) if q else 1
+        except ValueError:
+            # e.g. "q=." or "q=1.2.3", taken as no weight at all
+            weight = 1
+        if coding and weight != 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _send_encoded(request, response):
+    """Replace the body of ``response`` with the best encoded copy ``request`` accepts."""
+    variants = getattr(response, 'encoded_variants', None)
+    if not variants or response.has_header('Content-Encoding'):
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+    accepted = _accepted_encodings(request)
+    for encoding in ('br', 'gzip'):
+        if encoding in variants and (encoding in accepted or '*' in accepted):
+            response.content = variants[encoding]
+            response['Content-Encoding'] = encoding
+            response['Content-Length'] = str(len(response.content))
+            etag = response.get('ETag')
+            if etag and etag.startswith('"'):
+                # the encoded body is not byte for byte the same
+                response['ETag'] = 'W/' + etag
+            break
+    else:
+        if getattr(response, 'content_in_gzip', False):
+            response.content = gzip.decompress(variants['gzip'])
+            response['Content-Length'] = str(len(response.content))
+    return response
+
+
+class GZipTextMiddleware(GZipMiddleware):
+    """``GZipMiddleware`` for the pages only, files are sent as they are.
+
+    Django's middleware also compresses streamed responses, e.g. the PDFs of
+    ``file_delivery.serve_file`` and their byte ranges, whose
+    ``Content-Range`` would then describe bytes the body no longer has.
+    """
+
+    def process_response(self, request, response):
+        if (response.streaming or response.has_header('Content-Range')
+                or not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES)):
+            return response
+        return super().process_response(request, response)
+
+
+class UpdatePageCacheMiddleware(UpdateCacheMiddleware):
+    """Caches the pages that have a max-age, for the max-age plus the grace period of their path."""
+
+    def process_response(self, request, response):
+        if not self._should_update_cache(request, response):
+            return response
+        if request.method != 'GET' or response.streaming or response.status_code != 200:
+            return response
+        # user specific pages
+        if response.cookies and has_vary_header(response, 'Cookie'):
+            return response
+        if 'private' in response.get('Cache-Control', ()):
+            return response
+        max_age = get_max_age(response)
+        if not max_age:
+            return response
+
+        patch_response_headers(response, max_age)
+        timeout = max_age + grace_period(request.path_info)
+        # learnt before Vary gets Accept-Encoding, every encoding is in the one entry
+        cache_key = learn_cache_key(request, response, timeout, self.key_prefix, cache=self.cache)
+
+        def cache_and_send(response):
+            # for the early refreshes
+            response.build_seconds = time.monotonic() - getattr(request, '_page_build_started', time.monotonic())
+            _encode_variants(response)
+            _cache_response(self.cache, cache_key, response, timeout)
+            _send_encoded(request, response)
+
+        if hasattr(response, 'render') and callable(response.render):
+            response.add_post_render_callback(cache_and_send)
+        else:
+            cache_and_send(response)
+        return response
+
+
+class FetchFromPageCacheMiddleware(FetchFromCacheMiddleware):
+    """Serves cached pages, expired ones in their grace period with a background refresh."""
+
+    def process_request(self, request):
+        token = request.headers.get(REFRESH_HEADER)
+        if token is not None and request.method == 'GET':
+            cache_key = get_cache_key(request, self.key_prefix, 'GET', cache=self.cache)
+            if cache_key and constant_time_compare(token, refresh_token(cache_key)):
+                # rebuild the page, whatever is cached
+                request._cache_update_cache = True
+                request._page_build_started = time.monotonic()
+                return None
+
+        response = super().process_request(request)
+        if response is None:
+            request._page_build_started = time.monotonic()
+            return None
+
+        expires = parse_http_date_safe(response.get('Expires', ''))
+        if expires is not None and expires < time.time() and _varies_on_private_headers(response):
+            # a refresh without the credentials of the visitor would build another page, rebuild it now
+            request._cache_update_cache = True
+            request._page_build_started = time.monotonic()
+            return None
+        if expires is not None and expires < time.time():
+            self._queue_refresh(request, response)
+            # clients and the CDN should come back soon for the rebuilt page
+            patch_cache_control(response, max_age=0)
+            response['Surrogate-Control'] = 'max-age=0'
+        elif expires is not None and not _varies_on_private_headers(response) and refresh_early(expires, getattr(response, 'build_seconds', 0)):
+            self._queue_refresh(request, response)
+        return _send_encoded(request, response)
+
+    def _queue_refresh(self, request, response):
+        """Queue ``refresh_page_task`` for the page of ``request``, unless another request already did."""
+        cache_key = get_cache_key(request, self.key_prefix, 'GET', cache=self.cache)
+        if not cache_key or not self.cache.add(_refresh_lock_key(cache_key), 'locked', timeout=REFRESH_LOCK_TIMEOUT):
+            return
+        # imported here, tasks imports the whole app
+        from .tasks import refresh_page_task
+        headers = {
+            header: request.headers[header]
+            for header in re.split(r'\s*,\s*', response.get('Vary', ''))
+            if header and header.lower() not in PRIVATE_HEADERS and header in request.headers
+        }
+        headers['Host'] = request.get_host()
+        headers[REFRESH_HEADER] = refresh_token(cache_key)
+        refresh_page_task.delay(request.get_full_path(), request.is_secure(), headers, _refresh_lock_key(cache_key))
+
+
+@functools.cache
+def _handler():
+    """The request handler of the worker process, with the middleware of the site loaded once."""
+    return WSGIHandler()
+
+
+def refresh_page(path, secure, headers, lock_key):
+    """Request ``path`` through the whole stack so that the page cache is updated, see ``refresh_page_task``."""
+    request = RequestFactory().get(path, secure=secure, headers=headers)
+    try:
+        response = _handler().get_response(request)
+        response.close()
+        if response.status_code != 200:
+            logger.warning(f'Refreshing the cached page {path} got {response.status_code}')
+    finally:
+        cache.delete(lock_key)
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0002_article_unique_article_version'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='article',
+            options={'verbose_name': 'Article', 'verbose_name_plural': 'Articles'},
+        ),
+        migrations.AlterField(
+            model_name='author',
+            name='article',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='authors', to='articles.article'),
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='article',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='categories', to='articles.article'),
+        ),
+        migrations.AlterField(
+            model_name='link',
+            name='article',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='links', to='articles.article'),
+        ),
+    ]
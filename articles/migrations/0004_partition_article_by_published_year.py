@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from articles.partitions import partition_article_table, unpartition_article_table
+
+
+def forwards(apps, schema_editor):
+    partition_article_table(schema_editor.connection)
+
+
+def backwards(apps, schema_editor):
+    unpartition_article_table(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    """Partition ``articles_article`` by published year on PostgreSQL, no-op elsewhere."""
+
+    dependencies = [
+        ('articles', '0003_drop_article_ordering_and_child_fk_constraints'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards, elidable=False),
+    ]
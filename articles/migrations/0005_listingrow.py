@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0004_partition_article_by_published_year'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('arxiv_idv', models.CharField(max_length=120, verbose_name='arXiv ID with Version')),
+                ('language', models.CharField(max_length=10, verbose_name='Language')),
+                ('payload', models.JSONField(verbose_name='Payload')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated at')),
+                ('article', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='listing_rows', to='articles.article')),
+            ],
+            options={
+                'verbose_name': 'Listing Row',
+                'verbose_name_plural': 'Listing Rows',
+                'constraints': [models.UniqueConstraint(fields=('arxiv_idv', 'language'), name='unique_listing_row')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0005_listingrow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BrowseIndexEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('context', models.CharField(max_length=100, verbose_name='Context')),
+                ('entry_id', models.CharField(max_length=100, verbose_name='Entry ID')),
+                ('sort_key', models.CharField(max_length=20, verbose_name='Sort Key')),
+            ],
+            options={
+                'verbose_name': 'Browse Index Entry',
+                'verbose_name_plural': 'Browse Index Entries',
+                'indexes': [models.Index(fields=['context', 'sort_key', 'entry_id'], name='articles_br_context_063c24_idx')],
+                'constraints': [models.UniqueConstraint(fields=('context', 'entry_id'), name='unique_browse_index_entry')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0006_browseindexentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompileJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('arxiv_idv', models.CharField(max_length=120, unique=True, verbose_name='arXiv ID with Version')),
+                ('state', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('failed', 'Failed'), ('done', 'Done')], default='queued', max_length=10, verbose_name='State')),
+                ('priority', models.CharField(blank=True, max_length=20, verbose_name='Priority')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Attempts')),
+                ('queued_at', models.DateTimeField(blank=True, null=True, verbose_name='Queued at')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Started at')),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True, verbose_name='Heartbeat at')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Finished at')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+            ],
+            options={
+                'verbose_name': 'Compile Job',
+                'verbose_name_plural': 'Compile Jobs',
+            },
+        ),
+    ]
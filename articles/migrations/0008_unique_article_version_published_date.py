@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:40
+
+from django.db import migrations, models
+
+from articles.partitions import is_partitioned
+
+
+class UnlessPartitioned:
+    """Only change the state on the partitioned table, whose constraint already has ``published_date`` (0004)."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not is_partitioned(schema_editor.connection):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not is_partitioned(schema_editor.connection):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class RemoveConstraint(UnlessPartitioned, migrations.RemoveConstraint):
+    pass
+
+
+class AddConstraint(UnlessPartitioned, migrations.AddConstraint):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0007_compilejob'),
+    ]
+
+    operations = [
+        RemoveConstraint(
+            model_name='article',
+            name='unique_article_version',
+        ),
+        AddConstraint(
+            model_name='article',
+            constraint=models.UniqueConstraint(fields=('source_archive', 'entry_id', 'entry_version', 'published_date'), name='unique_article_version'),
+        ),
+    ]
@@ -1,6 +1,45 @@
+import re
+from datetime import datetime, timezone
+
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+
+def published_date_bounds(entry_id):
+    """Return the ``published_date`` window a paper with this id can fall in.
+
+    Both new style (``2401.00001``) and old style (``hep-th/9901001``) ids
+    start with the YYMM the id was assigned in, and v1 is published in or
+    right next to that month. The window is padded by a month on each side
+    and lets PostgreSQL prune the yearly partitions of ``articles_article``.
+    Returns ``None`` when the id can not be parsed.
+    """
+    match = re.match(r'^(?:[a-z\-]+(?:\.[A-Z]{2})?/)?(\d{2})(\d{2})[.\d]', entry_id)
+    if not match:
+        return None
+    yy, mm = int(match.group(1)), int(match.group(2))
+    if not 1 <= mm <= 12:
+        return None
+    year = 1900 + yy if yy >= 91 else 2000 + yy
+    month_index = year * 12 + mm - 1
+    lower_year, lower_month = divmod(month_index - 1, 12)
+    upper_year, upper_month = divmod(month_index + 2, 12)
+    return (
+        datetime(lower_year, lower_month + 1, 1, tzinfo=timezone.utc),
+        datetime(upper_year, upper_month + 1, 1, tzinfo=timezone.utc),
+    )
+
+
+class ArticleQuerySet(models.QuerySet):
+    def for_entry(self, entry_id, source_archive='arxiv'):
+        """All stored versions of one paper, restricted to the partitions it can live in."""
+        queryset = self.filter(source_archive=source_archive, entry_id=entry_id)
+        bounds = published_date_bounds(entry_id)
+        if bounds:
+            queryset = queryset.filter(published_date__gte=bounds[0], published_date__lt=bounds[1])
+        return queryset
+
+
 class Article(models.Model):
     source_archive = models.CharField(_('Source Archive'), max_length=100, default='arxiv')
     entry_id = models.CharField(_('Entry ID'), max_length=100)
@@ -21,8 +60,11 @@ class Article(models.Model):
     updated_at = models.DateTimeField(_('Updated at'), auto_now=True)
     translation_validated = models.BooleanField(_('Translation Validated'), default=False)
 
+    objects = ArticleQuerySet.as_manager()
+
     class Meta:
-        ordering = ['-updated_date']
+        # No default ordering: on the partitioned table an unqualified query
+        # would otherwise sort every partition. Order explicitly where needed.
         verbose_name = _('Article')
         verbose_name_plural = _('Articles')
         indexes = [
@@ -30,9 +72,12 @@ class Article(models.Model):
             models.Index(fields=['source_archive', 'entry_id', 'entry_version']),
         ]
         # 添加唯一约束
+        # On PostgreSQL the table is partitioned by published_date year (see
+        # articles.partitions), which needs the partition key in every unique
+        # constraint; it is the same for every version of a paper.
         constraints = [
             models.UniqueConstraint(
-                fields=['source_archive', 'entry_id', 'entry_version'],
+                fields=['source_archive', 'entry_id', 'entry_version', 'published_date'],
                 name='unique_article_version'
             )
         ]
@@ -49,7 +94,10 @@ class Article(models.Model):
 
 class Author(models.Model):
     name = models.CharField(_('Name'), max_length=100)
-    article = models.ForeignKey('Article', on_delete=models.CASCADE, related_name='authors')
+    # PostgreSQL can not reference the partitioned article table by id alone,
+    # so no database foreign keys here (nor on Category and Link); deletes
+    # still cascade through the ORM.
+    article = models.ForeignKey('Article', on_delete=models.CASCADE, related_name='authors', db_constraint=False)
 
     class Meta:
         verbose_name = _('Author')
@@ -61,7 +109,7 @@ class Author(models.Model):
 
 class Category(models.Model):
     name = models.CharField(_('Name'), max_length=100)
-    article = models.ForeignKey('Article', on_delete=models.CASCADE, related_name='categories')
+    article = models.ForeignKey('Article', on_delete=models.CASCADE, related_name='categories', db_constraint=False)
 
     class Meta:
         verbose_name = _('Category')
@@ -73,11 +121,96 @@ class Category(models.Model):
 
 class Link(models.Model):
     url = models.URLField(_('URL'))
-    article = models.ForeignKey('Article', on_delete=models.CASCADE, related_name='links')
+    article = models.ForeignKey('Article', on_delete=models.CASCADE, related_name='links', db_constraint=False)
 
     class Meta:
         verbose_name = _('Link')
         verbose_name_plural = _('Links')
 
     def __str__(self):
-        return f"{self.url}"
\ No newline at end of file
+        return f"{self.url}"
+
+class ListingRow(models.Model):
+    """Everything the list templates read for one article version in one language.
+
+    Written by :mod:`articles.listing_rows` when an article is stored or its
+    translation edited, so that a listing page is a single ``IN`` query.
+    """
+    arxiv_idv = models.CharField(_('arXiv ID with Version'), max_length=120)
+    language = models.CharField(_('Language'), max_length=10)
+    article = models.ForeignKey('Article', on_delete=models.CASCADE, related_name='listing_rows', db_constraint=False)
+    payload = models.JSONField(_('Payload'))
+    updated_at = models.DateTimeField(_('Updated at'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Listing Row')
+        verbose_name_plural = _('Listing Rows')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['arxiv_idv', 'language'],
+                name='unique_listing_row'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.arxiv_idv} ({self.language})"
+
+class BrowseIndexEntry(models.Model):
+    """One known paper in one browse context (category, archive or ``all``).
+
+    Kept in arXiv id order by ``sort_key`` for prev/next navigation on the abs
+    page, see :mod:`articles.browse_index`.
+    """
+    context = models.CharField(_('Context'), max_length=100)
+    entry_id = models.CharField(_('Entry ID'), max_length=100)
+    sort_key = models.CharField(_('Sort Key'), max_length=20)
+
+    class Meta:
+        verbose_name = _('Browse Index Entry')
+        verbose_name_plural = _('Browse Index Entries')
+        indexes = [
+            models.Index(fields=['context', 'sort_key', 'entry_id']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['context', 'entry_id'],
+                name='unique_browse_index_entry'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.entry_id} ({self.context})"
+
+class CompileJob(models.Model):
+    """The latest compilation of the Chinese PDF of one arXiv version.
+
+    Written by :mod:`articles.compile_queue` when the version is queued and by
+    the compile task as it runs, and polled by the no_cn_pdf page.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    DONE = 'done'
+    STATE_CHOICES = [
+        (QUEUED, _('Queued')),
+        (RUNNING, _('Running')),
+        (FAILED, _('Failed')),
+        (DONE, _('Done')),
+    ]
+
+    arxiv_idv = models.CharField(_('arXiv ID with Version'), max_length=120, unique=True)
+    state = models.CharField(_('State'), max_length=10, choices=STATE_CHOICES, default=QUEUED)
+    priority = models.CharField(_('Priority'), max_length=20, blank=True)
+    attempts = models.PositiveIntegerField(_('Attempts'), default=0)
+    queued_at = models.DateTimeField(_('Queued at'), null=True, blank=True)
+    started_at = models.DateTimeField(_('Started at'), null=True, blank=True)
+    heartbeat_at = models.DateTimeField(_('Heartbeat at'), null=True, blank=True)
+    finished_at = models.DateTimeField(_('Finished at'), null=True, blank=True)
+    error = models.TextField(_('Error'), blank=True)
+
+    class Meta:
+        verbose_name = _('Compile Job')
+        verbose_name_plural = _('Compile Jobs')
+
+    def __str__(self):
+        return f"{self.arxiv_idv} ({self.state})"
@@ -0,0 +1,175 @@
+"""PostgreSQL declarative partitioning of the article table.
+
+``articles_article`` is range partitioned by ``published_date`` with one
+partition per year (``articles_article_y2024`` ...) plus a default partition
+catching anything outside the created ranges. Every other database backend
+keeps the plain table and all functions here are no-ops for them.
+
+PostgreSQL requires the partition key in every unique constraint, so on the
+partitioned table the primary key is ``(id, published_date)`` and
+``unique_article_version`` carries ``published_date``, on every backend
+since migration 0008. The published date is the v1 date, shared by all
+versions of a paper, so the constraint keeps its meaning.
+"""
+import logging
+from datetime import date
+
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'articles_article'
+DEFAULT_PARTITION = f'{TABLE}_default'
+UNPARTITIONED_TABLE = f'{TABLE}_unpartitioned'
+SEQUENCE = f'{TABLE}_id_seq'
+
+INDEXES = [
+    ('articles_ar_updated_64c5b3_idx', '(updated_date DESC)'),
+    ('articles_ar_source__547fa4_idx', '(source_archive, entry_id, entry_version)'),
+]
+
+
+def is_postgresql(connection):
+    return connection.vendor == 'postgresql'
+
+
+def partition_name(year):
+    return f'{TABLE}_y{year:04d}'
+
+
+def _year_bounds(year):
+    return f"'{year:04d}-01-01 00:00:00+00'", f"'{year + 1:04d}-01-01 00:00:00+00'"
+
+
+def is_partitioned(connection):
+    if not is_postgresql(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid '
+            'WHERE c.relname = %s AND pg_table_is_visible(c.oid)',
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def partition_years(connection):
+    """Years that already have their own partition."""
+    if not is_partitioned(connection):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits i '
+            'JOIN pg_class parent ON parent.oid = i.inhparent '
+            'JOIN pg_class child ON child.oid = i.inhrelid '
+            'WHERE parent.relname = %s',
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    prefix = f'{TABLE}_y'
+    return sorted(int(name[len(prefix):]) for name in names if name.startswith(prefix))
+
+
+def create_year_partition(connection, year):
+    """Create the partition for ``year``, returns False if it already exists.
+
+    Rows that were routed to the default partition in the meantime are moved
+    into the new partition, PostgreSQL refuses to create it otherwise.
+    """
+    if year in partition_years(connection):
+        return False
+
+    name = partition_name(year)
+    lower, upper = _year_bounds(year)
+    in_range = f'published_date >= {lower} AND published_date < {upper}'
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range})')
+        default_has_rows = cursor.fetchone()[0]
+        if default_has_rows:
+            cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}')
+        cursor.execute(f'CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES FROM ({lower}) TO ({upper})')
+        if default_has_rows:
+            cursor.execute(f'INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE {in_range}')
+            cursor.execute(f'DELETE FROM {DEFAULT_PARTITION} WHERE {in_range}')
+            cursor.execute(f'ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT')
+    logger.info(f'Created partition {name} for articles published in {year}')
+    return True
+
+
+def ensure_partitions(connection, years_ahead=1, first_year=None):
+    """Make sure every year from ``first_year`` up to ``years_ahead`` from now has a partition."""
+    if not is_partitioned(connection):
+        return []
+    existing = partition_years(connection)
+    if first_year is None:
+        first_year = existing[0] if existing else date.today().year
+    last_year = date.today().year + years_ahead
+    return [year for year in range(first_year, last_year + 1) if create_year_partition(connection, year)]
+
+
+def partition_article_table(connection, years_ahead=1):
+    """Convert the plain article table into a partitioned one, keeping its rows."""
+    if not is_postgresql(connection) or is_partitioned(connection):
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT EXTRACT(YEAR FROM MIN(published_date))::int FROM {TABLE}')
+        first_year = cursor.fetchone()[0] or date.today().year
+
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {UNPARTITIONED_TABLE}')
+        cursor.execute(
+            f'CREATE TABLE {TABLE} (LIKE {UNPARTITIONED_TABLE} INCLUDING DEFAULTS INCLUDING STORAGE) '
+            f'PARTITION BY RANGE (published_date)'
+        )
+        cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT')
+        for year in range(first_year, date.today().year + years_ahead + 1):
+            lower, upper = _year_bounds(year)
+            cursor.execute(
+                f'CREATE TABLE {partition_name(year)} PARTITION OF {TABLE} '
+                f'FOR VALUES FROM ({lower}) TO ({upper})'
+            )
+        cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {UNPARTITIONED_TABLE}')
+        cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {UNPARTITIONED_TABLE}')
+        max_id = cursor.fetchone()[0]
+        # Dropping the old table also drops its identity sequence, the primary
+        # key and the index names which are reused below.
+        cursor.execute(f'DROP TABLE {UNPARTITIONED_TABLE}')
+
+        # Identity columns on partitioned tables need PostgreSQL 17, an owned
+        # sequence works everywhere and is what pg_get_serial_sequence finds.
+        cursor.execute(f'CREATE SEQUENCE {SEQUENCE} OWNED BY {TABLE}.id')
+        cursor.execute('SELECT setval(%s, %s, false)', [SEQUENCE, max_id + 1])
+        cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{SEQUENCE}')")
+
+        cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, published_date)')
+        cursor.execute(
+            f'ALTER TABLE {TABLE} ADD CONSTRAINT unique_article_version '
+            f'UNIQUE (source_archive, entry_id, entry_version, published_date)'
+        )
+        for index_name, columns in INDEXES:
+            cursor.execute(f'CREATE INDEX {index_name} ON {TABLE} {columns}')
+
+
+def unpartition_article_table(connection):
+    """Reverse of :func:`partition_article_table`."""
+    if not is_partitioned(connection):
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {UNPARTITIONED_TABLE}')
+        cursor.execute(f'CREATE TABLE {TABLE} (LIKE {UNPARTITIONED_TABLE} INCLUDING STORAGE)')
+        cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {UNPARTITIONED_TABLE}')
+        cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {UNPARTITIONED_TABLE}')
+        max_id = cursor.fetchone()[0]
+        cursor.execute(f'DROP TABLE {UNPARTITIONED_TABLE} CASCADE')
+
+        cursor.execute(
+            f'ALTER TABLE {TABLE} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY '
+            f'(RESTART WITH {max_id + 1})'
+        )
+        cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id)')
+        cursor.execute(
+            f'ALTER TABLE {TABLE} ADD CONSTRAINT unique_article_version '
+            f'UNIQUE (source_archive, entry_id, entry_version)'
+        )
+        for index_name, columns in INDEXES:
+            cursor.execute(f'CREATE INDEX {index_name} ON {TABLE} {columns}')
@@ -0,0 +1,80 @@
+"""Compact serialisation of arXiv API results for the cache.
+
+Pickled ``arxivapi.Result`` objects carry the whole feed entry they were
+parsed from (``_raw``) and their nested author and link objects, are slow to
+unpickle and break when the library changes its classes. Cached results are
+stored instead as the fields we use, in a fixed order, as compact JSON,
+compressed with zlib when larger than ``COMPRESS_THRESHOLD`` bytes. The
+first byte says how the rest is encoded.
+
+``SCHEMA_VERSION`` is part of the cache keys (see :func:`cache_key`), so
+changing the layout only makes the entries of the old one unreachable.
+"""
+import json
+import zlib
+from datetime import datetime, timezone
+
+import arxivapi  # The PyPI arxiv package
+
+
+SCHEMA_VERSION = 1
+COMPRESS_THRESHOLD = 512 # bytes
+
+_PLAIN = b'j'
+_ZLIB = b'z'
+
+
+def cache_key(prefix, *parts):
+    """A cache key for encoded results, with the schema version."""
+    return ':'.join([prefix, f'v{SCHEMA_VERSION}', *map(str, parts)])
+
+
+def _timestamp(dt):
+    return int(dt.replace(tzinfo=dt.tzinfo or timezone.utc).timestamp())
+
+
+def encode(result):
+    """``result`` as compact bytes for the cache."""
+    fields = [
+        result.entry_id,
+        _timestamp(result.updated),
+        _timestamp(result.published),
+        result.title,
+        [author.name for author in result.authors],
+        result.summary,
+        result.comment,
+        result.journal_ref,
+        result.doi,
+        result.primary_category,
+        result.categories,
+        [[link.href, link.title, link.rel, link.content_type] for link in result.links],
+    ]
+    data = json.dumps(fields, ensure_ascii=False, separators=(',', ':')).encode()
+    if len(data) > COMPRESS_THRESHOLD:
+        return _ZLIB + zlib.compress(data)
+    return _PLAIN + data
+
+
+def decode(data):
+    """The ``arxivapi.Result`` encoded in ``data`` by :func:`encode`."""
+    kind, data = data[:1], data[1:]
+    if kind == _ZLIB:
+        data = zlib.decompress(data)
+    elif kind != _PLAIN:
+        raise ValueError(f'Unknown result encoding {kind!r}')
+    (entry_id, updated, published, title, authors, summary, comment, journal_ref, doi,
+     primary_category, categories, links) = json.loads(data)
+    return arxivapi.Result(
+        entry_id=entry_id,
+        updated=datetime.fromtimestamp(updated, timezone.utc),
+        published=datetime.fromtimestamp(published, timezone.utc),
+        title=title,
+        authors=[arxivapi.Result.Author(name) for name in authors],
+        summary=summary,
+        comment=comment,
+        journal_ref=journal_ref,
+        doi=doi,
+        primary_category=primary_category,
+        categories=categories,
+        links=[arxivapi.Result.Link(*link) for link in links],
+    )
@@ -0,0 +1,97 @@
+"""Coalescing identical upstream fetches across workers.
+
+When several uwsgi workers or Celery tasks need the same arXiv page at the
+same time (a listing right after the announcement, a popular abs page), only
+one of them fetches and parses it. The others wait for its parsed result
+instead of sending the same request to arXiv.
+
+Coordination goes through memcached: the worker that wins ``cache.add`` on
+the lock key of a flight does the work and stores the result for
+``RESULT_TIMEOUT`` seconds, the others poll for that result for up to
+``CENXIV_SINGLEFLIGHT_WAIT`` seconds. If the leader fails or the result
+cannot be stored (e.g. larger than the memcached item size), the waiters do
+the work themselves once the lock is gone.
+
+Flights are keyed by the normalised upstream URL together with the parser,
+so the same page parsed in different ways is not mixed up.
+"""
+import time
+import uuid
+import hashlib
+import logging
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .upstream import UpstreamError
+from .utils import request_get
+
+
+logger = logging.getLogger(__name__)
+
+RESULT_TIMEOUT = 10 # seconds a result is kept for the waiters
+POLL_INTERVAL = 0.05 # seconds, doubled up to MAX_POLL_INTERVAL
+MAX_POLL_INTERVAL = 0.5 # seconds
+
+
+def normalize_url(url):
+    """``url`` with lower case scheme and host, default port, fragment and query order removed."""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme, netloc.rsplit(':', 1)[-1]) in (('http', '80'), ('https', '443')):
+        netloc = netloc.rsplit(':', 1)[0]
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, parts.path or '/', query, ''))
+
+
+def _keys(key):
+    # memcached keys are limited to 250 characters without spaces
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    return f'cenxiv:singleflight:lock:{digest}', f'cenxiv:singleflight:result:{digest}'
+
+
+def do(key, fn):
+    """Return ``fn()``, calling it in only one worker at a time for the same ``key``."""
+    lock_key, result_key = _keys(key)
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, timeout=settings.CENXIV_SINGLEFLIGHT_LOCK_TIMEOUT):
+        try:
+            value = fn()
+            try:
+                cache.set(result_key, {'value': value}, timeout=RESULT_TIMEOUT)
+            except Exception as e:
+                # e.g. larger than the memcached item size, the waiters fetch themselves
+                logger.warning(f'Failed to share the result of flight {key}: {e}')
+            return value
+        finally:
+            # the lock may have expired and been taken by another leader meanwhile
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    deadline = time.monotonic() + settings.CENXIV_SINGLEFLIGHT_WAIT
+    delay = POLL_INTERVAL
+    while time.monotonic() < deadline:
+        cached = cache.get_many([result_key, lock_key])
+        if result_key in cached:
+            return cached[result_key]['value']
+        if lock_key not in cached:
+            # the leader failed, or its result could not be cached
+            break
+        time.sleep(delay)
+        delay = min(delay * 2, MAX_POLL_INTERVAL)
+    else:
+        logger.warning(f'Gave up waiting for flight {key} after {settings.CENXIV_SINGLEFLIGHT_WAIT}s')
+    return fn()
+
+
+def fetch(url, parse, retries=3, retry_delay=0.5):
+    """``parse(response.content)`` of ``url``, fetched with ``request_get`` by one worker only."""
+    def fetch_and_parse():
+        response = request_get(url, retries=retries, retry_delay=retry_delay)
+        if not response:
+            raise UpstreamError(f"Failed to fetch URL: {url} after {retries} attempts.")
+        return parse(response.content)
+
+    return do(f'{parse.__module__}.{parse.__qualname__}:{normalize_url(url)}', fetch_and_parse)
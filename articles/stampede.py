@@ -0,0 +1,94 @@
+"""Keeping cache entries from all expiring, and being rebuilt, at once.
+
+At an announcement the pages and data of every category are cached with
+TTLs that end at the same moment, and hundreds of visitors then rebuild them
+in parallel. Three things spread that out:
+
+* TTLs are shortened by a random fraction of up to ``CENXIV_CACHE_TTL_JITTER``
+  (:func:`jittered`), so entries cached together do not expire together;
+* entries are refreshed a little before they expire, with the probabilistic
+  early expiration of XFetch (Vattani et al., "Optimal Probabilistic Cache
+  Stampede Prevention"): a reader refreshes early with a probability that
+  grows as the expiry gets closer and the longer the entry took to build,
+  scaled by ``CENXIV_XFETCH_BETA`` (:func:`refresh_early`);
+* a refresh takes a lock per key, so only one worker rebuilds an entry while
+  the others keep the cached one, and a cold entry is built by one worker
+  while the others wait for it (see ``singleflight``).
+
+The page cache (see ``middleware``) applies them to whole pages,
+:func:`get_or_build` to data.
+"""
+import math
+import time
+import random
+import logging
+
+from django.conf import settings
+from django.core.cache import cache as shared_cache
+
+
+logger = logging.getLogger(__name__)
+
+REFRESH_LOCK_TIMEOUT = 60 # seconds
+
+
+def jittered(ttl):
+    """``ttl`` shortened by a random fraction of up to ``CENXIV_CACHE_TTL_JITTER``, None stays None."""
+    if not ttl:
+        return ttl
+    return max(int(ttl * (1 - random.uniform(0, settings.CENXIV_CACHE_TTL_JITTER))), 1)
+
+
+def refresh_early(expires_at, build_seconds, now=None):
+    """Whether an entry expiring at ``expires_at`` that took ``build_seconds`` to build is refreshed now (XFetch)."""
+    if not build_seconds:
+        return False
+    now = time.time() if now is None else now
+    # log of (0, 1] is at most 0, so the bound moves before the expiry
+    return now - build_seconds * settings.CENXIV_XFETCH_BETA * math.log(1 - random.random()) >= expires_at
+
+
+def _refresh_lock_key(key):
+    return f'cenxiv:stampede:refresh_lock:{key}'
+
+
+def _build_and_store(key, build, timeout, cache):
+    started = time.monotonic()
+    value = build()
+    build_seconds = time.monotonic() - started
+    timeout = jittered(timeout)
+    cache.set(key, {
+        'value': value,
+        'build_seconds': build_seconds,
+        'expires_at': None if timeout is None else time.time() + timeout,
+    }, timeout=timeout)
+    return value
+
+
+def get_or_build(key, build, timeout, cache=shared_cache):
+    """The value cached under ``key``, built with ``build()`` and cached for about ``timeout`` seconds.
+
+    Only one worker builds a missing entry while the others wait for it, and
+    an entry about to expire is rebuilt early by the one reader that takes
+    its refresh lock. Values are cached with the time they took to build, so
+    only read ``key`` through this function. The refresh lock is taken on
+    the shared default cache whatever ``cache`` holds the value, so a
+    per-process cache still has one refresher across the workers.
+    """
+    # imported here, the middleware uses this module before the app is loaded
+    from . import singleflight
+
+    entry = cache.get(key)
+    if entry is None:
+        return singleflight.do(f'stampede:{key}', lambda: _build_and_store(key, build, timeout, cache))
+
+    if (entry['expires_at'] is not None and refresh_early(entry['expires_at'], entry['build_seconds'])
+            and shared_cache.add(_refresh_lock_key(key), 'locked', timeout=REFRESH_LOCK_TIMEOUT)):
+        try:
+            return _build_and_store(key, build, timeout, cache)
+        except Exception as e:
+            # the cached value is still good until it expires
+            logger.warning(f'Failed to refresh {key} early: {e}')
+        finally:
+            shared_cache.delete(_refresh_lock_key(key))
+    return entry['value']
@@ -0,0 +1,22 @@
+// Fill in the abs page sections that depend on the arXiv abs page once they
+// are available, the page itself is rendered from the stored article only.
+$(document).ready(function() {
+    var outer = document.getElementById('abs-outer')
+    var url = outer && outer.getAttribute('data-extras-url')
+    if (!url) {
+        return
+    }
+
+    $.getJSON(url).done(function(sections) {
+        $.each(sections, function(id, html) {
+            var container = document.getElementById(id)
+            if (container) {
+                container.innerHTML = html
+            }
+        })
+        if (window.MathJax && MathJax.Hub) {
+            MathJax.Hub.Queue(['Typeset', MathJax.Hub, 'abs-outer'])
+        }
+    })
+    // on failure the local stand-ins simply stay in place
+})
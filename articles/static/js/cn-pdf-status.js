@@ -0,0 +1,27 @@
+// Show the progress of the compile of a missing Chinese PDF, and reload the
+// page to show the PDF once it is done.
+document.addEventListener('DOMContentLoaded', function() {
+    var status = document.getElementById('compile-status')
+    var url = status && status.getAttribute('data-status-url')
+    if (!url) {
+        return
+    }
+
+    function poll() {
+        fetch(url, {headers: {'Accept': 'application/json'}})
+            .then(function(response) { return response.json() })
+            .then(function(job) {
+                if (job.state === 'done') {
+                    window.location.reload()
+                    return
+                }
+                status.textContent = job.state ? status.getAttribute('data-' + job.state) || '' : ''
+                if (job.state === 'queued' || job.state === 'running') {
+                    setTimeout(poll, 10000)
+                }
+            })
+            // on failure the page simply stays as it is
+            .catch(function() {})
+    }
+    poll()
+})
@@ -1,34 +1,90 @@
 import re
-import os
 import logging
 from celery import shared_task
-from latextranslate import translate_arxiv
-from django.core.cache import cache
-from django.conf import settings
+from . import artifacts, compile_pool, compile_queue
+from .abs_extras import refresh_abs_extras
+from .middleware import refresh_page
+from .models import Article
+from .utils import ingest_arxiv_versions, needs_translation, translate_pending_article
 
 
 logger = logging.getLogger(__name__)
 
-@shared_task
-def download_and_compile_arxiv(arxiv_idv):
-    """Task to download an arxiv article src and compile it to pdf."""
+@shared_task(acks_late=True)
+def download_and_compile_arxiv(arxiv_idv, priority=None, queued_at=None):
+    """Task to download an arxiv article src and compile it to pdf, queued by ``compile_queue.enqueue``."""
     match = re.match(r"(.*)v(\d+)", arxiv_idv)
     if not match:
         logger.error(f"Invalid arxiv_idv format: {arxiv_idv}")
         return
 
+    compile_queue.started(arxiv_idv, priority, queued_at)
     arxiv_id, version = match.groups()
-    cn_pdf_file = f'{settings.CENXIV_FILE_PATH}/arxiv{arxiv_id}/v{version}/cn_pdf/{arxiv_idv}.pdf'
-    if os.path.isfile(cn_pdf_file):
-        logger.info(f'Chinese PDF file {cn_pdf_file} exists, do nothing')
+    if compile_queue.is_compiled(arxiv_idv):
+        logger.info(f'arxiv:{arxiv_idv} is already published, do nothing')
+        compile_queue.finished(arxiv_idv)
         return
 
     # 分布式锁机制
-    lock_key = f'cenxiv:compile_lock:{arxiv_idv}'
+    lock = compile_queue.CompileLock(arxiv_idv)
     # 尝试获取锁（原子操作）
-    if not cache.add(lock_key, 'locked', timeout=settings.CENXIV_COMPILE_LOCK_TIMEOUT):
+    if not lock.acquire():
+        # the running task lets it be queued again when it is done
         logger.info(f'Task for downloading and compiling arxiv:{arxiv_idv} is already being processed.')
         return
 
     logger.info(f'Begain to download and compile arxiv:{arxiv_idv}')
-    translate_arxiv.main([arxiv_idv, '-o', settings.CENXIV_FILE_PATH])
\ No newline at end of file
+    try:
+        compile_queue.job_started(arxiv_idv, priority)
+        # compiled aside and published whole, a half written PDF is never served
+        with artifacts.staging(arxiv_idv) as staging_dir:
+            compile_pool.run_compile(arxiv_idv, staging_dir)
+            artifacts.store().publish(arxiv_id, version, f'{staging_dir}/{artifacts.version_dir(arxiv_id, version)}')
+    except BaseException as e:
+        # also when the worker is stopped (SystemExit) or the soft time limit hits
+        compile_queue.job_finished(arxiv_idv, error=f'{type(e).__name__}: {e}')
+        raise
+    else:
+        compile_queue.job_finished(arxiv_idv)
+    finally:
+        lock.release()
+        compile_queue.finished(arxiv_idv)
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def translate_article(self, article_pk):
+    """Task to translate an article stored with TO_BE_TRANSLATED placeholders, e.g. by backfill_metadata."""
+    article = Article.objects.filter(pk=article_pk).order_by('-updated_date').first()
+    if article is None or not needs_translation(article):
+        return
+
+    try:
+        translate_pending_article(article)
+    except Exception as e:
+        logger.warning(f'Failed to translate {article} due to {e}, will retry latter.')
+        raise self.retry(exc=e)
+    logger.info(f'Successfully translated {article}.')
+
+@shared_task
+def refresh_abs_extras_task(arxiv_idv, context=''):
+    """Task to refetch the cached extras of an arXiv abs page once they are stale."""
+    try:
+        refresh_abs_extras(arxiv_idv, context)
+    except Exception as e:
+        # the stale extras keep being served, the next stale hit queues another refresh
+        logger.warning(f'Failed to refresh the abs extras of arxiv:{arxiv_idv} due to {e}')
+
+@shared_task
+def ingest_arxiv_versions_task(arxiv_id):
+    """Task to store the versions of an arXiv paper published since it was last viewed."""
+    try:
+        ingest_arxiv_versions(arxiv_id)
+    except Exception as e:
+        logger.warning(f'Failed to ingest the versions of arxiv:{arxiv_id} due to {e}')
+
+@shared_task
+def refresh_page_task(path, secure, headers, lock_key):
+    """Task to rebuild an expired page that is still being served from the page cache."""
+    try:
+        refresh_page(path, secure, headers, lock_key)
+    except Exception as e:
+        logger.warning(f'Failed to refresh the cached page {path} due to {e}')
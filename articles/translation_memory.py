@@ -0,0 +1,122 @@
+"""Reusing the translations of earlier versions of a paper.
+
+A new version of a paper mostly repeats the previous one, but
+``translate_arxiv`` translates its whole source again. While a version is
+compiled, every text segment ``latextranslate`` sends to the translator is
+looked up in the translation memory of the paper first, and only segments
+not translated for an earlier version (or an earlier attempt) go to the
+translator. New translations are added to the memory when the compile ends,
+also when it fails, so a retry does not pay for them twice.
+
+The segments are the paragraphs as the translator sees them, with formulas
+and other LaTeX objects replaced by placeholders, so a paragraph whose text
+and formulas are unchanged is reused whatever changed around it, in the same
+or another file. The memory of a paper is a JSON file next to its versions,
+``{CENXIV_FILE_PATH}/arxiv{arxiv_id}/translation_memory.json``, keyed by the
+SHA-256 of the segment.
+
+The translator is patched for the whole process while a compile runs, which
+is fine as each compile has a process of its own (``manage.py compile_arxiv``).
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from latextranslate import translate
+
+
+logger = logging.getLogger(__name__)
+
+
+def memory_path(arxiv_id):
+    return f'{settings.CENXIV_FILE_PATH}/arxiv{arxiv_id}/translation_memory.json'
+
+
+class SegmentMemory:
+    """The translated segments of one paper, safe to use from the translator threads."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.added = {}
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.segments = json.load(f)
+        except FileNotFoundError:
+            self.segments = {}
+        except ValueError as e:
+            logger.warning(f'Ignoring the unreadable translation memory {path}: {e}')
+            self.segments = {}
+
+    @staticmethod
+    def key(text):
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def get(self, text):
+        with self.lock:
+            translation = self.segments.get(self.key(text))
+            if translation is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return translation
+
+    def add(self, text, translation):
+        with self.lock:
+            self.segments[self.key(text)] = translation
+            self.added[self.key(text)] = translation
+
+    def save(self):
+        """Merge the new segments into the file, which other versions may have written meanwhile."""
+        if not self.added:
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                segments = json.load(f)
+        except (FileNotFoundError, ValueError):
+            segments = {}
+        segments.update(self.added)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # written aside and renamed, a reader never sees half a file
+        tmp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(segments, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+@contextmanager
+def reusing_translations(arxiv_id):
+    """Let the ``latextranslate`` translations made inside reuse and extend the memory of ``arxiv_id``."""
+    original = getattr(translate.TextTranslator, 'translate', None)
+    if original is None:
+        logger.warning('latextranslate.translate.TextTranslator has no translate method, not reusing translations')
+        yield None
+        return
+
+    memory = SegmentMemory(memory_path(arxiv_id))
+
+    def translate_with_memory(self, text, *args, **kwargs):
+        translation = memory.get(text)
+        if translation is None:
+            translation = original(self, text, *args, **kwargs)
+            if isinstance(translation, str):
+                memory.add(text, translation)
+        return translation
+
+    translate.TextTranslator.translate = translate_with_memory
+    try:
+        yield memory
+    finally:
+        translate.TextTranslator.translate = original
+        try:
+            memory.save()
+        except OSError as e:
+            logger.warning(f'Failed to save the translation memory of arxiv:{arxiv_id}: {e}')
+        logger.info(f'Reused {memory.hits} of {memory.hits + memory.misses} translated segments for arxiv:{arxiv_id}')
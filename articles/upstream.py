@@ -0,0 +1,190 @@
+"""The one HTTP client for all outbound traffic to arXiv.
+
+Every process shares a ``requests`` session with per-host connection pools
+and keep-alive, so repeated calls to arxiv.org and export.arxiv.org reuse
+their TCP and TLS connections instead of handshaking per request. Requests
+get ``CENXIV_HTTP_CONNECT_TIMEOUT``/``CENXIV_HTTP_READ_TIMEOUT`` unless the
+caller passes a timeout, responses are gzip encoded, and every call is
+logged with its duration (slow ones as warnings).
+
+``requests``/urllib3 only speak HTTP/1.1; keep-alive pooling is what removes
+the per-request handshakes here.
+
+Each host has a circuit breaker shared by all workers through the cache:
+``CENXIV_CIRCUIT_FAILURES`` failed requests (connection errors, timeouts,
+5xx and 429 responses) within ``CENXIV_CIRCUIT_WINDOW`` seconds open it, a
+slow response that arrives is only logged, and for ``CENXIV_CIRCUIT_OPEN_SECONDS`` requests to that
+host raise :class:`UpstreamUnavailable` at once instead of tying up a worker.
+After that requests go through again, and the first failure reopens it.
+Callers keep the last good result with :func:`with_fallback` to have
+something to show meanwhile, rewritten at most every
+``CENXIV_UPSTREAM_LAST_GOOD_INTERVAL`` seconds and kept
+``CENXIV_UPSTREAM_LAST_GOOD_TIMEOUT`` seconds, about as long as an expired
+page may be shown (``CENXIV_PAGE_CACHE_GRACE``).
+"""
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from django.conf import settings
+from django.core.cache import cache
+
+import arxivapi  # The PyPI arxiv package
+
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'cenXiv (https://cenxiv.cn)'
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class UpstreamError(Exception):
+    """arXiv could not be reached, or kept failing after the retries."""
+
+
+class UpstreamUnavailable(UpstreamError, requests.ConnectionError):
+    """Raised without sending the request while the circuit of the host is open."""
+
+
+def _open_key(host):
+    return f'cenxiv:circuit:open:{host}'
+
+
+def _failures_key(host):
+    return f'cenxiv:circuit:failures:{host}'
+
+
+def is_open(host):
+    """Whether requests to ``host`` currently fail fast."""
+    return cache.get(_open_key(host)) is not None
+
+
+def _record_failure(host):
+    key = _failures_key(host)
+    cache.add(key, 0, timeout=settings.CENXIV_CIRCUIT_WINDOW)
+    try:
+        failures = cache.incr(key)
+    except ValueError:
+        # expired between add and incr
+        failures = 1
+    if failures >= settings.CENXIV_CIRCUIT_FAILURES and not is_open(host):
+        logger.error(f'Circuit for {host} opened after {failures} failures, retrying in {settings.CENXIV_CIRCUIT_OPEN_SECONDS}s')
+        cache.set(_open_key(host), time.time(), timeout=settings.CENXIV_CIRCUIT_OPEN_SECONDS)
+        # one more failure once it closes opens it again
+        cache.set(key, settings.CENXIV_CIRCUIT_FAILURES - 1,
+                  timeout=settings.CENXIV_CIRCUIT_OPEN_SECONDS + settings.CENXIV_CIRCUIT_WINDOW)
+
+
+def _record_success(host):
+    cache.delete(_failures_key(host))
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """Pooled adapter that applies the default timeouts and the circuit breaker."""
+
+    def send(self, request, **kwargs):
+        host = urlsplit(request.url).netloc
+        if is_open(host):
+            raise UpstreamUnavailable(f'Circuit for {host} is open', request=request)
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = (settings.CENXIV_HTTP_CONNECT_TIMEOUT, settings.CENXIV_HTTP_READ_TIMEOUT)
+        try:
+            response = super().send(request, **kwargs)
+        except requests.RequestException:
+            _record_failure(host)
+            raise
+        if response.status_code >= 500 or response.status_code == 429:
+            _record_failure(host)
+        else:
+            _record_success(host)
+        return response
+
+
+def _log_response(response, *args, **kwargs):
+    elapsed = response.elapsed.total_seconds()
+    host = urlsplit(response.url).netloc
+    message = f'{response.request.method} {response.url} -> {response.status_code} in {elapsed:.3f}s ({host})'
+    if elapsed > settings.CENXIV_HTTP_SLOW_THRESHOLD:
+        logger.warning(f'Slow upstream request: {message}')
+    else:
+        logger.debug(message)
+
+
+def session():
+    """The process wide session, created on first use so that it is never shared across forks."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = TimeoutHTTPAdapter(
+                    pool_connections=settings.CENXIV_HTTP_POOL_HOSTS,
+                    pool_maxsize=settings.CENXIV_HTTP_POOL_MAXSIZE,
+                )
+                s.mount('https://', adapter)
+                s.mount('http://', adapter)
+                s.headers.update({'User-Agent': USER_AGENT, 'Accept-Encoding': 'gzip, deflate'})
+                s.hooks['response'].append(_log_response)
+                _session = s
+    return _session
+
+
+def get(url, **kwargs):
+    """``requests.get`` through the shared session."""
+    start = time.monotonic()
+    try:
+        return session().get(url, **kwargs)
+    except requests.RequestException as e:
+        logger.warning(f'GET {url} failed after {time.monotonic() - start:.3f}s: {e}')
+        raise
+
+
+def arxiv_client(**kwargs):
+    """An ``arxivapi.Client`` whose API calls go through the shared session."""
+    client = arxivapi.Client(**kwargs)
+    # the client keeps its own Session otherwise
+    client._session = session()
+    return client
+
+
+def _last_good_key(key):
+    return f'cenxiv:last_good:{hashlib.sha1(key.encode()).hexdigest()}'
+
+
+def _last_good_written_key(key):
+    return f'cenxiv:last_good_written:{hashlib.sha1(key.encode()).hexdigest()}'
+
+
+def with_fallback(key, load):
+    """``(load(), None)``, keeping the result as the last good one for ``key``.
+
+    When ``load`` fails because arXiv cannot be reached, the last good result
+    is returned, as ``(value, fetched_at)`` with the aware datetime it was
+    loaded at. Without one the error is raised. The result is only kept when
+    the one kept is older than ``CENXIV_UPSTREAM_LAST_GOOD_INTERVAL``.
+    """
+    try:
+        value = load()
+    except (UpstreamError, requests.RequestException, arxivapi.HTTPError) as e:
+        stored = cache.get(_last_good_key(key))
+        if stored is None:
+            raise
+        logger.warning(f'Serving the last good result for {key} from {stored["fetched_at"]}: {e}')
+        return stored['value'], stored['fetched_at']
+    if not cache.add(_last_good_written_key(key), True, timeout=settings.CENXIV_UPSTREAM_LAST_GOOD_INTERVAL):
+        return value, None
+    try:
+        cache.set(_last_good_key(key), {'value': value, 'fetched_at': datetime.now(timezone.utc)},
+                  timeout=settings.CENXIV_UPSTREAM_LAST_GOOD_TIMEOUT)
+    except Exception as e:
+        # e.g. larger than the memcached item size
+        logger.warning(f'Failed to keep the last good result for {key}: {e}')
+    return value, None
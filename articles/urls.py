@@ -1,35 +1,36 @@
 from django.urls import path
-from django.views.decorators.cache import cache_page
-from . import views
+from . import cache_policy, views
+from .cache_policy import cache_with_policy
 
 app_name = 'articles'
 
 urlpatterns = [
-    path('', cache_page(60 * 5)(views.home), name='home'),
-    path('index', cache_page(60 * 5)(views.home), name='index'),
+    path('', cache_with_policy(cache_policy.default)(views.home), name='home'),
+    path('index', cache_with_policy(cache_policy.default)(views.home), name='index'),
     path('search', views.search, name='search_box'),
     path('search/advanced', views.search_advanced, name='search_advanced'),
     path('search/<str:archive_id>', views.search_archive, name='search_archive'),
-    path('archive/', cache_page(60 * 5)(views.archive), name='archive_index'),
-    path('archive/<str:archive_id>', cache_page(60 * 5)(views.archive), name='archive'),
+    path('archive/', cache_with_policy(cache_policy.default)(views.archive), name='archive_index'),
+    path('archive/<str:archive_id>', cache_with_policy(cache_policy.default)(views.archive), name='archive'),
     path('help', views.help, name='help'),
     path('help/archive/<str:archive_id>', views.help_archive_description, name='help_archive_description'),
-    path('year/<str:archive>/', cache_page(60 * 5)(views.year_default), name='year_default'),
-    path('year/<str:archive>/<int:year>/', cache_page(60 * 5)(views.year_view), name='year'),
-    path('list/', cache_page(60 * 5)(views.list_articles), {'context': '', 'subcontext': ''}, name='list_default'),
-    path('list/all', cache_page(60 * 5)(views.list_articles), {'context': 'math', 'subcontext': 'all'}, name='list_all'),
-    path('list/<str:context>/<str:subcontext>', cache_page(60 * 5)(views.list_articles), name='list_articles'),
+    path('year/<str:archive>/', cache_with_policy(cache_policy.year)(views.year_default), name='year_default'),
+    path('year/<str:archive>/<int:year>/', cache_with_policy(cache_policy.year)(views.year_view), name='year'),
+    path('list/', cache_with_policy(cache_policy.listing)(views.list_articles), {'context': '', 'subcontext': ''}, name='list_default'),
+    path('list/all', cache_with_policy(cache_policy.listing)(views.list_articles), {'context': 'math', 'subcontext': 'all'}, name='list_all'),
+    path('list/<str:context>/<str:subcontext>', cache_with_policy(cache_policy.listing)(views.list_articles), name='list_articles'),
     path('catchup/', views.catchup_form, name='catchup_form'),
-    path('catchup/<str:subject>/<str:date>', cache_page(60 * 5)(views.catchup), name='catchup'),
+    path('catchup/<str:subject>/<str:date>', cache_with_policy(cache_policy.catchup)(views.catchup), name='catchup'),
     path('author/<str:article_id>/<str:author_id>', views.author_search, name='author_search'),
     path('pdf/<str:archive>/<str:arxiv_id>.pdf', views.redirect_pdf, name='redirect_pdf_with_archive'),
     path('pdf/<str:arxiv_id>.pdf', views.redirect_pdf, name='redirect_pdf'),
-    path('pdf/<str:archive>/<str:arxiv_id>', cache_page(60 * 5)(views.pdf), name='pdf_with_archive'),
-    # path('pdf/<str:arxiv_id>', cache_page(60 * 5)(views.pdf), name='pdf'),
-    path('pdf/<path:arxiv_id>', cache_page(60 * 5)(views.pdf), name='pdf'),
+    path('pdf/<str:archive>/<str:arxiv_id>', cache_with_policy(cache_policy.default)(views.pdf), name='pdf_with_archive'),
+    # path('pdf/<str:arxiv_id>', cache_with_policy(cache_policy.default)(views.pdf), name='pdf'),
+    path('pdf/<path:arxiv_id>', cache_with_policy(cache_policy.default)(views.pdf), name='pdf'),
     path('cn-pdf/<str:archive>/<str:arxiv_id>', views.cn_pdf, name='cn_pdf_with_archive'),
     # path('cn-pdf/<str:arxiv_id>', views.cn_pdf, name='cn_pdf'),
     path('cn-pdf/<path:arxiv_id>', views.cn_pdf, name='cn_pdf'),
+    path('cn-pdf-status/<path:arxiv_idv>', views.cn_pdf_status, name='cn_pdf_status'),
     # path('html/<str:arxiv_id>/', views.html, name='html'),
     # path('html/<str:arxiv_id>', views.html, name='html_no_slash'),
     path('html/<path:arxiv_id>/', views.html, name='html'),
@@ -37,7 +38,8 @@ urlpatterns = [
     path('html/<str:archive>/<path:arxiv_id>', views.html_with_archive, name='html_with_archive'),
     path('abs', views.bare_abs, name='bare_abs'),
     path('abs/', views.abstract, {'arxiv_id': ''}, name='abstract_empty'),
-    path('abs/<path:arxiv_id>', cache_page(60 * 5)(views.abstract), name='abstract'),
+    path('abs/<path:arxiv_id>', cache_with_policy(cache_policy.abs_page)(views.abstract), name='abstract'),
+    path('abs-extras/<path:arxiv_id>', cache_with_policy(cache_policy.abs_extras)(views.abstract_extras), name='abstract_extras'),
     path('auth/show-endorsers/<path:arxiv_id>', views.show_endorsers, name='show_endorsers'),
     path('help/mathjax', views.help_mathjax, name='help_mathjax'),
     path('dvi/<str:archive>/<str:arxiv_id>', views.dvi, name='dvi_with_archive'),
@@ -46,9 +48,9 @@ urlpatterns = [
     # path('ps/<str:arxiv_id>', views.ps, name='ps'),
     path('ps/<path:arxiv_id>', views.ps, name='ps'),
     path('show-email/<path:show_email_hash>/<path:arxiv_id>', views.show_email, name='show_email'),
-    path('format/<str:archive>/<str:arxiv_id>', cache_page(60 * 5)(views.format_view), name='format_with_archive'),
-    # path('format/<str:arxiv_id>', cache_page(60 * 5)(views.format_view), name='format'),
-    path('format/<path:arxiv_id>', cache_page(60 * 5)(views.format_view), name='format'),
+    path('format/<str:archive>/<str:arxiv_id>', cache_with_policy(cache_policy.default)(views.format_view), name='format_with_archive'),
+    # path('format/<str:arxiv_id>', cache_with_policy(cache_policy.default)(views.format_view), name='format'),
+    path('format/<path:arxiv_id>', cache_with_policy(cache_policy.default)(views.format_view), name='format'),
     path('src/<path:arxiv_id>/anc', views.anc_listing, name='anc_listing'),
     path('src/<path:arxiv_id>/anc/<path:file_path>', views.anc, name='anc'),
     path('e-print/<str:arxiv_id_str>', views.src, name='e_print'),
@@ -57,6 +59,7 @@ urlpatterns = [
     path('src/<path:arxiv_id_str>', views.src, name='src'),
     path('src/<str:archive>/<str:arxiv_id_str>', views.src, name='src_with_archive'),
     path('prevnext', views.previous_next, name='previous_next'),
+    path('bibtex-bulk', views.bibtex_bulk, name='bibtex_bulk'),
     path('bibtex/<path:arxiv_id>', views.bibtex, name='bibtex'),
     path('multi/', views.multi, name='multi'),
     path('multi/<path:path>', views.multi, name='multi_with_path'),
@@ -1,15 +1,19 @@
 import time
 import json
 import logging
+import concurrent.futures
 from http import HTTPStatus
-import requests
 from requests.exceptions import HTTPError, RequestException
 import openai
 import django
+import arxivapi  # The PyPI arxiv package
 from django.conf import settings
 from latextranslate import process_latex, translate
 from .models import Article, Author, Category, Link
+from .browse_index import index_articles
+from .listing_rows import refresh_listing_rows
 from .translators import translator
+from .upstream import UpstreamUnavailable, arxiv_client, get as upstream_get
 
 
 # Configure logging (do this once at the module level)
@@ -19,6 +23,9 @@ logger = logging.getLogger(__name__)
 
 tl = settings.TRANSLATOR
 
+TO_BE_TRANSLATED = 'TO_BE_TRANSLATED: '
+"""Prefix of Chinese fields that still hold the English text, e.g. refused by the translator."""
+
 chinese_week_days = ['星期一', '星期二', '星期三', '星期四', '星期五', '星期六', '星期日']
 
 def get_translation_dict():
@@ -57,13 +64,13 @@ def request_get(url, retries=3, retry_delay=1, max_retry_delay=60):
 
     for attempt in range(retries):
         try:
-            response = requests.get(url)
+            response = upstream_get(url)
             response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
             logger.info(f"Successfully fetched URL: {url}")
             return response  # Return the response object
 
         except HTTPError as exc:
-            code = exc.response.status_code if exc.response else None # Handle cases where exc.response might be None
+            code = exc.response.status_code if exc.response is not None else None # Handle cases where exc.response might be None
             logger.warning(f"HTTP Error: {code} for URL: {url}. Attempt {attempt + 1}/{retries}")
 
             if code in retry_codes:
@@ -75,6 +82,11 @@ def request_get(url, retries=3, retry_delay=1, max_retry_delay=60):
             # Re-raise the exception if it's not a retryable error
             raise  # This will exit the loop and raise the original HTTPError
 
+        except UpstreamUnavailable as exc:
+            # the circuit is open, retrying would only hold the worker
+            logger.warning(f"{exc}, not fetching URL: {url}")
+            return None
+
         except RequestException as exc:  # Catch other request exceptions
             logger.error(f"Request Exception: {exc} for URL: {url}. Attempt {attempt + 1}/{retries}")
             current_delay = min(retry_delay * (2**attempt), max_retry_delay)
@@ -98,6 +110,83 @@ def translate_latex_paragraph(text, tl):
     latex_translator = translate.LatexTranslator(text_translator)
     return latex_translator.translate_full_latex(text, make_complete=False, nocache=True).strip()
 
+def _translate_or_mark(translate_func, text):
+    try:
+        return translate_func(text)
+    except openai.BadRequestError as e:
+        if e.status_code == 400: # data may contain inappropriate content
+            return TO_BE_TRANSLATED + text
+        raise
+
+def _previous_translation(previous, field, text):
+    """The Chinese ``field`` of a stored version in ``previous`` whose English one is ``text``."""
+    for article in previous:
+        translation = getattr(article, f'{field}_cn')
+        if getattr(article, f'{field}_en') == text and translation and not translation.startswith(TO_BE_TRANSLATED):
+            return translation
+    return None
+
+def translate_article_fields(title, abstract, comment=None, journal_ref=None, previous=(), only=None):
+    """Translate the metadata of one paper, returns the Chinese model fields.
+
+    Fields unchanged since one of the ``previous`` stored versions of the
+    paper reuse its translation. Texts the translator refuses are kept in
+    English behind the ``TO_BE_TRANSLATED`` marker, any other error is raised.
+    With ``only``, a collection of Chinese field names, the other fields are
+    neither translated nor returned.
+    """
+    previous = list(previous)
+
+    def translate_field(field, translate, text):
+        translation = _previous_translation(previous, field, text)
+        if translation is None:
+            translation = _translate_or_mark(translate, text)
+        return translation
+
+    def translate_line(text):
+        return translator(tl)(text.replace('\n', ' '))
+
+    fields = dict(
+        title_cn=('title', lambda text: translate_latex_paragraph(text, tl), title),
+        abstract_cn=('abstract', lambda text: translate_latex_paragraph(text, tl), abstract),
+        comment_cn=('comment', translate_line, comment),
+        journal_ref_cn=('journal_ref', translate_line, journal_ref),
+    )
+    return {
+        field_name: translate_field(field, translate, text) if text else None
+        for field_name, (field, translate, text) in fields.items()
+        if only is None or field_name in only
+    }
+
+def needs_translation(article):
+    """Whether some Chinese field of a stored article is still a ``TO_BE_TRANSLATED`` placeholder."""
+    return any(
+        value and value.startswith(TO_BE_TRANSLATED)
+        for value in (article.title_cn, article.abstract_cn, article.comment_cn, article.journal_ref_cn)
+    )
+
+def translate_pending_article(article):
+    """Translate the fields of a stored article that are still marked ``TO_BE_TRANSLATED``.
+
+    Returns True when nothing is left to translate.
+    """
+    pending = [
+        field_name for field_name in ('title_cn', 'abstract_cn', 'comment_cn', 'journal_ref_cn')
+        if (getattr(article, field_name) or '').startswith(TO_BE_TRANSLATED)
+    ]
+    if not pending:
+        return True
+    translated = translate_article_fields(
+        article.title_en, article.abstract_en, article.comment_en, article.journal_ref_en,
+        previous=Article.objects.for_entry(article.entry_id).exclude(pk=article.pk).order_by('-entry_version'),
+        only=pending,
+    )
+    for field_name, value in truncate_for_model(Article, translated).items():
+        setattr(article, field_name, value)
+    article.save(update_fields=pending + ['updated_at'])
+    refresh_listing_rows([article])
+    return not needs_translation(article)
+
 # 获取模型字段的 max_length 信息
 def truncate_for_model(model, data_dict):
     truncated_data = {}
@@ -120,49 +209,14 @@ def translate_and_save_article(result, ok=False):
     # arxiv_id, version = result.entry_id.split('/')[-1].split('v')
     arxiv_id, version = result.entry_id.split(r'/abs/')[-1].rsplit('v', 1)
     try:
-        article = Article.objects.get(source_archive='arxiv', entry_id=arxiv_id, entry_version=version)
+        article = Article.objects.for_entry(arxiv_id).get(entry_version=version)
         return article, True
     except Article.DoesNotExist:
         try:
-            # text_translator = translate.TextTranslator(tl, 'en', 'zh-CN')
-            # latex_translator = translate.LatexTranslator(text_translator, debug=False, threads=0)
-
-            # title_cn = latex_translator.translate_full_latex(result.title, make_complete=False).strip()
-            # abstract_cn = latex_translator.translate_full_latex(result.summary, make_complete=False).strip()
-            try:
-                title_cn = translate_latex_paragraph(result.title, tl)
-            except openai.BadRequestError as e:
-                if e.status_code == 400: # data may contain inappropriate content
-                    title_cn = 'TO_BE_TRANSLATED: ' + result.title
-                else:
-                    raise
-            try:
-                abstract_cn = translate_latex_paragraph(result.summary, tl)
-            except openai.BadRequestError as e:
-                if e.status_code == 400: # data may contain inappropriate content
-                    abstract_cn = 'TO_BE_TRANSLATED: ' + result.summary
-                else:
-                    raise
-            comment_cn = None
-            journal_ref_cn = None
-            if result.comment:
-                try:
-                    comment_cn = translator(tl)(result.comment.replace('\n', ' '))
-                except openai.BadRequestError as e:
-                    if e.status_code == 400: # data may contain inappropriate content
-                        comment_cn = 'TO_BE_TRANSLATED: ' + result.comment
-                    else:
-                        raise
-            if result.journal_ref:
-                try:
-                    journal_ref_cn = translator(tl)(result.journal_ref.replace('\n', ' '))
-                except openai.BadRequestError as e:
-                    if e.status_code == 400: # data may contain inappropriate content
-                        journal_ref_cn = 'TO_BE_TRANSLATED: ' + result.journal_ref
-                    else:
-                        raise
-            # title_cn = '中文标题'
-            # abstract_cn = '中文摘要'
+            translated = translate_article_fields(
+                result.title, result.summary, result.comment, result.journal_ref,
+                previous=Article.objects.for_entry(arxiv_id).order_by('-entry_version'),
+            )
             logger.info(f'Successfully translated arxiv:{arxiv_id}v{version}.')
         except Exception as e:
             logger.warning(f'Failed to translate arxiv:{arxiv_id}v{version} due to {e}, will retry latter.')
@@ -172,17 +226,14 @@ def translate_and_save_article(result, ok=False):
             entry_id=arxiv_id,
             entry_version=version,
             title_en=result.title,
-            title_cn=title_cn,
             abstract_en=result.summary,
-            abstract_cn=abstract_cn,
             published_date=result.published,
             updated_date=result.updated,
             comment_en=result.comment,
-            comment_cn=comment_cn,
             journal_ref_en=result.journal_ref,
-            journal_ref_cn=journal_ref_cn,
             doi=result.doi,
             primary_category=result.primary_category,
+            **translated,
         )
         # 截断超长字符串
         truncated_data = truncate_for_model(Article, data)
@@ -215,4 +266,54 @@ def translate_and_save_article(result, ok=False):
                 # already exist in db
                 pass
 
+        if article.pk:
+            refresh_listing_rows([article])
+            index_articles([article])
+
         return article, True
+
+def ingest_arxiv_versions(arxiv_id, latest_result=None, retries=3):
+    """Make sure every version of an arXiv paper is stored and translated.
+
+    ``latest_result`` is the arXiv API result of the latest version when the
+    caller already has it. All missing versions are fetched with one API
+    search and translated concurrently. Returns the stored versions as a dict
+    keyed by version number.
+    """
+    client = arxiv_client()
+    if latest_result is None:
+        latest_result = list(client.results(arxivapi.Search(id_list=[arxiv_id])))[0]
+    latest_version = int(latest_result.entry_id.split(r'/abs/')[-1].rsplit('v', 1)[-1])
+
+    # all stored versions in one query
+    articles = {article.entry_version: article for article in Article.objects.for_entry(arxiv_id)}
+    missing_versions = [version for version in range(1, latest_version+1) if version not in articles]
+    if not missing_versions:
+        return articles
+
+    # the latest version is already at hand, the other missing ones are fetched in one batch
+    results = [latest_result] if latest_version in missing_versions else []
+    missing_idvs = [f'{arxiv_id}v{version}' for version in missing_versions if version != latest_version]
+    if missing_idvs:
+        results.extend(client.results(arxivapi.Search(id_list=missing_idvs)))
+
+    oks = [False] * len(results)
+    retry = 0
+    while True:
+        if retry >= retries:
+            msg = f'Failed to translate versions {missing_versions} of the article arxiv:{arxiv_id} after {retries} retries'
+            logger.error(msg)
+            raise Exception(msg)
+
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            results, oks = list(zip(*executor.map(translate_and_save_article, results, oks)))
+
+        if all(oks):
+            break
+
+        delay = 1.0 * (2**retry)
+        time.sleep(delay)
+
+        retry += 1
+
+    return {article.entry_version: article for article in Article.objects.for_entry(arxiv_id)}
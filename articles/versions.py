@@ -0,0 +1,43 @@
+"""Resolving the latest version of an arXiv paper without asking arXiv.
+
+Versionless cn-pdf and format URLs need the latest version of the paper. It
+is taken from the stored articles and the versions published in the
+artifact store; only papers we hold nothing of are looked up with the
+arXiv API, and that answer is cached for
+``CENXIV_ABS_VERSION_CHECK_INTERVAL`` seconds. New versions of stored papers
+are picked up when their abs page is viewed (see ``ingest_arxiv_versions_task``).
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Max
+
+import arxivapi  # The PyPI arxiv package
+
+from . import artifacts
+from .models import Article
+from .upstream import arxiv_client
+
+
+def compiled_versions(arxiv_id):
+    """The versions of ``arxiv_id`` that have a compiled Chinese PDF."""
+    return artifacts.store().versions(arxiv_id)
+
+
+def _upstream_latest_version(arxiv_id):
+    key = f'cenxiv:latest_version:{arxiv_id}'
+    version = caches['hot'].get(key)
+    if version is None:
+        client = arxiv_client()
+        result = list(client.results(arxivapi.Search(id_list=[arxiv_id])))[0]
+        version = int(result.entry_id.split('/abs/')[-1].rsplit('v', 1)[-1])
+        caches['hot'].set(key, version, timeout=settings.CENXIV_ABS_VERSION_CHECK_INTERVAL)
+    return version
+
+
+def latest_version(arxiv_id):
+    """The latest version of ``arxiv_id`` we know of, arXiv is only asked for papers not held locally."""
+    stored = Article.objects.for_entry(arxiv_id).aggregate(latest=Max('entry_version'))['latest']
+    local = max([stored or 0, *compiled_versions(arxiv_id)])
+    if local:
+        return local
+    return _upstream_latest_version(arxiv_id)
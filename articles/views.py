@@ -1,31 +1,37 @@
-import os
 import re
 import logging
 import requests
 from http import HTTPStatus
 from typing import Optional#, Tuple, Dict, Any, Union
-from bs4 import BeautifulSoup
 
 from django.conf import settings
+from django.core.cache import cache
 from django.urls import reverse
 from django.http import Http404
 from django.core.exceptions import BadRequest
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
 from django.utils.translation import get_language
-from django.http import HttpResponse, HttpResponseRedirect, HttpResponseBadRequest, HttpResponseNotFound
+from django.http import HttpResponse, HttpResponseRedirect, HttpResponseBadRequest, HttpResponseNotFound, JsonResponse, StreamingHttpResponse
 from django.http.response import HttpResponsePermanentRedirect
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
-import arxivapi  # The PyPI arxiv package
-
 from arxiv.identifier import Identifier, IdentifierException#, IdentifierIsArchiveException
 from arxiv.taxonomy.definitions import GROUPS, CATEGORIES
 from arxiv.integration.fastly.headers import add_surrogate_key
 
 from .controllers import abs_page
 from .controllers import archive_page, list_page, catchup_page, year as year_controller
-from .controllers import check_supplied_identifier
+from .controllers import check_supplied_identifier, prevnext
+from . import artifacts, cache_policy, compile_queue
+from .abs_extras import get_formats
+from .bibtex import BULK_MAX_IDS, get_bibtex, iter_bibtex, parse_id
+from .tasks import ingest_arxiv_versions_task
 from .utils import get_translation_dict
+from .versions import latest_version
 
 
 logger = logging.getLogger(__name__)
@@ -172,7 +178,11 @@ def list_articles(request, context: str = '', subcontext: str = '') -> HttpRespo
             translation_dict = {}
 
         response['translation_dict'] = translation_dict
-        return render(request, response["template"], response, status=code)
+        rendered = render(request, response["template"], response, status=code)
+        if response.get('stale_since'):
+            # try arXiv again soon instead of keeping the stale listing
+            patch_cache_control(rendered, max_age=cache_policy.STALE_TTL)
+        return rendered
     elif code == HTTPStatus.MOVED_PERMANENTLY:
         return HttpResponsePermanentRedirect(headers["Location"])
     elif code == HTTPStatus.NOT_MODIFIED:
@@ -300,7 +310,10 @@ def abstract(request, arxiv_id: str = ''):
             translation_dict = {}
 
         response['translation_dict'] = translation_dict
-        return render(request, "abs/abs.html", response, status=code)
+        rendered = render(request, "abs/abs.html", response, status=code)
+        if response.get('stale_since'):
+            patch_cache_control(rendered, max_age=cache_policy.STALE_TTL)
+        return rendered
     elif code == HTTPStatus.MOVED_PERMANENTLY:
         return HttpResponsePermanentRedirect(headers["Location"])
     elif code == HTTPStatus.NOT_MODIFIED:
@@ -308,59 +321,75 @@ def abstract(request, arxiv_id: str = ''):
 
     raise BadRequest("Unexpected error")
 
-def previous_next(request):
-    """Previous/Next navigation used on /abs page."""
 
-    # Validate required parameters
-    if not all(param in request.GET for param in ['id', 'function', 'context']):
-        raise BadRequest("Missing required parameters")
+# containers of abs.html and the templates that fill them
+ABS_EXTRAS_SECTIONS = {
+    'abs-extras-withdrawn': 'abs/withdrawn.html',
+    'abs-extras-classes': 'abs/classes.html',
+    'abs-extras-refs': 'abs/refs.html',
+    'abs-extras-submission-history': 'abs/submission_history.html',
+    'abs-extras-full-text': 'abs/full_text.html',
+    'abs-extras-browse-context': 'abs/browse_context.html',
+    'abs-extras-trackback': 'abs/trackback.html',
+}
 
-    try:
-        # Construct arXiv prevnext URL
-        arxiv_url = 'https://arxiv.org/prevnext'
-        params = {
-            'id': request.GET.get('id'),
-            'function': request.GET.get('function'),
-            'context': request.GET.get('context')
-        }
 
-        # Make request to arXiv
-        response = requests.get(arxiv_url, params=params, allow_redirects=False)
+def abstract_extras(request, arxiv_id: str):
+    """The abs page sections that depend on the arXiv abs page, as JSON.
 
-        if response.status_code == 301:
-            # Get redirect location from arXiv response
-            arxiv_redirect = response.headers['Location']
-
-            # Convert arXiv URL to our URL format
-            our_url = arxiv_redirect.replace('https://arxiv.org', '')
-
-            # Return redirect response
-            return HttpResponsePermanentRedirect(our_url)
+    Loaded by abs.html when it was rendered before the extras were cached.
+    """
+    response, code, headers = abs_page.get_abs_page(request, arxiv_id, defer_extras=False)
+    if code != HTTPStatus.OK:
+        return HttpResponseNotFound()
 
-        else:
-            raise BadRequest("Unable to get prev/next paper")
+    if get_language() == 'zh-hans':
+        response['translation_dict'] = get_translation_dict()
+    else:
+        response['translation_dict'] = {}
+    sections = {
+        container: render_to_string(template, response, request=request)
+        for container, template in ABS_EXTRAS_SECTIONS.items()
+    }
+    sections['abs-extras-authors'] = response['abs_meta'].author_list
+    return JsonResponse(sections)
 
-    except Exception as e:
-        # logger.error(f"Error in previous_next view: {str(e)}")
-        raise BadRequest("Error processing prev/next request")
+def previous_next(request):
+    """Previous/Next navigation used on /abs page."""
+    response, code, headers = prevnext.get_prevnext(
+        request.GET.get('id'), request.GET.get('function'), request.GET.get('context')
+    )
+    return HttpResponseRedirect(headers['Location'])
 
 def bibtex(request, arxiv_id: str):
-    """Generate or retrieve the BibTeX entry for an article."""
-    try:
-        # Construct the URL to fetch the BibTeX entry from arXiv
-        arxiv_bibtex_url = f'https://arxiv.org/bibtex/{arxiv_id}'
-
-        # Fetch the BibTeX entry
-        response = requests.get(arxiv_bibtex_url)
-
-        if response.status_code == 200:
-            # Return the BibTeX entry as plain text
-            return HttpResponse(response.text, content_type='text/plain')
-        else:
-            return HttpResponseNotFound('BibTeX entry not found')
+    """BibTeX entry for an article, generated from the stored metadata."""
+    arxiv_id = parse_id(arxiv_id)
+    if arxiv_id is None:
+        return HttpResponseBadRequest('Invalid arXiv id')
+    entry = get_bibtex([arxiv_id])[arxiv_id]
+    if entry is None:
+        # 未存储的文章在后台获取，之后的请求即可生成
+        entry_id = re.sub(r'v\d+$', '', arxiv_id)
+        if cache.add(f'cenxiv:abs_versions_checked:{entry_id}', 'checked', timeout=settings.CENXIV_ABS_VERSION_CHECK_INTERVAL):
+            ingest_arxiv_versions_task.delay(entry_id)
+        return HttpResponseNotFound('BibTeX entry not found')
+    return HttpResponse(entry, content_type='text/plain')
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def bibtex_bulk(request):
+    """BibTeX entries for many articles in one streamed response.
 
-    except requests.RequestException as e:
-        return HttpResponseBadRequest(f"Error fetching BibTeX entry: {str(e)}")
+    The ids, with or without version, are given as repeated or comma separated
+    ``id`` parameters. Articles that are not stored get a comment line.
+    """
+    params = request.POST if request.method == 'POST' else request.GET
+    arxiv_ids = [arxiv_id.strip() for value in params.getlist('id') for arxiv_id in value.split(',') if arxiv_id.strip()]
+    if not arxiv_ids:
+        return HttpResponseBadRequest('No arXiv ids given')
+    if len(arxiv_ids) > BULK_MAX_IDS:
+        return HttpResponseBadRequest(f'At most {BULK_MAX_IDS} arXiv ids per request')
+    return StreamingHttpResponse(iter_bibtex(arxiv_ids), content_type='text/plain; charset=utf-8')
 
 def pdf(request, arxiv_id: str, archive: str = None):
     """Handle PDF requests.
@@ -449,22 +478,10 @@ def cn_pdf(request, arxiv_id: str, archive: str = None):
         else:
             arxiv_id_with_archive = arxiv_id
     else:
-        client = arxivapi.Client()
-        if archive:
-            search = arxivapi.Search(id_list=[f'{archive}/{arxiv_id}'])
-        else:
-            search = arxivapi.Search(id_list=[arxiv_id])
-        result = list(client.results(search))[0]
-        # arxiv_id, version = result.entry_id.split('/')[-1].split('v')
-        arxiv_id_with_archive, version = result.entry_id.split('/abs/')[-1].rsplit('v', 1)
-        if '/' in arxiv_id_with_archive:
-            archive, arxiv_id = arxiv_id_with_archive.rsplit('/', 1)
-        else:
-            archive = None
-            arxiv_id = arxiv_id_with_archive
+        arxiv_id_with_archive = f'{archive}/{arxiv_id}' if archive else arxiv_id
+        version = latest_version(arxiv_id_with_archive)
     arxiv_idv = f'{arxiv_id}v{version}'
     arxiv_idv_with_archive = f'{arxiv_id_with_archive}v{version}'
-    cn_pdf_file = f'{settings.CENXIV_FILE_PATH}/arxiv{arxiv_id_with_archive}/v{version}/cn_pdf/{arxiv_idv}.pdf'
 
     context = {
         'archive': archive,
@@ -474,20 +491,29 @@ def cn_pdf(request, arxiv_id: str, archive: str = None):
         'image_path': 'images/zanshang_code.png'
     }
 
-    if os.path.isfile(cn_pdf_file):
+    if artifacts.store().exists(arxiv_id_with_archive, version):
         # 显示赞赏码图片和可点击文本，点击后显示PDF文件
 
         # 检查是否有请求参数show_pdf=true
         if request.GET.get('show_pdf') == 'true':
             # 如果请求参数存在，则显示PDF文件
-            return HttpResponse(open(cn_pdf_file, 'rb'), content_type='application/pdf')
+            return artifacts.store().serve_cn_pdf(request, arxiv_id_with_archive, version)
         else:
             # 否则显示带有图片和链接的页面
             return render(request, "articles/cn_pdf_preview.html", context)
 
     # return HttpResponse(_('Chinese PDF is coming soon...'))
+    compile_queue.enqueue([arxiv_idv_with_archive], compile_queue.USER)
+    context['status_url'] = reverse('articles:cn_pdf_status', kwargs={'arxiv_idv': arxiv_idv_with_archive})
     return render(request, "articles/no_cn_pdf.html", context)
 
+@never_cache
+def cn_pdf_status(request, arxiv_idv: str):
+    """The state of the compile of a Chinese PDF as JSON, polled by no_cn_pdf.html."""
+    if not re.fullmatch(r'.+v\d+', arxiv_idv):
+        return HttpResponseBadRequest('Version required')
+    return JsonResponse(compile_queue.job_status(arxiv_idv))
+
 def html(request, arxiv_id: str, archive: str = None):
     """Get HTML for article.
 
@@ -616,23 +642,11 @@ def format_view(request, arxiv_id: str, archive: Optional[str] = None):
     # data["encrypted"] = abs_meta.get_requested_version().source_flag.source_encrypted
     # formats = data["formats"] = abs_meta.get_requested_version().formats()
 
-    url = f'https://arxiv.org/format/{arxiv_identifier.idv}'
-    response = requests.get(url)
-    soup = BeautifulSoup(response.content, 'lxml')
-    dts = soup.find('dl').find_all('dt')
-    for dt in dts:
-        if 'PDF' in dt.text:
-            data['pdf'] = True
-        if 'PostScript' in dt.text:
-            data['ps'] = True
-        if 'DVI' in dt.text:
-            data['dvi'] = True
-        if 'HTML' in dt.text:
-            data['html'] = True
-        if 'DOCX' in dt.text:
-            data['docx'] = True
-        if 'Source' in dt.text:
-            data['src'] = True
+    if arxiv_identifier.has_version:
+        arxiv_idv = arxiv_identifier.idv
+    else:
+        arxiv_idv = f'{arxiv_identifier.id}v{latest_version(arxiv_identifier.id)}'
+    data.update(get_formats(arxiv_idv))
 
     response = render(request, "articles/format.html", data, status=200)
 
@@ -43,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'articles.middleware.GZipTextMiddleware',
+    'articles.middleware.UpdatePageCacheMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,6 +53,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django.middleware.locale.LocaleMiddleware',
+    'articles.middleware.FetchFromPageCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'cenxiv.urls'
@@ -167,7 +170,37 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Path to save articles
 CENXIV_FILE_PATH = config('CENXIV_FILE_PATH')
-CENXIV_COMPILE_LOCK_TIMEOUT = config('CENXIV_COMPILE_LOCK_TIMEOUT', default=20 * 60, cast=int) # seconds
+CENXIV_COMPILE_LOCK_TIMEOUT = config('CENXIV_COMPILE_LOCK_TIMEOUT', default=2 * 60, cast=int) # seconds a compile lock outlives its last heartbeat
+CENXIV_COMPILE_HEARTBEAT_INTERVAL = config('CENXIV_COMPILE_HEARTBEAT_INTERVAL', default=30, cast=int) # seconds
+# Compile queues by priority, see articles/compile_queue.py
+CENXIV_COMPILE_QUEUED_TIMEOUT = config('CENXIV_COMPILE_QUEUED_TIMEOUT', default=6 * 60 * 60, cast=int) # seconds a queued version is not queued again
+CENXIV_COMPILE_RETRY_BACKOFF = config('CENXIV_COMPILE_RETRY_BACKOFF', default=30 * 60, cast=int) # seconds before a failed compile is queued again, doubled per attempt
+CENXIV_COMPILE_MAX_ATTEMPTS = config('CENXIV_COMPILE_MAX_ATTEMPTS', default=4, cast=int) # attempts after which a failed compile is not queued again
+CENXIV_COMPILE_USER_WAIT_WARNING = config('CENXIV_COMPILE_USER_WAIT_WARNING', default=60, cast=int) # seconds a user requested compile may wait before a warning
+# 'x-accel' lets nginx send the stored files, 'python' serves them from Django, see articles/file_delivery.py
+CENXIV_FILE_DELIVERY = config('CENXIV_FILE_DELIVERY', default='python')
+CENXIV_X_ACCEL_PREFIX = config('CENXIV_X_ACCEL_PREFIX', default='/_cenxiv_files')
+# Where compiled versions are published, 'local' (under CENXIV_FILE_PATH) or 's3', see articles/artifacts.py
+CENXIV_ARTIFACT_STORE = config('CENXIV_ARTIFACT_STORE', default='local')
+CENXIV_ARTIFACT_S3_BUCKET = config('CENXIV_ARTIFACT_S3_BUCKET', default='')
+CENXIV_ARTIFACT_S3_PREFIX = config('CENXIV_ARTIFACT_S3_PREFIX', default='')
+CENXIV_ARTIFACT_S3_ENDPOINT_URL = config('CENXIV_ARTIFACT_S3_ENDPOINT_URL', default='') # e.g. a local MinIO, empty for AWS
+CENXIV_ARTIFACT_S3_URL_EXPIRES = config('CENXIV_ARTIFACT_S3_URL_EXPIRES', default=60 * 60, cast=int) # seconds a PDF link is valid
+
+# Outbound HTTP to arXiv, see articles/upstream.py
+CENXIV_HTTP_CONNECT_TIMEOUT = config('CENXIV_HTTP_CONNECT_TIMEOUT', default=5, cast=float) # seconds
+CENXIV_HTTP_READ_TIMEOUT = config('CENXIV_HTTP_READ_TIMEOUT', default=30, cast=float) # seconds
+CENXIV_HTTP_SLOW_THRESHOLD = config('CENXIV_HTTP_SLOW_THRESHOLD', default=5, cast=float) # seconds before a request is logged as slow
+CENXIV_HTTP_POOL_HOSTS = config('CENXIV_HTTP_POOL_HOSTS', default=4, cast=int) # hosts with a connection pool
+CENXIV_HTTP_POOL_MAXSIZE = config('CENXIV_HTTP_POOL_MAXSIZE', default=10, cast=int) # connections kept per host
+CENXIV_CIRCUIT_FAILURES = config('CENXIV_CIRCUIT_FAILURES', default=5, cast=int) # failed requests that open the circuit of a host
+CENXIV_CIRCUIT_WINDOW = config('CENXIV_CIRCUIT_WINDOW', default=60, cast=int) # seconds the failures are counted over
+CENXIV_CIRCUIT_OPEN_SECONDS = config('CENXIV_CIRCUIT_OPEN_SECONDS', default=30, cast=int) # seconds requests fail fast once it is open
+CENXIV_UPSTREAM_LAST_GOOD_TIMEOUT = config('CENXIV_UPSTREAM_LAST_GOOD_TIMEOUT', default=24 * 60 * 60, cast=int) # seconds the last good result is kept for outages
+CENXIV_UPSTREAM_LAST_GOOD_INTERVAL = config('CENXIV_UPSTREAM_LAST_GOOD_INTERVAL', default=60 * 60, cast=int) # seconds before the last good result is rewritten
+# Identical fetches from several workers are coalesced, see articles/singleflight.py
+CENXIV_SINGLEFLIGHT_LOCK_TIMEOUT = config('CENXIV_SINGLEFLIGHT_LOCK_TIMEOUT', default=120, cast=int) # seconds
+CENXIV_SINGLEFLIGHT_WAIT = config('CENXIV_SINGLEFLIGHT_WAIT', default=60, cast=float) # seconds a worker waits for another one's fetch
 
 # Translation
 TRANSLATOR = config('TRANSLATOR', default='google')
@@ -178,8 +211,39 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
         'LOCATION': config('MEMCACHED_LOCATION', default='127.0.0.1:11211'),
-    }
+    },
+    # per-process LRU in front of 'default' for small objects read many times per request, see articles/hot_cache.py
+    'hot': {
+        'BACKEND': 'articles.hot_cache.TwoTierCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'MAX_ENTRIES': config('CENXIV_HOT_CACHE_MAX_ENTRIES', default=5000, cast=int),
+            'MAX_BYTES': config('CENXIV_HOT_CACHE_MAX_BYTES', default=32 * 1024 * 1024, cast=int),
+            'MAX_ITEM_BYTES': config('CENXIV_HOT_CACHE_MAX_ITEM_BYTES', default=64 * 1024, cast=int),
+            'LOCAL_TIMEOUT': config('CENXIV_HOT_CACHE_LOCAL_TIMEOUT', default=60, cast=float), # seconds
+            'STAMP_CHECK_INTERVAL': config('CENXIV_HOT_CACHE_STAMP_CHECK_INTERVAL', default=1, cast=float), # seconds
+            'STATS_FLUSH_INTERVAL': 60, # seconds
+        },
+    },
 }
+# Page cache TTLs, see articles/cache_policy.py
+CENXIV_CACHE_DEFAULT_TTL = config('CENXIV_CACHE_DEFAULT_TTL', default=60 * 5, cast=int) # seconds
+CENXIV_CACHE_IMMUTABLE_TTL = config('CENXIV_CACHE_IMMUTABLE_TTL', default=24 * 60 * 60, cast=int) # seconds for pages that no longer change
+CENXIV_ANNOUNCE_SETTLE = config('CENXIV_ANNOUNCE_SETTLE', default=60 * 60, cast=int) # seconds after an announcement with only the default TTL
+# Against cache stampedes, see articles/stampede.py
+CENXIV_CACHE_TTL_JITTER = config('CENXIV_CACHE_TTL_JITTER', default=0.1, cast=float) # largest fraction TTLs are randomly shortened by
+CENXIV_XFETCH_BETA = config('CENXIV_XFETCH_BETA', default=1.0, cast=float) # > 1 refreshes earlier, < 1 later
+# (regular expression matched against the path, seconds an expired page is still served while it is rebuilt), see articles/middleware.py
+CENXIV_PAGE_CACHE_GRACE = [
+    (r'^/[\w-]+/list/', 24 * 60 * 60),
+    (r'^/[\w-]+/catchup/', 24 * 60 * 60),
+    (r'^/[\w-]+/abs/', 7 * 24 * 60 * 60),
+    (r'^/[\w-]+/year/', 7 * 24 * 60 * 60),
+]
+# Extras parsed from the arXiv abs pages, see articles/abs_extras.py
+CENXIV_ABS_EXTRAS_TTL = config('CENXIV_ABS_EXTRAS_TTL', default=60 * 60, cast=int) # seconds before volatile extras are refreshed
+CENXIV_ABS_EXTRAS_MAX_STALE = config('CENXIV_ABS_EXTRAS_MAX_STALE', default=7 * 24 * 60 * 60, cast=int) # seconds stale extras may still be served
+CENXIV_ABS_VERSION_CHECK_INTERVAL = config('CENXIV_ABS_VERSION_CHECK_INTERVAL', default=60 * 60, cast=int) # seconds between checks for new versions of stored articles
 
 
 # Celery Configuration Options
@@ -187,6 +251,21 @@ CELERY_TIMEZONE = 'Asia/Shanghai'
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 5 * 60
 CELERY_DOWNLOAD_AND_COMPILE_ARXIV = config('CELERY_DOWNLOAD_AND_COMPILE_ARXIV', default=True, cast=bool)
+# compiles queued without a priority go last, see articles/compile_queue.py
+CELERY_TASK_ROUTES = {'articles.tasks.download_and_compile_arxiv': {'queue': 'compile_background'}}
+# a worker only takes a task when it can start it, long compiles do not hold back queued ones
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+# Compile workers and the limits of each compile, see articles/compile_pool.py
+CENXIV_COMPILE_CONCURRENCY = config('CENXIV_COMPILE_CONCURRENCY', default=0, cast=int) # compiles at once, 0 to derive it from the cores and memory
+CENXIV_COMPILE_USER_CONCURRENCY = config('CENXIV_COMPILE_USER_CONCURRENCY', default=1, cast=int) # of which for the compile_user queue
+CENXIV_COMPILE_RESERVED_CORES = config('CENXIV_COMPILE_RESERVED_CORES', default=1, cast=int) # cores kept for nginx and uwsgi
+CENXIV_COMPILE_RESERVED_MEMORY_MB = config('CENXIV_COMPILE_RESERVED_MEMORY_MB', default=1024, cast=int) # megabytes kept for nginx, uwsgi and memcached
+CENXIV_COMPILE_MEMORY_MB = config('CENXIV_COMPILE_MEMORY_MB', default=1536, cast=int) # megabytes of data (heap) per compile process
+CENXIV_COMPILE_CPU_SECONDS = config('CENXIV_COMPILE_CPU_SECONDS', default=4 * 60, cast=int) # seconds of CPU per compile process
+CENXIV_COMPILE_CPUS = config('CENXIV_COMPILE_CPUS', default=1, cast=float) # cores of a compile with CENXIV_COMPILE_CGROUP
+CENXIV_COMPILE_CGROUP = config('CENXIV_COMPILE_CGROUP', default='') # a delegated cgroup v2 directory, empty for rlimits only
+CENXIV_COMPILE_NICE = config('CENXIV_COMPILE_NICE', default=10, cast=int)
+CENXIV_COMPILE_TIMEOUT = config('CENXIV_COMPILE_TIMEOUT', default=CELERY_TASK_TIME_LIMIT - 30, cast=int) # seconds, killed before the task time limit
 
 
 # RabbitMQ